@@ -3,6 +3,8 @@ from .scan import *
 from .scan_parameters import *
 from .scan_actions import *
 from .scanner import *
+from .instrumentation import *
+from .journal import *
 
 # Import DALs
 from .dal.epics_dal import *
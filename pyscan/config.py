@@ -15,12 +15,31 @@ max_time_tolerance = 0.05
 scan_default_n_measurements = 1
 # Default interval between multiple measurements in a single position. Taken into account when n_measurements > 1.
 scan_default_measurement_interval = 0
-# Interval to sleep while the scan is paused.
-scan_pause_sleep_interval = 0.1
 # Maximum number of retries to read the channels to get valid data.
 scan_acquisition_retry_limit = 3
 # Delay between acquisition retries.
 scan_acquisition_retry_delay = 1
+# Each following retry delay is this many times longer than the previous one (1 means constant delay).
+scan_acquisition_retry_backoff = 1
+# Maximum delay between acquisition retries, when using the retry backoff.
+scan_acquisition_retry_max_delay = 10
+# Retry as soon as the PV of a failed EPICS condition changes, instead of waiting for the whole retry delay. Only the
+# retries after the whole retry delay count towards the retry limit.
+scan_acquisition_retry_on_change = False
+# On retry, read again only the sources (bs, EPICS, function) of the failed conditions. The values of the other
+# sources are taken from the previous read attempt.
+scan_acquisition_retry_failed_sources_only = False
+# Check the EPICS and bs conditions before reading the EPICS and function readables, and skip reading them if the
+# conditions are not fulfilled. All conditions are checked again after the read.
+scan_check_conditions_first = False
+# Read the bs, EPICS and function readables concurrently, each function readable in its own thread.
+scan_concurrent_read = False
+# Maximum time to wait for each source ("bs", "epics", "function") in a concurrent read. None means no timeout.
+scan_concurrent_read_timeouts = {"bs": None, "epics": None, "function": None}
+# Maximum number of measured positions waiting to be processed in a pipelined scan.
+scan_pipeline_queue_size = 10
+# A scan step is reported as slow when it takes longer than this multiple of the running median step time.
+instrumentation_slow_step_factor = 3
 
 ############################
 # BSREAD DAL configuration #
@@ -33,6 +52,11 @@ bs_read_timeout = 5
 # Max time to wait for a message (if there is none). Important for stopping threads etc.
 bs_receive_timeout = 1
 
+# Receive the bs_read messages in a background thread, into a buffer searchable by timestamp and pulse id.
+bs_receiver_thread = False
+# Number of messages kept in the receiver thread buffer.
+bs_buffer_size = 1000
+
 # Default bs_read connection address.
 bs_default_host = None
 # Default bs_read connection port.
@@ -46,10 +70,40 @@ bs_default_missing_property_value = Exception
 # EPICS DAL configuration #
 ###########################
 
+# Time to wait for all the PVs of a group to connect.
+epics_connection_timeout = 5
+# Max number of connected PVs kept in the connection pool. Only PVs not used by any group are disconnected to respect
+# it.
+epics_pv_pool_max_size = 1000
+# Time after which PVs not used by any group are disconnected.
+epics_pv_pool_idle_timeout = 60
+# Read the PVs of a group by requesting all the values at once and then collecting them (like caget_many).
+epics_bulk_read = False
+# Default time to wait for the value of each PV in a bulk read.
+epics_default_read_timeout = 2
+# Read the EPICS readables from CA monitors, accepting only values sampled after the end of the last move.
+epics_read_from_monitors = False
+# Max time to wait for the monitors of all PVs to deliver values sampled after the read request.
+epics_monitored_read_timeout = 5
 # Default set and match timeout - how much time a PV has to reach the target value.
 epics_default_set_and_match_timeout = 3
 # After all motors have reached their destination (set_and_match), extra time to wait.
 epics_default_settling_time = 0
+# Wait for the set_and_match readback values with CA monitors, instead of polling them.
+epics_set_and_match_use_monitors = False
+# Fail set_and_match as soon as a readback does not get closer to its expected value for this many seconds (stalled
+# motor, limit switch...), instead of waiting for the whole timeout. None disables the stall detection.
+epics_set_and_match_stall_time = None
+# Do not write and check the writables whose set value did not change since the last move (for example the outer axes
+# of an area scan). Changes done to these PVs outside of the scan are not detected, unless they are verified.
+epics_set_and_match_skip_unchanged = False
+# When skipping unchanged writables, check their readbacks every this many moves (0 means never), and move them again
+# if they are not at the set value.
+epics_set_and_match_verify_every = 0
+# Read the readbacks once before writing, and do not move the writables that are already at the set value.
+epics_set_and_match_check_first = False
+# Motor record field used to set the velocity of writables in continuous scans.
+epics_motor_velocity_field = "VELO"
 
 ############################
 # PShell DAL configuration #
@@ -1,10 +1,276 @@
 import math
-from time import time
+from collections import namedtuple, OrderedDict
+from threading import Condition, Event, Thread, Lock
+from time import time, monotonic
 
+import numpy
 from bsread import Source, mflow
 
 from pyscan import config
-from pyscan.utils import convert_to_list
+from pyscan.instrumentation import StreamingHistogram
+from pyscan.scan_parameters import BS_PULSE_ID_PROPERTY, BsAggregation
+from pyscan.utils import convert_to_list, compare_channel_values
+
+
+# Block of consecutive messages. The properties and conditions are lists of arrays (one array per property or
+# condition), with one row per message.
+MessageBlock = namedtuple("MessageBlock", ["pulse_ids", "properties", "conditions", "n_missing_pulse_ids"])
+
+
+def _set_block_value(columns, column_index, row, n_rows, value):
+    """
+    Set the value of a message in the block column, allocating the column from the first value.
+    Values that do not fit the column type or shape (missing values, for example) turn it into an object column.
+    :param columns: List of the block columns.
+    :param column_index: Index of the column to set.
+    :param row: Index of the message in the block.
+    :param n_rows: Number of messages in the block.
+    :param value: Value to set.
+    """
+    column = columns[column_index]
+
+    if column is None:
+        array_value = numpy.asarray(value)
+        if value is not None and array_value.dtype.kind in "biufc":
+            column = numpy.empty((n_rows,) + array_value.shape, dtype=array_value.dtype)
+        else:
+            column = numpy.empty(n_rows, dtype=object)
+
+        columns[column_index] = column
+
+    # None cannot be stored in a numeric column (it would be converted to NaN).
+    if value is not None or column.dtype == object:
+        try:
+            column[row] = value
+            return
+        except (ValueError, TypeError):
+            pass
+
+    object_column = numpy.empty(n_rows, dtype=object)
+    for previous_row in range(row):
+        object_column[previous_row] = column[previous_row]
+    object_column[row] = value
+    columns[column_index] = object_column
+
+
+def get_message_timestamp(message):
+    """
+    Get the global timestamp of the message, in seconds.
+    :param message: Message to inspect.
+    :return: Timestamp as float.
+    """
+    return message.data.global_timestamp + message.data.global_timestamp_offset * 1e-9
+
+
+class StreamStatistics(object):
+    """
+    Statistics of the messages received from a bs stream, to detect lost messages and size the queues.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Reset all the statistics.
+        """
+        with self._lock:
+            self.n_received = 0
+            self.n_filtered = 0
+            self.n_skipped = 0
+            self.n_receive_timeouts = 0
+            self.n_missing_pulse_ids = 0
+            self.n_pulse_id_gaps = 0
+            self.latency = StreamingHistogram()
+
+            self._last_pulse_id = None
+
+    def add_received(self, message, arrival_time):
+        """
+        Record a message received from the stream.
+        :param message: Received message.
+        :param arrival_time: Local time at which the message was received.
+        """
+        pulse_id = message.data.pulse_id
+
+        with self._lock:
+            self.n_received += 1
+            self.latency.add(arrival_time - get_message_timestamp(message))
+
+            # Messages lost in the stream or because the receive queue overflowed.
+            if self._last_pulse_id is not None and pulse_id > self._last_pulse_id + 1:
+                self.n_missing_pulse_ids += pulse_id - self._last_pulse_id - 1
+                self.n_pulse_id_gaps += 1
+
+            self._last_pulse_id = pulse_id
+
+    def add_filtered(self):
+        with self._lock:
+            self.n_filtered += 1
+
+    def add_skipped(self):
+        with self._lock:
+            self.n_skipped += 1
+
+    def add_receive_timeout(self):
+        with self._lock:
+            self.n_receive_timeouts += 1
+
+    def get_statistics(self):
+        """
+        Get the statistics.
+        :return: Dictionary with the number of received, filtered (by the filter function) and skipped (received but
+        not used by any read) messages, receive timeouts, missing pulse ids and pulse id gaps, and the summary of the
+        message arrival latency relative to the message global timestamp, in seconds.
+        """
+        with self._lock:
+            return OrderedDict([("received", self.n_received),
+                                ("filtered", self.n_filtered),
+                                ("skipped", self.n_skipped),
+                                ("receive_timeouts", self.n_receive_timeouts),
+                                ("missing_pulse_ids", self.n_missing_pulse_ids),
+                                ("pulse_id_gaps", self.n_pulse_id_gaps),
+                                ("latency", self.latency.get_summary())])
+
+
+class MessageBuffer(object):
+    """
+    Bounded ring buffer of bsread messages, in the order they were received (increasing pulse id and timestamp).
+    """
+
+    def __init__(self, size):
+        """
+        Initialize the buffer.
+        :param size: Maximum number of messages in the buffer. When full, the oldest message is overwritten.
+        """
+        self.size = size
+
+        self._messages = [None] * size
+        self._timestamps = [None] * size
+        self._pulse_ids = [None] * size
+        # True for the messages returned by a read.
+        self._consumed = [False] * size
+        # Physical index of the oldest message, and number of messages in the buffer.
+        self._start = 0
+        self._count = 0
+        # Number of messages dropped from the full buffer, and the max number of messages in the buffer.
+        self.n_overwritten = 0
+        self.max_count = 0
+        # Number of messages dropped from the buffer (overwritten or cleared) without being returned by any read.
+        self.n_skipped = 0
+
+        self._condition = Condition()
+        # Set when the buffer will not receive any more messages.
+        self._closed = False
+
+    def append(self, message):
+        """
+        Add a message to the buffer, and wake up the readers waiting for it.
+        :param message: Message to add.
+        """
+        with self._condition:
+            index = (self._start + self._count) % self.size
+
+            if self._count == self.size:
+                self._start = (self._start + 1) % self.size
+                self.n_overwritten += 1
+
+                if not self._consumed[index]:
+                    self.n_skipped += 1
+            else:
+                self._count += 1
+                self.max_count = max(self.max_count, self._count)
+
+            self._messages[index] = message
+            self._timestamps[index] = get_message_timestamp(message)
+            self._pulse_ids[index] = message.data.pulse_id
+            self._consumed[index] = False
+
+            self._condition.notify_all()
+
+    def close(self):
+        """
+        Wake up all waiting readers, no more messages will be added.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def _find(self, keys, value):
+        """
+        Binary search for the first message with the key equal or larger than the value.
+        :param keys: Physical list of keys to search (timestamps or pulse ids).
+        :param value: Value to search for.
+        :return: Logical index of the message (0 is the oldest), or the number of messages if none was found.
+        """
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if keys[(self._start + middle) % self.size] < value:
+                low = middle + 1
+            else:
+                high = middle
+
+        return low
+
+    def wait_for_message(self, timestamp=None, pulse_id=None, timeout=None):
+        """
+        Get the first message with global timestamp equal or after the timestamp (or pulse id equal or after the
+        pulse id), and wait for it if it was not received yet.
+        :param timestamp: Minimum message timestamp.
+        :param pulse_id: Minimum message pulse id. Used when no timestamp is provided.
+        :param timeout: Maximum time to wait for the message.
+        :return: The message, or None if it was not received in time.
+        """
+        deadline = monotonic() + timeout
+
+        with self._condition:
+            while True:
+                if timestamp is not None:
+                    index = self._find(self._timestamps, timestamp)
+                else:
+                    index = self._find(self._pulse_ids, pulse_id)
+
+                if index < self._count:
+                    physical_index = (self._start + index) % self.size
+                    self._consumed[physical_index] = True
+                    return self._messages[physical_index]
+
+                remaining_time = deadline - monotonic()
+                if remaining_time <= 0 or self._closed:
+                    return None
+
+                self._condition.wait(remaining_time)
+
+    def get_messages(self, start_pulse_id, stop_pulse_id):
+        """
+        Get the messages in the pulse id range, without waiting for them.
+        :param start_pulse_id: First pulse id of the range.
+        :param stop_pulse_id: Pulse id after the end of the range.
+        :return: List of messages in the buffer with start_pulse_id <= pulse id < stop_pulse_id.
+        """
+        with self._condition:
+            start_index = self._find(self._pulse_ids, start_pulse_id)
+            stop_index = self._find(self._pulse_ids, stop_pulse_id)
+
+            physical_indexes = [(self._start + index) % self.size for index in range(start_index, stop_index)]
+            for index in physical_indexes:
+                self._consumed[index] = True
+
+            return [self._messages[index] for index in physical_indexes]
+
+    def clear(self):
+        """
+        Remove all the messages from the buffer, and open it for new messages. The messages not returned by any read
+        are counted as skipped.
+        """
+        with self._condition:
+            self.n_skipped += sum(not self._consumed[(self._start + index) % self.size] for index in range(self._count))
+
+            self._start = 0
+            self._count = 0
+            self._closed = False
 
 
 class ReadGroupInterface(object):
@@ -24,11 +290,18 @@ class ReadGroupInterface(object):
         self.properties = convert_to_list(properties)
         self.conditions = convert_to_list(conditions)
         self.filter = filter_function
+        self.statistics = StreamStatistics()
 
         self._message_cache = None
         self._message_cache_timestamp = None
         self._message_cache_position_index = None
 
+        # Messages received in the background, if the receiver thread is used.
+        self._buffer = MessageBuffer(config.bs_buffer_size) if config.bs_receiver_thread else None
+        self._receiver_thread = None
+        self._receiver_stop_event = Event()
+        self._receiver_error = None
+
         self._connect_bsread(config.bs_default_host, config.bs_default_port)
 
     def _connect_bsread(self, host, port):
@@ -45,7 +318,8 @@ class ReadGroupInterface(object):
                                  receive_timeout=config.bs_receive_timeout,
                                  mode=mode)
         else:
-            channels = [x.identifier for x in self.properties] + [x.identifier for x in self.conditions]
+            channels = [x.identifier for x in self.properties + self.conditions
+                        if x.property != BS_PULSE_ID_PROPERTY]
             self.stream = Source(channels=channels,
                                  queue_size=config.bs_queue_size,
                                  receive_timeout=config.bs_receive_timeout,
@@ -93,19 +367,19 @@ class ReadGroupInterface(object):
         else:
             return property_definition.default_value
 
-    def _read_pvs_from_cache(self, properties):
+    def _read_pvs_from_message(self, message, properties):
         """
-        Read the requested properties from the cache.
+        Read the requested properties from the message.
+        :param message: Message to read the properties from.
         :param properties: List of properties to read.
         :return: List with PV values.
         """
-        if not self._message_cache:
-            raise ValueError("Message cache is empty, cannot read PVs %s." % properties)
-
         pv_values = []
         for property_name, property_definition in ((x.identifier, x) for x in properties):
-            if property_name in self._message_cache.data.data:
-                value = self._message_cache.data.data[property_name].value
+            if property_definition.property == BS_PULSE_ID_PROPERTY:
+                value = message.data.pulse_id
+            elif property_name in message.data.data:
+                value = message.data.data[property_name].value
             else:
                 value = self._get_missing_property_default(property_definition)
 
@@ -115,29 +389,164 @@ class ReadGroupInterface(object):
 
         return pv_values
 
-    def read(self, current_position_index=None, retry=False):
+    def _read_pvs_from_cache(self, properties):
         """
-        Reads the PV values from BSread. It uses the first PVs data sampled after the invocation of this method.
-        :return: List of values for read pvs. Note: Condition PVs are excluded.
+        Read the requested properties from the cache.
+        :param properties: List of properties to read.
+        :return: List with PV values.
         """
+        if not self._message_cache:
+            raise ValueError("Message cache is empty, cannot read PVs %s." % properties)
+
+        return self._read_pvs_from_message(self._message_cache, properties)
+
+    def _receive_from_stream(self):
+        """
+        Receive the next message from the stream, apply the filter and update the stream statistics.
+        :return: The message, or None if no message was received in the receive timeout or it was filtered out.
+        """
+        message = self.stream.receive()
+
+        if not message:
+            self.statistics.add_receive_timeout()
+            return None
+
+        self.statistics.add_received(message, time())
+
+        if self.filter and not self.filter(message):
+            self.statistics.add_filtered()
+            return None
+
+        return message
+
+    def get_statistics(self):
+        """
+        Get the statistics of the messages received from the stream.
+        :return: Dictionary with the StreamStatistics and, if the receiver thread is used, the number of messages
+        dropped from the full receiver buffer ("buffer_overwritten") and the max buffer fill ("buffer_max_fill").
+        With the receiver thread, the buffered messages not used by any read are counted as skipped once they are
+        dropped from the buffer (overwritten, or when the receiver is stopped).
+        """
+        statistics = self.statistics.get_statistics()
+
+        if self._buffer is not None:
+            statistics["skipped"] += self._buffer.n_skipped
+            statistics["buffer_overwritten"] = self._buffer.n_overwritten
+            statistics["buffer_max_fill"] = self._buffer.max_count
+
+        return statistics
+
+    def reset_statistics(self):
+        """
+        Reset the statistics of the messages received from the stream.
+        """
+        self.statistics.reset()
+
+        if self._buffer is not None:
+            self._buffer.n_overwritten = 0
+            self._buffer.max_count = 0
+            self._buffer.n_skipped = 0
+
+    def _receive_messages(self):
+        """
+        Receive the messages from the stream into the buffer, until the receiver is stopped.
+        """
+        try:
+            while not self._receiver_stop_event.is_set():
+                message = self._receive_from_stream()
+
+                # Receive might timeout, in this case there is nothing to buffer.
+                if message:
+                    self._buffer.append(message)
+
+        except Exception as e:
+            self._receiver_error = e
+
+        finally:
+            self._buffer.close()
+
+    def start_receiver(self):
+        """
+        Start receiving the messages in the background, if not running yet.
+        """
+        if self._receiver_thread is not None:
+            return
+
+        self._buffer.clear()
+        self._receiver_error = None
+        self._receiver_stop_event.clear()
+
+        self._receiver_thread = Thread(target=self._receive_messages, daemon=True)
+        self._receiver_thread.start()
+
+    def stop_receiver(self):
+        """
+        Stop receiving the messages in the background, and drop the buffered messages. The receiver is started again
+        by the next read.
+        """
+        if self._receiver_thread is None:
+            return
+
+        self._receiver_stop_event.set()
+        self._receiver_thread.join()
+        self._receiver_thread = None
+
+        self._buffer.clear()
+
+    def _find_message(self, read_timestamp):
+        """
+        Get the first message in the buffer sampled after the read timestamp, waiting for it if needed.
+        :param read_timestamp: Time of the read request.
+        :return: The message, or None if it did not arrive in time.
+        """
+        return self._buffer.wait_for_message(timestamp=read_timestamp, timeout=config.bs_read_timeout)
+
+    def _receive_message(self, read_timestamp):
+        """
+        Get the first message sampled after the read timestamp.
+        :param read_timestamp: Time of the read request.
+        :return: The message, or None if it did not arrive in time.
+        """
+        if self._buffer is not None:
+            self.start_receiver()
+            message = self._find_message(read_timestamp)
+
+            if self._receiver_error is not None:
+                raise Exception("Receiving from the BS read stream failed: %s" % self._receiver_error)
+
+            return message
 
-        # Perform the actual read.
-        read_timestamp = time()
         while time() - read_timestamp < config.bs_read_timeout:
 
-            message = self.stream.receive(filter=self.filter)
+            message = self._receive_from_stream()
 
             if self.is_message_after_timestamp(message, read_timestamp):
+                return message
 
-                self._message_cache = message
-                self._message_cache_position_index = current_position_index
-                self._message_cache_timestamp = read_timestamp
+            if message:
+                self.statistics.add_skipped()
 
-                return self._read_pvs_from_cache(self.properties)
+        return None
 
-        else:
+    def read(self, current_position_index=None, retry=False):
+        """
+        Reads the PV values from BSread. It uses the first PVs data sampled after the invocation of this method.
+        :return: List of values for read pvs. Note: Condition PVs are excluded.
+        """
+
+        # Perform the actual read.
+        read_timestamp = time()
+        message = self._receive_message(read_timestamp)
+
+        if message is None:
             raise Exception("Read timeout exceeded for BS read stream. Could not find the desired package in time.")
 
+        self._message_cache = message
+        self._message_cache_position_index = current_position_index
+        self._message_cache_timestamp = read_timestamp
+
+        return self._read_pvs_from_cache(self.properties)
+
     def read_cached_conditions(self):
         """
         Returns the conditions associated with the last read command.
@@ -145,10 +554,88 @@ class ReadGroupInterface(object):
         """
         return self._read_pvs_from_cache(self.conditions)
 
+    def get_cached_pulse_id(self):
+        """
+        Returns the pulse id of the message used by the last read command.
+        :return: Pulse id, or None if nothing was read yet.
+        """
+        if not self._message_cache:
+            return None
+
+        return self._message_cache.data.pulse_id
+
+    def _receive_pulse_id_range(self, start_pulse_id, stop_pulse_id, timeout):
+        """
+        Get the messages in the pulse id range, waiting until the end of the range is received.
+        :return: List of messages, or None if the end of the range did not arrive in time.
+        """
+        if self._buffer is not None:
+            self.start_receiver()
+            last_message = self._buffer.wait_for_message(pulse_id=stop_pulse_id - 1, timeout=timeout)
+
+            if self._receiver_error is not None:
+                raise Exception("Receiving from the BS read stream failed: %s" % self._receiver_error)
+
+            if last_message is None:
+                return None
+
+            return self._buffer.get_messages(start_pulse_id, stop_pulse_id)
+
+        messages = []
+        start_time = time()
+        while time() - start_time < timeout:
+
+            message = self._receive_from_stream()
+
+            # Receive might timeout, in this case there is nothing to collect.
+            if not message:
+                continue
+
+            if start_pulse_id <= message.data.pulse_id < stop_pulse_id:
+                messages.append(message)
+            else:
+                self.statistics.add_skipped()
+
+            if message.data.pulse_id >= stop_pulse_id - 1:
+                return messages
+
+        return None
+
+    def read_pulse_id_range(self, start_pulse_id, stop_pulse_id=None, timeout=None):
+        """
+        Read the properties and conditions of the messages in the pulse id range. The read does not depend on the
+        local clock, and the data can be correlated by pulse id with other beam synchronous data.
+        Pulse ids missing in the stream (or already dropped from the receiver buffer) are not returned.
+        :param start_pulse_id: First pulse id to read.
+        :param stop_pulse_id: Pulse id after the last one to read. Default: start_pulse_id + 1 (single pulse id).
+        :param timeout: Max time to wait for the last pulse id of the range. Default: config.bs_read_timeout
+        :return: List of (pulse id, property values, condition values), one per message, ordered by pulse id.
+        """
+        if stop_pulse_id is None:
+            stop_pulse_id = start_pulse_id + 1
+
+        if stop_pulse_id <= start_pulse_id:
+            raise ValueError("Stop pulse id %s must be larger than start pulse id %s." %
+                             (stop_pulse_id, start_pulse_id))
+
+        messages = self._receive_pulse_id_range(start_pulse_id, stop_pulse_id, timeout or config.bs_read_timeout)
+
+        if messages is None:
+            raise Exception("Read timeout exceeded for BS read stream. Pulse id %s did not arrive in time." %
+                            (stop_pulse_id - 1))
+
+        return [(message.data.pulse_id,
+                 self._read_pvs_from_message(message, self.properties),
+                 self._read_pvs_from_message(message, self.conditions))
+                for message in messages]
+
     def close(self):
         """
         Disconnect from the stream and clear the message cache.
         """
+        if self._buffer is not None:
+            self.stop_receiver()
+
         if self.stream:
             self.stream.disconnect()
 
@@ -158,6 +645,31 @@ class ReadGroupInterface(object):
 
 class ImmediateReadGroupInterface(ReadGroupInterface):
 
+    def __init__(self, properties, conditions=None, host=None, port=None, filter_function=None, n_messages=1,
+                 aggregation=None):
+        """
+        Create the bsread group read interface, that reads the stream messages one after another.
+        :param properties: List of PVs to read for processing.
+        :param conditions: List of PVs to read as conditions.
+        :param filter_function: Filter the BS stream with a custom function.
+        :param n_messages: Number of consecutive messages to read for each position index.
+        :param aggregation: How to aggregate the values of the messages read for each position index, when
+        n_messages > 1. Default: BsAggregation.All
+        """
+        if n_messages < 1:
+            raise ValueError("Number of messages must be at least 1, but %s was given." % n_messages)
+
+        self.n_messages = n_messages
+        self.aggregation = aggregation or BsAggregation.All
+
+        if not isinstance(self.aggregation, BsAggregation):
+            raise ValueError("Aggregation must be one of %s, but %s was given." % (list(BsAggregation), aggregation))
+
+        # Messages read for the last position index, when reading more than 1 message per position.
+        self._block_cache = None
+
+        super(ImmediateReadGroupInterface, self).__init__(properties, conditions, host, port, filter_function)
+
     @staticmethod
     def is_message_after_timestamp(message, timestamp):
         """
@@ -180,7 +692,123 @@ class ImmediateReadGroupInterface(ReadGroupInterface):
 
         # Message for this position already cached.
         if current_position_index is not None and current_position_index == self._message_cache_position_index:
+            if self._block_cache:
+                return self._aggregate(self._block_cache.properties)
+
             return self._read_pvs_from_cache(self.properties)
 
-        return super(ImmediateReadGroupInterface, self).read(current_position_index=current_position_index,
-                                                             retry=retry)
+        if self.n_messages == 1:
+            return super(ImmediateReadGroupInterface, self).read(current_position_index=current_position_index,
+                                                                 retry=retry)
+
+        self._block_cache = self.read_block(self.n_messages)
+        self._message_cache_position_index = current_position_index
+        self._message_cache_timestamp = time()
+
+        return self._aggregate(self._block_cache.properties)
+
+    @staticmethod
+    def _is_aggregated(property_definition, column):
+        """
+        Check if the values of a property can be aggregated. Pulse ids and string values cannot be.
+        :param property_definition: Property of the column.
+        :param column: Array with the property values, one row per message.
+        :return: True if the column is aggregated, False if the value of the first message is used instead.
+        """
+        if property_definition.property == BS_PULSE_ID_PROPERTY:
+            return False
+
+        return column.dtype != object or not all(isinstance(value, str) for value in column)
+
+    def _aggregate(self, columns):
+        """
+        Aggregate the values of the messages of a block, for each property. For the pulse id and string properties,
+        the value of the first message is returned instead.
+        :param columns: List of arrays, one per property, with one row per message.
+        :return: List of aggregated values, one per property.
+        """
+        if self.aggregation == BsAggregation.All:
+            return list(columns)
+
+        aggregate = numpy.mean if self.aggregation == BsAggregation.Mean else numpy.std
+
+        try:
+            return [aggregate(column, axis=0) if self._is_aggregated(property_definition, column) else column[0]
+                    for property_definition, column in zip(self.properties, columns)]
+
+        except TypeError:
+            raise ValueError("Cannot aggregate the bs properties %s with %s." % (self.properties, self.aggregation))
+
+    def read_cached_conditions(self):
+        """
+        Returns the conditions associated with the last read command. When reading more than 1 message per position,
+        the first value that does not fulfill the condition is returned for each condition (or the first value, if all
+        the messages fulfill it).
+        :return: List of condition values.
+        """
+        if not self._block_cache:
+            return super(ImmediateReadGroupInterface, self).read_cached_conditions()
+
+        condition_values = []
+        for condition, values in zip(self.conditions, self._block_cache.conditions):
+            failed_indexes = numpy.flatnonzero(~compare_channel_values(values, condition.value, condition.tolerance,
+                                                                       condition.operation))
+
+            condition_values.append(values[failed_indexes[0]] if len(failed_indexes) else values[0])
+
+        return condition_values
+
+    def close(self):
+        """
+        Disconnect from the stream and clear the message cache.
+        """
+        super(ImmediateReadGroupInterface, self).close()
+        self._block_cache = None
+
+    def read_block(self, n_messages):
+        """
+        Read the next N consecutive messages into arrays, one array per property and condition.
+        :param n_messages: Number of messages to read.
+        :return: MessageBlock with the pulse ids, properties and conditions of the messages, and the number of pulse
+        ids missing in the stream since the last read message.
+        """
+        pulse_ids = numpy.empty(n_messages, dtype=numpy.int64)
+        properties = [None] * len(self.properties)
+        conditions = [None] * len(self.conditions)
+
+        last_pulse_id = self.get_cached_pulse_id()
+
+        for row in range(n_messages):
+            message = self._receive_message(time())
+
+            if message is None:
+                raise Exception("Read timeout exceeded for BS read stream. Received %d of %d block messages." %
+                                (row, n_messages))
+
+            self._message_cache = message
+            pulse_ids[row] = message.data.pulse_id
+
+            for index, value in enumerate(self._read_pvs_from_message(message, self.properties)):
+                _set_block_value(properties, index, row, n_messages, value)
+
+            for index, value in enumerate(self._read_pvs_from_message(message, self.conditions)):
+                _set_block_value(conditions, index, row, n_messages, value)
+
+        # The block does not correspond to any position index.
+        self._message_cache_position_index = None
+
+        # Consecutive messages have consecutive pulse ids, unless messages were lost.
+        n_missing_pulse_ids = int(numpy.sum(numpy.diff(pulse_ids) - 1)) if n_messages > 1 else 0
+        if last_pulse_id is not None and n_messages > 0:
+            n_missing_pulse_ids += int(pulse_ids[0] - last_pulse_id - 1)
+
+        return MessageBlock(pulse_ids, properties, conditions, n_missing_pulse_ids)
+
+    def _find_message(self, read_timestamp):
+        """
+        Get the message following the last read message (the oldest message in the buffer for the first read).
+        :param read_timestamp: Time of the read request, not used.
+        :return: The message, or None if it did not arrive in time.
+        """
+        next_pulse_id = self._message_cache.data.pulse_id + 1 if self._message_cache else 0
+        return self._buffer.wait_for_message(pulse_id=next_pulse_id, timeout=config.bs_read_timeout)
@@ -1,8 +1,198 @@
 import time
+from collections import OrderedDict
 from itertools import count
+from threading import Condition, Lock
+
+from epics import ca
 
 from pyscan import config
-from pyscan.utils import convert_to_list, validate_lists_length, connect_to_pv, compare_channel_value
+from pyscan.utils import convert_to_list, validate_lists_length, compare_channel_value, connect_to_pvs
+
+
+class StallError(ValueError):
+    """
+    Raised when the readback of a written PV stops moving towards the expected value.
+    """
+
+    def __init__(self, trajectories, expected_values, stall_time):
+        """
+        Initialize the stall error.
+        :param trajectories: Dictionary {pv_name: [(timestamp, readback_value), ...]} of the stalled PVs.
+        :param expected_values: Dictionary {pv_name: expected_readback_value} of the stalled PVs.
+        :param stall_time: Time without progress after which the PVs were considered stalled.
+        """
+        self.trajectories = trajectories
+        self.expected_values = expected_values
+        self.stall_time = stall_time
+
+        error_message = ""
+        for pv_name, samples in trajectories.items():
+            error_message += "PV %s stalled at %s, while moving to %s: no progress for %.3f seconds " \
+                             "(average velocity %s).\n" % (pv_name, samples[-1][1], expected_values[pv_name],
+                                                            stall_time, self.get_velocity(pv_name))
+
+        super(StallError, self).__init__(error_message)
+
+    def get_velocity(self, pv_name):
+        """
+        Average velocity of the readback over the whole trajectory.
+        :param pv_name: Name of the stalled PV.
+        :return: Velocity in units per second, or None if it cannot be calculated.
+        """
+        (first_timestamp, first_value), (last_timestamp, last_value) = self.trajectories[pv_name][0], \
+            self.trajectories[pv_name][-1]
+
+        if last_timestamp == first_timestamp or not isinstance(first_value, (int, float)) or \
+                not isinstance(last_value, (int, float)):
+            return None
+
+        return (last_value - first_value) / (last_timestamp - first_timestamp)
+
+
+class _TrajectoryTracker(object):
+    """
+    Track the readback trajectory of a PV moving to its expected value, to detect stalls.
+    """
+
+    def __init__(self, expected_value, tolerance, stall_time, start_time):
+        """
+        :param expected_value: Value the readback is moving to.
+        :param tolerance: Minimal change of the distance to the expected value that counts as progress.
+        :param stall_time: Time without progress after which the PV is considered stalled.
+        :param start_time: Timestamp of the start of the move.
+        """
+        self.expected_value = expected_value
+        self.tolerance = tolerance
+        self.stall_time = stall_time
+        self.samples = []
+
+        self._best_distance = None
+        self._progress_time = start_time
+
+    def add_sample(self, timestamp, value):
+        self.samples.append((timestamp, value))
+
+        # Only numbers have a distance - other values are never considered stalled.
+        if not isinstance(value, (int, float)) or not isinstance(self.expected_value, (int, float)):
+            self._progress_time = timestamp
+            return
+
+        distance = abs(value - self.expected_value)
+
+        # Getting closer than ever before, or already there (waiting for other completion strategies).
+        if self._best_distance is None or self._best_distance - distance > self.tolerance or \
+                distance <= self.tolerance:
+            self._best_distance = distance
+            self._progress_time = timestamp
+
+    def is_stalled(self, timestamp):
+        return timestamp - self._progress_time >= self.stall_time
+
+
+class PVConnectionPool(object):
+    """
+    Share the PV connections between groups, actions and scans.
+    PVs no longer borrowed by anyone stay connected for reuse, until they are idle for too long or the pool is full.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        # PV name: PV object.
+        self._pvs = {}
+        # Id of PV object: PV name.
+        self._pv_names = {}
+        # PV name: number of times the PV is borrowed.
+        self._ref_counts = {}
+        # PV name: time the PV was released, ordered from the longest idle.
+        self._idle_since = OrderedDict()
+
+    def acquire(self, pv_names, connection_timeout=None):
+        """
+        Borrow the PVs, connecting the ones that are not in the pool yet.
+        :param pv_names: PV names to borrow.
+        :param connection_timeout: Time to wait for the new PVs to connect. Default: config.epics_connection_timeout
+        :return: List of PV objects, in the order of the PV names.
+        :raises ValueError listing all the PVs that could not connect.
+        """
+        with self._lock:
+            new_pv_names = list(OrderedDict.fromkeys(pv_name for pv_name in pv_names if pv_name not in self._pvs))
+
+            if new_pv_names:
+                for pv_name, pv in zip(new_pv_names, connect_to_pvs(new_pv_names, connection_timeout)):
+                    self._pvs[pv_name] = pv
+                    self._pv_names[id(pv)] = pv_name
+                    self._ref_counts[pv_name] = 0
+
+            pvs = []
+            for pv_name in pv_names:
+                self._ref_counts[pv_name] += 1
+                self._idle_since.pop(pv_name, None)
+                pvs.append(self._pvs[pv_name])
+
+            self._evict()
+
+            return pvs
+
+    def release(self, pvs):
+        """
+        Return the borrowed PVs to the pool. PVs that do not belong to the pool are disconnected.
+        :param pvs: PV objects to return.
+        """
+        with self._lock:
+            for pv in pvs:
+                pv_name = self._pv_names.get(id(pv))
+
+                if pv_name is None:
+                    pv.disconnect()
+                    continue
+
+                # Not borrowed (released twice).
+                if self._ref_counts[pv_name] == 0:
+                    continue
+
+                self._ref_counts[pv_name] -= 1
+                if self._ref_counts[pv_name] == 0:
+                    pv.auto_monitor = False
+                    self._idle_since[pv_name] = time.monotonic()
+
+            self._evict()
+
+    def clear(self):
+        """
+        Disconnect all the idle PVs.
+        """
+        with self._lock:
+            for pv_name in list(self._idle_since):
+                self._remove(pv_name)
+
+    def get_n_connections(self):
+        """
+        :return: Number of connected PVs in the pool, borrowed or idle.
+        """
+        return len(self._pvs)
+
+    def _evict(self):
+        """
+        Disconnect the idle PVs that exceeded the idle timeout, and the longest idle ones if the pool is full.
+        """
+        current_time = time.monotonic()
+
+        for pv_name, idle_since in list(self._idle_since.items()):
+            if current_time - idle_since >= config.epics_pv_pool_idle_timeout or \
+                    len(self._pvs) > config.epics_pv_pool_max_size:
+                self._remove(pv_name)
+
+    def _remove(self, pv_name):
+        pv = self._pvs.pop(pv_name)
+        del self._pv_names[id(pv)]
+        del self._ref_counts[pv_name]
+        del self._idle_since[pv_name]
+
+        pv.disconnect()
+
+
+# Pool used by all the groups.
+pv_pool = PVConnectionPool()
 
 
 class PyEpicsDal(object):
@@ -26,8 +216,10 @@ class PyEpicsDal(object):
     def add_reader_group(self, group_name, pv_names):
         self.add_group(group_name, ReadGroupInterface(pv_names))
 
-    def add_writer_group(self, group_name, pv_names, readback_pv_names=None, tolerances=None, timeout=None):
-        self.add_group(group_name, WriteGroupInterface(pv_names, readback_pv_names, tolerances, timeout))
+    def add_writer_group(self, group_name, pv_names, readback_pv_names=None, tolerances=None, timeout=None,
+                         interrupt_event=None):
+        self.add_group(group_name, WriteGroupInterface(pv_names, readback_pv_names, tolerances, timeout,
+                                                       interrupt_event))
 
     def get_group(self, handle):
         return self.groups.get(handle)
@@ -53,31 +245,101 @@ class WriteGroupInterface(object):
     default_timeout = 5
     default_get_sleep = 0.1
 
-    def __init__(self, pv_names, readback_pv_names=None, tolerances=None, timeout=None):
+    def __init__(self, pv_names, readback_pv_names=None, tolerances=None, timeout=None, interrupt_event=None,
+                 use_monitors=None, readback_values=None, done_pv_names=None, done_values=None, use_complete=None,
+                 stall_time=None, skip_unchanged=None, verify_every=None, check_first=None):
         """
         Initialize the write group.
         :param pv_names: PV names (or name, list or single string) to connect to. 
         :param readback_pv_names: PV names (or name, list or single string) of readback PVs to connect to. 
-        :param tolerances: Tolerances to be used for set_and_match. You can also specify them on the set_and_match
+        :param tolerances: Tolerances to be used for set_and_match. You can also specify them on the set_and_match.
+        None for a PV means the default tolerance. PVs with a done PV or use_complete check the readback only if the
+        tolerance (or the readback value) is given.
         :param timeout: Timeout to reach the destination.
+        :param interrupt_event: Event that, when set, stops set_and_match from waiting for the values to be reached.
+        :param use_monitors: Wait for the readback values with CA monitors, instead of polling them.
+        Default: config.epics_set_and_match_use_monitors
+        :param readback_values: Values to compare the readbacks to, instead of the set values. None for a PV means
+        the set value.
+        :param done_pv_names: PVs that signal the end of the move, for example the motor record .DMOV field. None for
+        a PV means no done PV.
+        :param done_values: Values of the done PVs when the move is completed. Default: 1
+        :param use_complete: Write the PVs with a put callback and wait for the puts to complete. Single value for all
+        PVs or list.
+        :param stall_time: Fail set_and_match if a readback does not get closer to the expected value for this many
+        seconds. Default: config.epics_set_and_match_stall_time
+        :param skip_unchanged: Do not write and check the PVs whose value did not change since the last successful
+        set_and_match. Default: config.epics_set_and_match_skip_unchanged
+        :param verify_every: When skipping unchanged PVs, check their readbacks every this many set_and_match calls
+        (0 means never). Default: config.epics_set_and_match_verify_every
+        :param check_first: Read the readbacks once before writing, and do not move the PVs that are already at their
+        set values. Default: config.epics_set_and_match_check_first
         """
         self.pv_names = convert_to_list(pv_names)
-        self.pvs = [self.connect(pv_name) for pv_name in self.pv_names]
+        self.readback_pv_name = convert_to_list(readback_pv_names) or self.pv_names
+        self.done_pv_names = convert_to_list(done_pv_names) or [None] * len(self.pv_names)
+
+        # Connect all the PVs of the group at once.
+        connected_pvs = iter(self.connect_all(self.pv_names +
+                                              (self.readback_pv_name if readback_pv_names else []) +
+                                              [pv_name for pv_name in self.done_pv_names if pv_name]))
+
+        self.pvs = [next(connected_pvs) for _ in self.pv_names]
 
         if readback_pv_names:
-            self.readback_pv_name = convert_to_list(readback_pv_names)
-            self.readback_pvs = [self.connect(pv_name) for pv_name in self.readback_pv_name]
+            self.readback_pvs = [next(connected_pvs) for _ in self.readback_pv_name]
         else:
-            self.readback_pv_name = self.pv_names
             self.readback_pvs = self.pvs
 
         self.tolerances = self._setup_tolerances(tolerances)
 
+        # The move is completed when all the requested completion strategies signal it.
+        self.readback_values = convert_to_list(readback_values) or [None] * len(self.pvs)
+        self.done_pvs = [next(connected_pvs) if pv_name else None for pv_name in self.done_pv_names]
+        self.done_values = convert_to_list(done_values) or [1] * len(self.pvs)
+        if isinstance(use_complete, list):
+            self.use_complete = use_complete
+        else:
+            self.use_complete = [bool(use_complete)] * len(self.pvs)
+        # The readback is checked when it is the only completion strategy, or if a tolerance or value is given for it.
+        explicit_tolerances = convert_to_list(tolerances) or [None] * len(self.pvs)
+        self.check_readbacks = [(done_pv is None and not complete) or tolerance is not None or
+                                readback_value is not None
+                                for done_pv, complete, tolerance, readback_value
+                                in zip(self.done_pvs, self.use_complete, explicit_tolerances, self.readback_values)]
+
+        # Velocity PVs are connected only when a continuous move is requested.
+        self.velocity_pvs = None
+        self._initial_velocities = None
+
+        self.use_monitors = config.epics_set_and_match_use_monitors if use_monitors is None else use_monitors
+        self.stall_time = config.epics_set_and_match_stall_time if stall_time is None else stall_time
+
+        self.skip_unchanged = config.epics_set_and_match_skip_unchanged if skip_unchanged is None else skip_unchanged
+        self.verify_every = config.epics_set_and_match_verify_every if verify_every is None else verify_every
+        # Values confirmed by the last successful set_and_match, None if the PV state is unknown.
+        self._confirmed_values = [None] * len(self.pvs)
+        self._n_set_and_match = 0
+
+        self.check_first = config.epics_set_and_match_check_first if check_first is None else check_first
+        # Number of PVs not moved (unchanged or already at the set value) by the last set_and_match.
+        self.n_skipped_moves = 0
+        # Readback and done values received from the monitors. Subscribed on the first set_and_match.
+        self._monitored_readback_values = None
+        self._monitored_done_values = None
+        self._readback_condition = Condition()
+        # Callbacks added to the PVs, removed when closing the group: (pv, callback index).
+        self._callbacks = []
+        # Readback values sampled by the last successful set_and_match.
+        self.last_readback_values = None
+
         # We also do not allow timeout to be zero.
         self.timeout = timeout or self.default_timeout
+        self.interrupt_event = interrupt_event
 
         # Verify if all provided lists are of same size.
-        validate_lists_length(self.pvs, self.readback_pvs, self.tolerances)
+        validate_lists_length(self.pvs, self.readback_pvs, self.tolerances, self.readback_values, self.done_pvs,
+                              self.done_values, self.use_complete)
 
         # Check if timeout is int or float.
         if not isinstance(self.timeout, (int, float)):
@@ -92,17 +354,32 @@ class WriteGroupInterface(object):
         # If the provided tolerances are empty, substitute them with a list of default tolerances.
         tolerances = convert_to_list(tolerances) or [config.max_float_tolerance] * len(self.pvs)
         # Each tolerance needs to be at least the size of the minimum tolerance.
-        tolerances = [max(config.max_float_tolerance, tolerance) for tolerance in tolerances]
+        tolerances = [max(config.max_float_tolerance, tolerance or 0) for tolerance in tolerances]
 
         return tolerances
 
+    def _wait(self, timeout):
+        """
+        Wait for the specified time, or until the interrupt event is set.
+        :param timeout: Time to wait in seconds.
+        :return: True if the waiting was interrupted.
+        """
+        if self.interrupt_event is None:
+            time.sleep(timeout)
+            return False
+
+        return self.interrupt_event.wait(timeout)
+
     def set_and_match(self, values, tolerances=None, timeout=None):
         """
-        Set the value and wait for the PV to reach it, within tollerance.
+        Set the value and wait for the completion strategies of the PVs (readback within tollerance, done PV, put
+        completion) to signal the end of the move.
+        If the interrupt event is set, the method returns without waiting for the values to be reached.
         :param values: Values to set (Must match the number of PVs in this group)
         :param tolerances: Tolerances for each PV (Must match the number of PVs in this group)
         :param timeout: Timeout, single value, to wait until the value is reached.
         :raise ValueError if any position cannot be reached.
+        :raise StallError if any readback stops moving towards the expected value (if stall_time is set).
         """
         values = convert_to_list(values)
         if not tolerances:
@@ -120,52 +397,368 @@ class WriteGroupInterface(object):
         if not isinstance(timeout, (int, float)):
             raise ValueError("Timeout must be int or float, but %s was provided." % timeout)
 
-        # Write all the PV values.
-        for pv, value in zip(self.pvs, values):
-            pv.put(value)
+        if self.use_monitors:
+            self._subscribe_readbacks()
 
-        # Boolean array to represent which PVs have reached their target value.s
-        within_tolerance = [False] * len(self.pvs)
-        initial_timestamp = time.time()
+        self.last_readback_values = None
 
-        # Read values until all PVs have reached the desired value or time has run out.
-        while (not all(within_tolerance)) and (time.time() - initial_timestamp < timeout):
-            # Get only the PVs that have not yet reached the final position.
-            for index, pv, tolerance in ((index, pv, tolerance) for index, pv, tolerance, values_reached
-                                         in zip(count(), self.readback_pvs, tolerances, within_tolerance)
-                                         if not values_reached):
+        # PVs that do not need to be moved, and the readback values sampled before moving.
+        move_completed = [False] * len(self.pvs)
+        readback_values = [None] * len(self.pvs)
 
-                current_value = pv.get()
-                expected_value = values[index]
+        if self.skip_unchanged:
+            self._n_set_and_match += 1
+
+            unchanged_indexes = [index for index, value, confirmed_value in zip(count(), values, self._confirmed_values)
+                                 if confirmed_value is not None and value == confirmed_value]
+
+            # Something else could have moved the PVs - check them from time to time.
+            if self.verify_every and self._n_set_and_match % self.verify_every == 0:
+                unchanged_indexes = self._read_completed_moves(unchanged_indexes, values, tolerances, readback_values)
+
+            for index in unchanged_indexes:
+                move_completed[index] = True
+
+        if self.check_first:
+            moving_indexes = [index for index, completed in enumerate(move_completed) if not completed]
+            for index in self._read_completed_moves(moving_indexes, values, tolerances, readback_values):
+                move_completed[index] = True
+
+        self.n_skipped_moves = sum(move_completed)
+
+        # The PV values are unknown until the move is completed.
+        self._confirmed_values = [None] * len(self.pvs)
+
+        trackers = None
+        if self.stall_time:
+            start_time = time.time()
+            # Only the checked readbacks are expected to get closer to their values.
+            trackers = [_TrajectoryTracker(self._get_expected_readback_value(index, value), tolerance,
+                                           self.stall_time, start_time) if self.check_readbacks[index] else None
+                        for index, value, tolerance in zip(count(), values, tolerances)]
+
+        # Write all the PV values.
+        for index, pv, value in zip(count(), self.pvs, values):
+            if move_completed[index]:
+                continue
+
+            if self.use_complete[index]:
+                pv.put(value, use_complete=True, callback=self._on_put_complete)
+            else:
+                pv.put(value)
+
+        if self.use_monitors:
+            # The monitored done values could still be from before the puts - read them from the IOC. Channel access
+            # processes requests to the same IOC in order, so these reads reflect the done state after the puts.
+            with self._readback_condition:
+                for index, done_pv in enumerate(self.done_pvs):
+                    if done_pv is not None:
+                        self._monitored_done_values[index] = done_pv.get(use_monitor=False)
+
+            move_completed = self._wait_for_readbacks(values, tolerances, timeout, trackers, move_completed)
+        else:
+            move_completed = self._poll_readbacks(values, tolerances, timeout, trackers, move_completed,
+                                                  readback_values)
 
-                if compare_channel_value(current_value, expected_value, tolerance):
-                    within_tolerance[index] = True
+        # Stop waiting, the caller is responsible for handling the interruption.
+        if move_completed is None:
+            return
 
-            time.sleep(self.default_get_sleep)
+        if all(move_completed):
+            self._confirmed_values = list(values)
 
-        if not all(within_tolerance):
+        if not all(move_completed):
             error_message = ""
             # Get the indexes that did not reach the supposed values.
-            for index in [index for index, reached_value in enumerate(within_tolerance) if not reached_value]:
+            for index in [index for index, completed in enumerate(move_completed) if not completed]:
                 expected_value = values[index]
                 pv_name = self.pv_names[index]
                 tolerance = tolerances[index]
 
-                error_message += "Cannot achieve value %s, on PV %s, with tolerance %s.\n" % \
-                         (expected_value, pv_name, tolerance)
+                if self.check_readbacks[index]:
+                    error_message += "Cannot achieve value %s, on PV %s, with tolerance %s.\n" % \
+                             (expected_value, pv_name, tolerance)
+
+                if self.done_pvs[index] is not None:
+                    error_message += "Done PV %s has to be %s.\n" % (self.done_pv_names[index],
+                                                                      self.done_values[index])
+
+                if self.use_complete[index] and not self.pvs[index].put_complete:
+                    error_message += "Put to PV %s did not complete.\n" % pv_name
 
             raise ValueError(error_message)
 
+    def _read_completed_moves(self, indexes, values, tolerances, readback_values):
+        """
+        Read the readback (and done) PVs once, to check which PVs are already at their set values. The PVs that do not
+        check the readback cannot be at a known value without moving them.
+        :param indexes: Indexes of the PVs to check.
+        :param values: Values to set.
+        :param tolerances: Tolerances for the readback values.
+        :param readback_values: List to store the read readback values in.
+        :return: Indexes of the PVs that are already at their set values.
+        """
+        completed_indexes = []
+        for index in (index for index in indexes if self.check_readbacks[index]):
+            readback_values[index] = self.readback_pvs[index].get()
+            done_value = self.done_pvs[index].get() if self.done_pvs[index] is not None else None
+
+            if self._is_move_completed(index, values[index], tolerances[index], readback_values[index], done_value):
+                completed_indexes.append(index)
+
+        return completed_indexes
+
+    def _get_expected_readback_value(self, index, value):
+        """
+        The readback is compared to the set value, unless a specific readback value is expected.
+        """
+        return value if self.readback_values[index] is None else self.readback_values[index]
+
+    def _check_stalls(self, trackers, move_completed, readback_values):
+        """
+        Add the current readback values to the trajectories, and check if any of the moving PVs stalled.
+        :param trackers: Trajectory trackers of the PVs, None if stall detection is disabled.
+        :param move_completed: List of booleans, which PVs completed the move.
+        :param readback_values: Current readback values.
+        :raise StallError if any PV that did not complete the move stalled.
+        """
+        if trackers is None:
+            return
+
+        timestamp = time.time()
+        stalled_indexes = []
+
+        for index in (index for index, completed in enumerate(move_completed) if not completed):
+            # The PV does not check the readback.
+            if trackers[index] is None:
+                continue
+
+            trackers[index].add_sample(timestamp, readback_values[index])
+            if trackers[index].is_stalled(timestamp):
+                stalled_indexes.append(index)
+
+        if stalled_indexes:
+            raise StallError(trajectories={self.pv_names[index]: trackers[index].samples for index in stalled_indexes},
+                             expected_values={self.pv_names[index]: trackers[index].expected_value
+                                              for index in stalled_indexes},
+                             stall_time=self.stall_time)
+
+    def _is_move_completed(self, index, value, tolerance, readback_value, done_value):
+        """
+        Check if all the completion strategies of the PV signal the end of the move. The readback is compared only if
+        it is checked for the PV (see check_readbacks).
+        :param index: Index of the PV in the group.
+        :param value: Value written to the PV.
+        :param tolerance: Tolerance for the readback value.
+        :param readback_value: Current value of the readback PV.
+        :param done_value: Current value of the done PV (ignored if the PV has no done PV).
+        :return: True if the move is completed.
+        """
+        if self.check_readbacks[index] and \
+                not compare_channel_value(readback_value, self._get_expected_readback_value(index, value), tolerance):
+            return False
+
+        if self.done_pvs[index] is not None and not compare_channel_value(done_value, self.done_values[index]):
+            return False
+
+        if self.use_complete[index] and not self.pvs[index].put_complete:
+            return False
+
+        return True
+
+    def _poll_readbacks(self, values, tolerances, timeout, trackers=None, move_completed=None, readback_values=None):
+        """
+        Read the readback PVs until the moves of all PVs are completed.
+        :param move_completed: PVs that do not need to be checked. Default: all PVs are checked.
+        :param readback_values: Readback values already sampled. Default: none.
+        :return: List of booleans, which PVs completed the move. None if the waiting was interrupted.
+        """
+        # Boolean array to represent which PVs have completed the move.
+        move_completed = list(move_completed or [False] * len(self.pvs))
+        readback_values = list(readback_values or [None] * len(self.pvs))
+        initial_timestamp = time.time()
+
+        # Read values until all PVs have completed the move or time has run out.
+        while (not all(move_completed)) and (time.time() - initial_timestamp < timeout):
+            # Check only the PVs that have not yet completed the move.
+            for index in (index for index, completed in enumerate(move_completed) if not completed):
+                readback_values[index] = self.readback_pvs[index].get()
+                done_value = self.done_pvs[index].get() if self.done_pvs[index] is not None else None
+
+                if self._is_move_completed(index, values[index], tolerances[index], readback_values[index],
+                                           done_value):
+                    move_completed[index] = True
+
+            self._check_stalls(trackers, move_completed, readback_values)
+
+            if self._wait(self.default_get_sleep):
+                return None
+
+        # The readbacks of the skipped PVs might not be sampled.
+        if not any(readback_value is None for readback_value in readback_values):
+            self.last_readback_values = readback_values
+
+        return move_completed
+
+    def _subscribe_readbacks(self):
+        """
+        Subscribe to the readback and done PVs monitors, if not subscribed yet.
+        """
+        if self._monitored_readback_values is not None:
+            return
+
+        with self._readback_condition:
+            self._monitored_readback_values = [pv.get() for pv in self.readback_pvs]
+            self._monitored_done_values = [pv.get() if pv is not None else None for pv in self.done_pvs]
+
+        for index, pv in enumerate(self.readback_pvs):
+            pv.auto_monitor = True
+            self._callbacks.append((pv, pv.add_callback(self._on_readback_change, with_ctrlvars=False,
+                                                        readback_index=index)))
+
+        for index, pv in enumerate(self.done_pvs):
+            if pv is not None:
+                pv.auto_monitor = True
+                self._callbacks.append((pv, pv.add_callback(self._on_done_change, with_ctrlvars=False,
+                                                            done_index=index)))
+
+    def _on_readback_change(self, value=None, readback_index=None, **kwargs):
+        """
+        Monitor callback of the readback PVs.
+        """
+        with self._readback_condition:
+            self._monitored_readback_values[readback_index] = value
+            self._readback_condition.notify_all()
+
+    def _on_done_change(self, value=None, done_index=None, **kwargs):
+        """
+        Monitor callback of the done PVs.
+        """
+        with self._readback_condition:
+            self._monitored_done_values[done_index] = value
+            self._readback_condition.notify_all()
+
+    def _on_put_complete(self, **kwargs):
+        """
+        Put callback of the PVs written with use_complete.
+        """
+        with self._readback_condition:
+            self._readback_condition.notify_all()
+
+    def _wait_for_readbacks(self, values, tolerances, timeout, trackers=None, skipped=None):
+        """
+        Wait for the readback and done monitors (and the put callbacks) to signal the end of the move.
+        :param skipped: PVs that do not need to be checked. Default: all PVs are checked.
+        :return: List of booleans, which PVs completed the move. None if the waiting was interrupted.
+        """
+        deadline = time.monotonic() + timeout
+        skipped = skipped or [False] * len(self.pvs)
+
+        with self._readback_condition:
+            while True:
+                move_completed = [is_skipped or
+                                  self._is_move_completed(index, value, tolerance, readback_value, done_value)
+                                  for index, is_skipped, value, tolerance, readback_value, done_value
+                                  in zip(count(), skipped, values, tolerances, self._monitored_readback_values,
+                                         self._monitored_done_values)]
+
+                if all(move_completed):
+                    self.last_readback_values = list(self._monitored_readback_values)
+                    return move_completed
+
+                self._check_stalls(trackers, move_completed, self._monitored_readback_values)
+
+                if self.interrupt_event is not None and self.interrupt_event.is_set():
+                    return None
+
+                remaining_time = deadline - time.monotonic()
+                if remaining_time <= 0:
+                    return move_completed
+
+                # The interrupt event cannot wake up the condition - check it regularly.
+                self._readback_condition.wait(min(remaining_time, self.default_get_sleep))
+
+    def move(self, values, velocities=None):
+        """
+        Start moving the PVs to the values, without waiting for them to be reached.
+        :param values: Values to set (Must match the number of PVs in this group)
+        :param velocities: Velocities to set on the motor records before moving. Velocity 0 or None leaves the
+        velocity of the PV unchanged.
+        """
+        values = convert_to_list(values)
+        validate_lists_length(self.pvs, values)
+
+        # The PVs are not at any confirmed value while moving.
+        self._confirmed_values = [None] * len(self.pvs)
+
+        if velocities is not None:
+            velocities = convert_to_list(velocities)
+            validate_lists_length(self.pvs, velocities)
+
+            # Remember the initial velocities, so they can be restored after the move.
+            if self.velocity_pvs is None:
+                self.velocity_pvs = self.connect_all([self._get_velocity_pv_name(pv_name) for pv_name in self.pv_names])
+                self._initial_velocities = [pv.get() for pv in self.velocity_pvs]
+
+            for pv, velocity in zip(self.velocity_pvs, velocities):
+                if velocity:
+                    pv.put(velocity)
+
+        for pv, value in zip(self.pvs, values):
+            pv.put(value)
+
+    def restore_velocities(self):
+        """
+        Restore the velocities the PVs had before the first move with velocities.
+        """
+        if self._initial_velocities is None:
+            return
+
+        for pv, velocity in zip(self.velocity_pvs, self._initial_velocities):
+            pv.put(velocity)
+
+        self._initial_velocities = None
+
+    def read_readbacks(self):
+        """
+        Read the current values of the readback PVs.
+        :return: List of readback values.
+        """
+        return [pv.get() for pv in self.readback_pvs]
+
+    @staticmethod
+    def _get_velocity_pv_name(pv_name):
+        """
+        Get the velocity field of the motor record the PV belongs to.
+        :param pv_name: PV name, with or without the record field.
+        :return: Velocity PV name.
+        """
+        record_name = pv_name.split(".")[0]
+        return "%s.%s" % (record_name, config.epics_motor_velocity_field)
+
     @staticmethod
     def connect(pv_name):
-        return connect_to_pv(pv_name)
+        return pv_pool.acquire([pv_name])[0]
+
+    @staticmethod
+    def connect_all(pv_names):
+        return pv_pool.acquire(pv_names)
 
     def close(self):
         """
-        Close all PV connections.
+        Return all the PVs to the connection pool.
         """
-        for pv in self.pvs:
-            pv.disconnect()
+        for pv, callback_index in self._callbacks:
+            pv.remove_callback(callback_index)
+        self._callbacks = []
+
+        pvs = self.pvs + [pv for pv in self.done_pvs if pv is not None] + (self.velocity_pvs or [])
+        # The readback PVs are the same as the PVs if no readback PV names were provided.
+        if self.readback_pvs is not self.pvs:
+            pvs += self.readback_pvs
+
+        pv_pool.release(pvs)
+        self.pvs, self.readback_pvs, self.done_pvs, self.velocity_pvs = [], [], [], None
 
 
 class ReadGroupInterface(object):
@@ -173,36 +766,166 @@ class ReadGroupInterface(object):
     Manage group of read PVs.
     """
 
-    def __init__(self, pv_names):
+    def __init__(self, pv_names, bulk_read=None, timeouts=None):
         """
         Initialize the group.
         :param pv_names: PV names (or name, list or single string) to connect to. 
+        :param bulk_read: Request the values of all PVs at once, and then collect them.
+        Default: config.epics_bulk_read
+        :param timeouts: Timeouts for reading each PV in a bulk read, single value for all PVs or list.
+        Default: config.epics_default_read_timeout
         """
         self.pv_names = convert_to_list(pv_names)
-        self.pvs = [self.connect(pv_name) for pv_name in self.pv_names]
+        self.pvs = self.connect_all(self.pv_names)
+        # Callbacks added to the PVs, removed when closing the group: (pv, callback index).
+        self._callbacks = []
+
+        self.bulk_read = config.epics_bulk_read if bulk_read is None else bulk_read
+
+        if isinstance(timeouts, list):
+            self.timeouts = timeouts
+        else:
+            self.timeouts = [timeouts or config.epics_default_read_timeout] * len(self.pvs)
+
+        validate_lists_length(self.pvs, self.timeouts)
 
     def read(self, current_position_index=None, retry=None):
         """
-        Read PVs one by one.
+        Read PVs one by one, or all at once if using bulk read.
         :param current_position_index: Index of the current scan.
         :param retry: Is this the first read attempt or a retry.
         :return: Result
         """
+        if self.bulk_read:
+            return self._read_bulk()
+
         result = []
         for pv in self.pvs:
             result.append(pv.get())
 
         return result
 
+    def _read_bulk(self):
+        """
+        Request the values of all PVs without waiting, flush the requests once, and then collect the values.
+        :return: Values in the order of the PVs.
+        :raise ValueError listing all the PVs that timed out.
+        """
+        for pv in self.pvs:
+            ca.get(pv.chid, wait=False)
+        ca.poll()
+
+        # Each PV timeout starts when the requests are flushed.
+        start_time = time.monotonic()
+
+        result = []
+        timed_out_pv_names = []
+        for pv, pv_name, timeout in zip(self.pvs, self.pv_names, self.timeouts):
+            value = ca.get_complete(pv.chid, timeout=max(timeout - (time.monotonic() - start_time), 0))
+
+            if value is None:
+                timed_out_pv_names.append("%s (timeout %s seconds)" % (pv_name, timeout))
+            result.append(value)
+
+        if timed_out_pv_names:
+            raise ValueError("Reading timed out for %d PV(s):\n%s" %
+                             (len(timed_out_pv_names), "\n".join(timed_out_pv_names)))
+
+        return result
+
+    def add_change_callback(self, callback):
+        """
+        Subscribe to the value changes of all the PVs in the group.
+        :param callback: Function to call when any of the PV values changes.
+        Signature: def callback(pvname, value, **kwargs)
+        """
+        for pv in self.pvs:
+            pv.auto_monitor = True
+            self._callbacks.append((pv, pv.add_callback(callback, with_ctrlvars=False)))
+
     @staticmethod
     def connect(pv_name):
-        return connect_to_pv(pv_name)
+        return pv_pool.acquire([pv_name])[0]
+
+    @staticmethod
+    def connect_all(pv_names):
+        return pv_pool.acquire(pv_names)
 
     def close(self):
         """
-        Close all PV connections.
+        Return all the PVs to the connection pool.
         """
-        for pv in self.pvs:
-            pv.disconnect()
+        for pv, callback_index in self._callbacks:
+            pv.remove_callback(callback_index)
+        self._callbacks = []
+
+        pv_pool.release(self.pvs)
+        self.pvs = []
+
+
+class MonitoredReadGroupInterface(ReadGroupInterface):
+    """
+    Manage group of read PVs, whose values are received with monitors and read from memory.
+    """
+
+    def __init__(self, pv_names, timeout=None):
+        """
+        Initialize the group and subscribe to the PV monitors.
+        :param pv_names: PV names (or name, list or single string) to connect to.
+        :param timeout: Time to wait for new values of all PVs. Default: config.epics_monitored_read_timeout
+        """
+        super(MonitoredReadGroupInterface, self).__init__(pv_names, bulk_read=False)
+        self.timeout = timeout or config.epics_monitored_read_timeout
+        # Only values sampled at or after this time are returned. None accepts any value.
+        self.min_timestamp = None
+
+        self._condition = Condition()
+        with self._condition:
+            self._values = [pv.get() for pv in self.pvs]
+            self._timestamps = [getattr(pv, "timestamp", None) for pv in self.pvs]
+
+        for index, pv in enumerate(self.pvs):
+            pv.auto_monitor = True
+            self._callbacks.append((pv, pv.add_callback(self._on_value_change, with_ctrlvars=False, pv_index=index)))
+
+    def _on_value_change(self, value=None, timestamp=None, pv_index=None, **kwargs):
+        """
+        Monitor callback of the PVs.
+        """
+        with self._condition:
+            self._values[pv_index] = value
+            self._timestamps[pv_index] = timestamp
+            self._condition.notify_all()
+
+    def set_min_timestamp(self, timestamp):
+        """
+        Accept only the values sampled at or after the given time, for example the end of the last move.
+        :param timestamp: Local time (time.time()) - like for bs read, the IOC timestamps are compared to it.
+        """
+        self.min_timestamp = timestamp
+
+    def read(self, current_position_index=None, retry=False):
+        """
+        Return the cached PV values, once all of them were sampled after the min timestamp.
+        :param current_position_index: Index of the current scan.
+        :param retry: Is this the first read attempt or a retry.
+        :return: Result
+        """
+        min_timestamp = self.min_timestamp
+        deadline = time.monotonic() + self.timeout
+
+        with self._condition:
+            while True:
+                stale_indexes = [index for index, timestamp in enumerate(self._timestamps)
+                                 if timestamp is None or (min_timestamp is not None and timestamp < min_timestamp)]
+
+                if not stale_indexes:
+                    return list(self._values)
 
+                remaining_time = deadline - time.monotonic()
+                if remaining_time <= 0:
+                    raise Exception("Read timeout exceeded for monitored EPICS PVs. No value sampled after the end of "
+                                    "the last move received in %s seconds for:\n%s" %
+                                    (self.timeout, "\n".join(self.pv_names[index] for index in stale_indexes)))
 
+                self._condition.wait(remaining_time)
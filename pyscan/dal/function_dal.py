@@ -17,17 +17,21 @@ class FunctionProxy(object):
         Read the results from all the provided functions.
         :return: Read results.
         """
-        results = []
-        for func in self.functions:
-            # The function either accepts the current position index, or nothing.
-            try:
-                result = func.call_function()
-            except TypeError:
-                result = func.call_function(current_position_index)
+        return [self.read_function(func, current_position_index) for func in self.functions]
 
-            results.append(result)
-
-        return results
+    @staticmethod
+    def read_function(func, current_position_index=None):
+        """
+        Read the result of a single function.
+        :param func: FUNCTION_VALUE to read.
+        :param current_position_index: Index of the current position, passed to the function if it accepts it.
+        :return: Read result.
+        """
+        # The function either accepts the current position index, or nothing.
+        try:
+            return func.call_function()
+        except TypeError:
+            return func.call_function(current_position_index)
 
     def write(self, values):
         """
@@ -0,0 +1,247 @@
+import math
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Lock
+from time import monotonic
+
+from pyscan import config
+
+# Percentiles reported in the instrumentation summary.
+SUMMARY_PERCENTILES = [50, 95, 99]
+
+
+class StreamingHistogram(object):
+    """
+    Histogram with logarithmic buckets, to estimate percentiles of a stream of values in constant memory.
+    """
+
+    # Values smaller than this are counted as zero.
+    min_value = 1e-9
+
+    def __init__(self, relative_accuracy=0.01):
+        """
+        Initialize the histogram.
+        :param relative_accuracy: Relative accuracy of the estimated percentiles.
+        """
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._buckets = {}
+        self._n_zeros = 0
+
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        """
+        Add a value to the histogram.
+        :param value: Value to add. Negative values are counted as zero.
+        """
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+        if value < self.min_value:
+            self._n_zeros += 1
+        else:
+            index = int(math.ceil(math.log(value) / self._log_gamma))
+            self._buckets[index] = self._buckets.get(index, 0) + 1
+
+    def get_percentile(self, percentile):
+        """
+        Estimate the percentile of the added values.
+        :param percentile: Percentile to estimate (0 - 100).
+        :return: Estimated value, or None if no values were added.
+        """
+        if not self.count:
+            return None
+
+        rank = (percentile / 100.0) * (self.count - 1)
+
+        n_values = self._n_zeros
+        if rank < n_values:
+            return max(self.min, 0.0)
+
+        for index in sorted(self._buckets):
+            n_values += self._buckets[index]
+
+            if rank < n_values:
+                # The middle of the bucket, limited by the known extremes.
+                value = 2 * (self._gamma ** index) / (self._gamma + 1)
+                return min(max(value, self.min), self.max)
+
+        return self.max
+
+    def get_summary(self):
+        """
+        Get the summary of the added values.
+        :return: Dictionary with count, total, max and the summary percentiles (p50, p95, p99).
+        """
+        summary = OrderedDict([("count", self.count), ("total", self.total)])
+
+        for percentile in SUMMARY_PERCENTILES:
+            summary["p%d" % percentile] = self.get_percentile(percentile)
+
+        summary["max"] = self.max
+
+        return summary
+
+
+class NullInstrumentation(object):
+    """
+    Instrumentation that does not record anything. Used when the scan is not instrumented.
+    """
+
+    @contextmanager
+    def stage(self, name, position_index=None):
+        yield
+
+    def step_started(self, position_index):
+        pass
+
+    def step_finished(self):
+        pass
+
+    def record(self, name, value):
+        pass
+
+    def set_statistics(self, name, statistics):
+        pass
+
+
+class ScanInstrumentation(NullInstrumentation):
+    """
+    Record how much time each stage of each scan step takes.
+    """
+
+    def __init__(self, slow_step_factor=None, slow_step_callback=None, keep_trace=True):
+        """
+        Initialize the instrumentation.
+        :param slow_step_factor: A step is slow when it takes longer than this multiple of the running median step
+        time. Default: config.instrumentation_slow_step_factor
+        :param slow_step_callback: Function to call when a step is slow.
+        Signature: def callback(position_index, step_time, median_step_time, stages)
+        :param keep_trace: Keep the stage times of every step, to be retrieved with get_trace().
+        """
+        self.slow_step_factor = slow_step_factor or config.instrumentation_slow_step_factor
+        self.slow_step_callback = slow_step_callback
+        self.keep_trace = keep_trace
+
+        self._lock = Lock()
+        self._histograms = OrderedDict()
+        self._trace = OrderedDict()
+        self._statistics = OrderedDict()
+
+        self._current_position_index = None
+        self._current_step_start = None
+
+    def _add_to_histogram(self, name, value):
+        if name not in self._histograms:
+            self._histograms[name] = StreamingHistogram()
+
+        self._histograms[name].add(value)
+
+    def _get_step(self, position_index):
+        if position_index not in self._trace:
+            self._trace[position_index] = OrderedDict([("position_index", position_index),
+                                                       ("step_time", None),
+                                                       ("stages", [])])
+
+        return self._trace[position_index]
+
+    @contextmanager
+    def stage(self, name, position_index=None):
+        """
+        Measure the time of a stage in a scan step.
+        :param name: Name of the stage.
+        :param position_index: Index of the step the stage belongs to. Default: the current step.
+        """
+        if position_index is None:
+            position_index = self._current_position_index
+
+        start_time = monotonic()
+        try:
+            yield
+        finally:
+            stage_time = monotonic() - start_time
+
+            with self._lock:
+                self._add_to_histogram(name, stage_time)
+
+                if self.keep_trace:
+                    self._get_step(position_index)["stages"].append((name, stage_time))
+
+    def step_started(self, position_index):
+        """
+        Mark the beginning of a scan step.
+        :param position_index: Index of the step.
+        """
+        self._current_position_index = position_index
+        self._current_step_start = monotonic()
+
+    def step_finished(self):
+        """
+        Mark the end of the current scan step. Calls the slow step callback, if the step was slow.
+        """
+        step_time = monotonic() - self._current_step_start
+        position_index = self._current_position_index
+
+        with self._lock:
+            step_histogram = self._histograms.get("step")
+            median_step_time = step_histogram.get_percentile(50) if step_histogram else None
+
+            self._add_to_histogram("step", step_time)
+
+            stages = []
+            if self.keep_trace:
+                step = self._get_step(position_index)
+                step["step_time"] = step_time
+                stages = list(step["stages"])
+
+        if self.slow_step_callback and median_step_time and step_time > self.slow_step_factor * median_step_time:
+            self.slow_step_callback(position_index, step_time, median_step_time, stages)
+
+    def record(self, name, value):
+        """
+        Record a value that is not a stage time (for example, a timing error).
+        :param name: Name of the value.
+        :param value: Value to record.
+        """
+        with self._lock:
+            self._add_to_histogram(name, value)
+
+    def set_statistics(self, name, statistics):
+        """
+        Attach the statistics of a data source (for example, the bs stream) to the instrumentation.
+        :param name: Name of the data source.
+        :param statistics: Dictionary with the statistics of the data source.
+        """
+        with self._lock:
+            self._statistics[name] = statistics
+
+    def get_statistics(self):
+        """
+        Get the statistics of the data sources attached during the scan.
+        :return: Dictionary {source name: statistics}. The bs stream statistics are under "bs".
+        """
+        with self._lock:
+            return OrderedDict(self._statistics)
+
+    def get_summary(self):
+        """
+        Get the statistics of all stages and recorded values.
+        :return: Dictionary {name: {"count", "total", "p50", "p95", "p99", "max"}}. The "step" entry is the
+        time of the complete scan steps.
+        """
+        with self._lock:
+            return OrderedDict((name, histogram.get_summary()) for name, histogram in self._histograms.items())
+
+    def get_trace(self):
+        """
+        Get the stage times of every step.
+        :return: List of {"position_index", "step_time", "stages": [(name, time), ...]}
+        """
+        with self._lock:
+            return [OrderedDict(step, stages=list(step["stages"])) for step in self._trace.values()]
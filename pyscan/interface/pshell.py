@@ -1,4 +1,6 @@
-from pyscan import scan, action_restore, ZigZagVectorPositioner, VectorPositioner, CompoundPositioner
+from time import sleep
+
+from pyscan import scan, scanner, action_restore, ZigZagVectorPositioner, VectorPositioner, CompoundPositioner
 from pyscan.scan import EPICS_READER
 from pyscan.positioner.area import AreaPositioner, ZigZagAreaPositioner
 from pyscan.positioner.line import ZigZagLinePositioner, LinePositioner
@@ -211,6 +213,8 @@ def cscan(writables, readables, start, end, steps, latency=0.0, time=None, relat
         relative (bool, optional): if true, start and end positions are relative to 
             current at start of the scan
         latency(float, optional): sleep time in each step before readout, defaults to 0.0.
+        passes(int, optional): number of passes. Only a single pass is supported, ValueError otherwise.
+        zigzag(bool, optional): not supported, ValueError if true.
         before_read (function, optional): callback on each step, before each readout. 
                     Callback may have as optional parameters list of positions.
         after_read (function, optional): callback on each step, after each readout. 
@@ -221,7 +225,28 @@ def cscan(writables, readables, start, end, steps, latency=0.0, time=None, relat
         ScanResult object.
 
     """
-    raise NotImplementedError("Continuous scan not supported.")
+    if time is None:
+        raise ValueError("Continuous scan needs the move time to calculate the writables speeds.")
+
+    if passes != 1 or zigzag:
+        raise ValueError("Continuous scan supports only a single pass without zigzag, but passes=%s and zigzag=%s "
+                         "were given." % (passes, zigzag))
+
+    offsets, finalization_actions, _ = _generate_scan_parameters(relative, writables, latency)
+    n_steps, step_size = _convert_steps_parameter(steps)
+
+    # The positioner defines the start and end of the move, and the number of samples.
+    positioner = LinePositioner(start=start, end=end, step_size=step_size, n_steps=n_steps, offsets=offsets)
+    settings = scan_settings(move_time=time)
+
+    # The latency is waited before each readout, while the writables keep moving.
+    if latency:
+        before_read = [lambda: sleep(latency)] + (convert_to_list(before_read) or [])
+
+    scanner_instance = scanner(positioner, readables, writables, before_read=before_read, after_read=after_read,
+                               settings=settings, finalization=finalization_actions)
+
+    return scanner_instance.continuous_scan()
 
 
 def hscan(config, writable, readables, start, end, steps, passes=1, zigzag=False, before_stream=None, after_stream=None,
@@ -0,0 +1,115 @@
+import json
+import os
+
+import numpy
+
+
+def _convert_to_json(value):
+    # Numpy arrays and values are stored with their dtype, so they can be restored with the same type.
+    if isinstance(value, numpy.ndarray):
+        return {"__numpy_array__": value.tolist(), "dtype": value.dtype.str}
+
+    if isinstance(value, numpy.generic):
+        return {"__numpy_value__": value.tolist(), "dtype": value.dtype.str}
+
+    raise TypeError("Cannot write the value %r of type %s to the scan journal." % (value, type(value).__name__))
+
+
+def _convert_from_json(dictionary):
+    if "__numpy_array__" in dictionary:
+        return numpy.array(dictionary["__numpy_array__"], dtype=dictionary["dtype"])
+
+    if "__numpy_value__" in dictionary:
+        return numpy.array(dictionary["__numpy_value__"], dtype=dictionary["dtype"])[()]
+
+    return dictionary
+
+
+class ScanJournal(object):
+    """
+    Journal of the completed scan positions, one JSON line per position. Used to resume interrupted scans.
+    """
+
+    def __init__(self, filename):
+        """
+        Initialize the journal.
+        :param filename: File to append the journal entries to. It is created if it does not exist.
+        """
+        self.filename = filename
+
+    def append(self, position_index, position, pointer=None):
+        """
+        Append a completed position to the journal.
+        :param position_index: Index (1 based) of the completed position.
+        :param position: Position at which the data was read.
+        :param pointer: Where the data processor persisted the data of this position (returned by process).
+        :raise TypeError if the position or pointer contain values that are not JSON serializable (or numpy).
+        """
+        entry = {"index": position_index,
+                 "position": position,
+                 "pointer": pointer}
+
+        # Serialize before opening the file, so that a failure does not leave an incomplete line.
+        line = json.dumps(entry, default=_convert_to_json)
+
+        with open(self.filename, "a") as journal_file:
+            journal_file.write(line + "\n")
+            journal_file.flush()
+
+    def is_empty(self):
+        """
+        Check if the journal has no entries.
+        :return: True if the journal file does not exist or is empty.
+        """
+        return not os.path.exists(self.filename) or os.path.getsize(self.filename) == 0
+
+    def is_same_file(self, journal):
+        """
+        Check if the other journal writes to the same file.
+        :param journal: Journal to compare to.
+        :return: True if both journals use the same file.
+        """
+        return os.path.abspath(self.filename) == os.path.abspath(journal.filename)
+
+    @staticmethod
+    def position_matches(entry, position):
+        """
+        Check if the journal entry was written for the position.
+        :param entry: Journal entry.
+        :param position: Position to compare to.
+        :return: True if the entry position is the same as the position.
+        """
+        return json.dumps(entry["position"], default=_convert_to_json) == json.dumps(position, default=_convert_to_json)
+
+    def read(self):
+        """
+        Read the journal entries.
+        :return: List of {"index", "position", "pointer"}, in the order they were appended. Empty if the journal file
+        does not exist.
+        """
+        if not os.path.exists(self.filename):
+            return []
+
+        entries = []
+        with open(self.filename) as journal_file:
+            for line in journal_file:
+                # The last line is incomplete if the scan was killed while writing it.
+                try:
+                    entries.append(json.loads(line, object_hook=_convert_from_json))
+                except ValueError:
+                    break
+
+        return entries
+
+    def get_completed(self):
+        """
+        Get the entries of the positions completed without interruption from the beginning of the scan.
+        :return: List of entries, where the entry at list index i is for position index i + 1.
+        """
+        completed = []
+        for entry in self.read():
+            # Positions are processed in order, so later entries for the same index are from a repeated scan.
+            if entry["index"] == len(completed) + 1:
+                completed.append(entry)
+
+        return completed
@@ -1,5 +1,6 @@
 import math
 from copy import copy
+from itertools import islice
 
 from pyscan.utils import convert_to_list
 
@@ -59,32 +60,57 @@ class AreaPositioner(object):
             self.n_steps = [math.floor((end - start) / step_size) for start, end, step_size
                             in zip(self.start, self.end, self.step_size)]
 
-    def get_generator(self):
-        for _ in range(self.passes):
-            positions = copy(self.start)
-            # Return the initial state.
-            yield copy(positions)
+    def __len__(self):
+        # Each axis has n_steps + 1 positions, and all their combinations are visited in each pass.
+        n_positions = 1
+        for n_steps in self.n_steps:
+            n_positions *= n_steps + 1
+
+        return self.passes * n_positions
+
+    def _get_pass_generator(self):
+        """
+        Generate the positions of a single pass. The last axis changes the fastest.
+        """
+        positions = copy(self.start)
+        # Return the initial state.
+        yield copy(positions)
+
+        # Recursive call to print all axis values.
+        def scan_axis(axis_number):
+            # We should not scan axis that do not exist.
+            if not axis_number < self.n_axis:
+                return
+
+            # Output all position on the next axis while this axis is still at the start position.
+            yield from scan_axis(axis_number + 1)
+
+            # Move axis step by step.
+            for _ in range(self.n_steps[axis_number]):
+                positions[axis_number] = positions[axis_number] + self.step_size[axis_number]
+                yield copy(positions)
+                # Output all positions from the next axis for each value of this axis.
+                yield from scan_axis(axis_number + 1)
 
-            # Recursive call to print all axis values.
-            def scan_axis(axis_number):
-                # We should not scan axis that do not exist.
-                if not axis_number < self.n_axis:
-                    return
+            # Clean up after the loop - return the axis value back to the start value.
+            positions[axis_number] = self.start[axis_number]
 
-                # Output all position on the next axis while this axis is still at the start position.
-                yield from scan_axis(axis_number + 1)
+        yield from scan_axis(0)
 
-                # Move axis step by step.
-                for _ in range(self.n_steps[axis_number]):
-                    positions[axis_number] = positions[axis_number] + self.step_size[axis_number]
-                    yield copy(positions)
-                    # Output all positions from the next axis for each value of this axis.
-                    yield from scan_axis(axis_number + 1)
+    def get_generator(self, start_index=0):
+        n_positions_in_pass = len(self) // self.passes
+        # Pass and index in the pass of the first position to generate.
+        first_pass, first_index = divmod(start_index, n_positions_in_pass)
 
-                # Clean up after the loop - return the axis value back to the start value.
-                positions[axis_number] = self.start[axis_number]
+        for pass_number in range(first_pass, self.passes):
+            pass_generator = self._get_pass_generator()
 
-            yield from scan_axis(0)
+            # The positions are accumulated step by step - compute (without yielding) the skipped positions of a pass
+            # that does not start at the beginning, so the positions are the same as in a pass from the beginning.
+            if pass_number == first_pass and first_index:
+                pass_generator = islice(pass_generator, first_index, None)
+
+            yield from pass_generator
 
 
 class ZigZagAreaPositioner(AreaPositioner):
@@ -154,6 +180,14 @@ class MultiAreaPositioner(object):
             # TODO: Raise an exception.
             pass
 
+    def __len__(self):
+        # Only the first step count of each axis is used when generating positions.
+        n_positions = 1
+        for axis_n_steps in self.n_steps:
+            n_positions *= axis_n_steps[0] + 1
+
+        return self.passes * n_positions
+
     def get_generator(self):
         for _ in range(self.passes):
             positions = copy(self.start)
@@ -1,21 +1,35 @@
-
 class BsreadPositioner(object):
-    def __init__(self, n_messages):
+    def __init__(self, n_messages, block_size=None, aggregation=None):
         """
         Acquire N consecutive messages from the stream.
         :param n_messages: Number of messages to acquire.
+        :param block_size: Acquire the messages in blocks of this many messages. Each block is read into arrays,
+        validated and processed at once. Only bs readables and bs conditions can be used in block mode.
+        :param aggregation: How to aggregate the bs values of the consecutive messages read at each position, when the
+        scan n_measurements > 1 (BsAggregation.Mean, Std or All). Default: BsAggregation.All
         """
         self.n_messages = n_messages
+        self.aggregation = aggregation
+
+        if block_size is not None and block_size < 1:
+            raise ValueError("Block size must be at least 1, but %s was given." % block_size)
+        self.block_size = block_size
+        # The scan acquires the positions in blocks of block_size positions (Scanner.block_scan).
+        self.supports_block_acquisition = block_size is not None
+
         self.bs_reader = None
 
+    def __len__(self):
+        return self.n_messages
+
     def set_bs_reader(self, bs_reader):
         self.bs_reader = bs_reader
 
-    def get_generator(self):
+    def get_generator(self, start_index=0):
 
         if self.bs_reader is None:
             raise RuntimeError("Set bs_reader before using this generator.")
 
-        for index in range(self.n_messages):
+        for index in range(start_index, self.n_messages):
             self.bs_reader.read(index)
             yield index
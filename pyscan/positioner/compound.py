@@ -1,5 +1,5 @@
 from copy import copy
-from pyscan.utils import convert_to_list
+from pyscan.utils import convert_to_list, seek_generator
 
 
 class CompoundPositioner(object):
@@ -10,12 +10,31 @@ class CompoundPositioner(object):
         self.positioners = positioners
         self.n_positioners = len(positioners)
 
-    def get_generator(self):
-        def walk_positioner(index, output_positions):
+    def __len__(self):
+        # Raises TypeError if any of the positioners does not know its length.
+        n_positions = 1
+        for positioner in self.positioners:
+            n_positions *= len(positioner)
+
+        return n_positions
+
+    def get_generator(self, start_index=0):
+        # Index to start from in each of the positioners. The last positioner changes the fastest.
+        start_indexes = [0] * self.n_positioners
+        if start_index:
+            for index in reversed(range(1, self.n_positioners)):
+                start_index, start_indexes[index] = divmod(start_index, len(self.positioners[index]))
+            start_indexes[0] = start_index
+
+        def walk_positioner(index, output_positions, seek):
             if index == self.n_positioners:
                 yield copy(output_positions)
             else:
-                for current_positions in self.positioners[index].get_generator():
-                    yield from walk_positioner(index+1, output_positions + convert_to_list(current_positions))
+                # Only the first walk through each positioner starts from the seek position.
+                generator = seek_generator(self.positioners[index], start_indexes[index] if seek else 0)
+
+                for position_number, current_positions in enumerate(generator):
+                    yield from walk_positioner(index+1, output_positions + convert_to_list(current_positions),
+                                               seek and position_number == 0)
 
-        yield from walk_positioner(0, [])
+        yield from walk_positioner(0, [], True)
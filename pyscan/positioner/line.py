@@ -61,13 +61,25 @@ class LinePositioner(object):
             # All the elements in n_steps_per_axis must be the same anyway.
             self.n_steps = n_steps_per_axis[0]
 
-    def get_generator(self):
-        for _ in range(self.passes):
+    def __len__(self):
+        return self.passes * (self.n_steps + 1)
+
+    def get_generator(self, start_index=0):
+        # Pass and step of the first position to generate.
+        first_pass, first_step = divmod(start_index, self.n_steps + 1)
+
+        for pass_number in range(first_pass, self.passes):
+            start_step = first_step if pass_number == first_pass else 0
+
             # The initial position is always the start position.
             current_positions = copy(self.start)
+            # Accumulate the skipped steps, so the positions are the same as in a pass from the beginning.
+            for __ in range(start_step):
+                current_positions = [position + step_size for position, step_size
+                                     in zip(current_positions, self.step_size)]
             yield current_positions
 
-            for __ in range(self.n_steps):
+            for __ in range(start_step, self.n_steps):
                 current_positions = [position + step_size for position, step_size
                                      in zip(current_positions, self.step_size)]
 
@@ -75,6 +87,10 @@ class LinePositioner(object):
 
 
 class ZigZagLinePositioner(LinePositioner):
+    def __len__(self):
+        # The turning points are not repeated between passes.
+        return 1 + (self.passes * self.n_steps)
+
     def get_generator(self):
         # The initial position is always the start position.
         current_positions = copy(self.start)
@@ -28,13 +28,24 @@ class SerialPositioner(object):
             for axis_positions, offset in zip(self.positions, self.offsets):
                 axis_positions[:] = [original_position + offset for original_position in axis_positions]
 
-    def get_generator(self):
-        for _ in range(self.passes):
+    def __len__(self):
+        return self.passes * sum(len(convert_to_list(axis_positions)) for axis_positions in self.positions)
+
+    def get_generator(self, start_index=0):
+        # First pass to generate, and how many positions to skip in it.
+        first_pass, n_positions_to_skip = divmod(start_index, len(self) // self.passes)
+
+        for _ in range(first_pass, self.passes):
             # For each axis.
             for axis_index in range(self.n_axis):
                 current_state = copy(self.initial_positions)
 
                 n_steps_in_axis = len(self.positions[axis_index])
-                for axis_position_index in range(n_steps_in_axis):
+
+                # Skip the whole axis if all its positions are before the start index.
+                first_axis_position_index = min(n_positions_to_skip, n_steps_in_axis)
+                n_positions_to_skip -= first_axis_position_index
+
+                for axis_position_index in range(first_axis_position_index, n_steps_in_axis):
                     current_state[axis_index] = convert_to_list(self.positions[axis_index])[axis_position_index]
                     yield copy(current_state)
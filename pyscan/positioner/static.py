@@ -7,6 +7,9 @@ class StaticPositioner(object):
         """
         self.n_images = n_images
 
-    def get_generator(self):
-        for index in range(self.n_images):
+    def __len__(self):
+        return self.n_images
+
+    def get_generator(self, start_index=0):
+        for index in range(start_index, self.n_images):
             yield index
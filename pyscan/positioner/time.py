@@ -23,11 +23,14 @@ class TimePositioner(object):
             n_intervals = 1
         self.n_intervals = n_intervals
 
-    def get_generator(self):
+    def __len__(self):
+        return self.n_intervals
+
+    def get_generator(self, start_index=0):
         measurement_time_start = time()
         last_time_to_sleep = 0
 
-        for _ in range(self.n_intervals):
+        for _ in range(start_index, self.n_intervals):
             measurement_time_stop = time()
             # How much time did the measurement take.
             measurement_time = measurement_time_stop - measurement_time_start
@@ -1,4 +1,4 @@
-from itertools import cycle, chain
+from itertools import cycle, chain, islice
 
 from pyscan.utils import convert_to_list
 
@@ -35,18 +35,25 @@ class VectorPositioner(object):
                 step_positions[:] = [original_position + offset
                                      for original_position, offset in zip(step_positions, self.offsets)]
 
-    def get_generator(self):
-        for _ in range(self.passes):
-            for position in self.positions:
-                yield position
+    def __len__(self):
+        return self.passes * self.n_positions
+
+    def get_generator(self, start_index=0):
+        for index in range(start_index, len(self)):
+            yield self.positions[index % self.n_positions]
 
 
 class ZigZagVectorPositioner(VectorPositioner):
-    def get_generator(self):
+    def __len__(self):
+        # First pass has the full number of items, each subsequent has one less (extreme sequence item).
+        return self.n_positions + ((self.passes - 1) * (self.n_positions - 1))
+
+    def get_generator(self, start_index=0):
         # This creates a generator for [0, 1, 2, 3... n, n-1, n-2.. 2, 1, 0.....]
         indexes = cycle(chain(range(0, self.n_positions, 1), range(self.n_positions - 2, 0, -1)))
-        # First pass has the full number of items, each subsequent has one less (extreme sequence item).
-        n_indexes = self.n_positions + ((self.passes - 1) * (self.n_positions - 1))
+        # The sequence repeats every 2 * (n - 1) positions.
+        period = max(2 * (self.n_positions - 1), 1)
+        indexes = islice(indexes, start_index % period, None)
 
-        for x in range(n_indexes):
+        for x in range(start_index, len(self)):
             yield self.positions[next(indexes)]
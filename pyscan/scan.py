@@ -1,4 +1,12 @@
 import logging
+import time
+from collections import OrderedDict
+from functools import partial
+from threading import Event
+
+import numpy
+
+from pyscan import config
 
 from pyscan.dal import epics_dal, bsread_dal, function_dal
 from pyscan.dal.function_dal import FunctionProxy
@@ -6,11 +14,13 @@ from pyscan.positioner.bsread import BsreadPositioner
 from pyscan.scanner import Scanner
 from pyscan.scan_parameters import EPICS_PV, EPICS_CONDITION, BS_PROPERTY, BS_CONDITION, scan_settings, convert_input, \
     FUNCTION_VALUE, FUNCTION_CONDITION, convert_conditions, ConditionAction, ConditionComparison
-from pyscan.utils import convert_to_list, SimpleDataProcessor, ActionExecutor, compare_channel_value
+from pyscan.utils import convert_to_list, SimpleDataProcessor, ActionExecutor, compare_channel_value, \
+    ConcurrentReader, compare_channel_values
 
 # Instances to use.
 EPICS_WRITER = epics_dal.WriteGroupInterface
 EPICS_READER = epics_dal.ReadGroupInterface
+EPICS_MONITORED_READER = epics_dal.MonitoredReadGroupInterface
 BS_READER = bsread_dal.ReadGroupInterface
 FUNCTION_PROXY = function_dal.FunctionProxy
 DATA_PROCESSOR = SimpleDataProcessor
@@ -20,17 +30,22 @@ _logger = logging.getLogger(__name__)
 
 
 def scan(positioner, readables, writables=None, conditions=None, before_read=None, after_read=None, initialization=None,
-         finalization=None, settings=None, data_processor=None, before_move=None, after_move=None):
+         finalization=None, settings=None, data_processor=None, before_move=None, after_move=None,
+         instrumentation=None, journal=None, resume_from=None):
     # Initialize the scanner instance.
     scanner_instance = scanner(positioner, readables, writables, conditions, before_read, after_read, initialization,
-                               finalization, settings, data_processor, before_move, after_move)
+                               finalization, settings, data_processor, before_move, after_move, instrumentation,
+                               journal, resume_from)
+
+    if scanner_instance.block_reader:
+        return scanner_instance.block_scan()
 
     return scanner_instance.discrete_scan()
 
 
 def scanner(positioner, readables, writables=None, conditions=None, before_read=None, after_read=None,
             initialization=None, finalization=None, settings=None, data_processor=None,
-            before_move=None, after_move=None):
+            before_move=None, after_move=None, instrumentation=None, journal=None, resume_from=None):
     # Allow a list or a single value to be passed. Initialize None values.
     writables = convert_input(convert_to_list(writables) or [])
     readables = convert_input(convert_to_list(readables) or [])
@@ -43,16 +58,35 @@ def scanner(positioner, readables, writables=None, conditions=None, before_read=
     finalization = convert_to_list(finalization) or []
     settings = settings or scan_settings()
 
-    # TODO: Ugly. The scanner should not depend on a particular positioner implementation.
-    if isinstance(positioner, BsreadPositioner) and settings.n_measurements > 1:
-        raise ValueError("When using BsreadPositioner the maximum number of n_measurements = 1.")
+    # Positioners that support it (BsreadPositioner with a block size) are acquired in blocks of positions.
+    block_mode = getattr(positioner, "supports_block_acquisition", False)
+    if block_mode:
+        if settings.n_measurements > 1:
+            raise ValueError("In block acquisition mode the maximum number of n_measurements = 1.")
+
+        if not all(isinstance(x, BS_PROPERTY) for x in readables) or \
+                not all(isinstance(x, BS_CONDITION) for x in conditions):
+            raise ValueError("In block acquisition mode only bs readables and conditions are supported.")
+
+        if writables or before_read or after_read or before_move or after_move or journal or resume_from:
+            raise ValueError("In block acquisition mode writables, before and after read or move actions, journal and "
+                             "resume are not supported.")
+
+    # Set when the scan is aborted, to interrupt the waiting in the scanner and in the DALs.
+    interrupt_event = Event()
+
+    bs_reader = _initialize_bs_dal(readables, conditions, settings.bs_read_filter, positioner,
+                                   settings.n_measurements)
 
-    bs_reader = _initialize_bs_dal(readables, conditions, settings.bs_read_filter, positioner)
+    # The bs reader reads the consecutive messages of all the measurements in a single read, and aggregates them.
+    if isinstance(bs_reader, bsread_dal.ImmediateReadGroupInterface):
+        settings = settings._replace(n_measurements=1)
 
-    epics_writer, epics_pv_reader, epics_condition_reader = _initialize_epics_dal(writables,
-                                                                                  readables,
-                                                                                  conditions,
-                                                                                  settings)
+    # The readbacks sampled when moving can be used as readables values only if nothing happens before the read.
+    reuse_writer_readbacks = not settings.settling_time and not after_move and not before_read
+
+    epics_writer, epics_pv_reader, epics_readback_reader, epics_condition_reader = \
+        _initialize_epics_dal(writables, readables, conditions, settings, interrupt_event, reuse_writer_readbacks)
 
     function_writer, function_reader, function_condition = _initialize_function_dal(writables,
                                                                                     readables,
@@ -60,71 +94,156 @@ def scanner(positioner, readables, writables=None, conditions=None, before_read=
 
     writables_order = [type(writable) for writable in writables]
 
+    # Writables readbacks sampled by the last move {pv_name: value}, used for the first read after the move.
+    writer_readback_values = {}
+
     # Write function needs to merge PV and function proxy data.
     def write_data(positions):
         positions = convert_to_list(positions)
         pv_values = [x for x, source in zip(positions, writables_order) if source == EPICS_PV]
         function_values = [x for x, source in zip(positions, writables_order) if source == FUNCTION_VALUE]
 
+        writer_readback_values.clear()
+
         if epics_writer:
             epics_writer.set_and_match(pv_values)
 
+            # The move was interrupted by the scan abort - do not write anything else.
+            if interrupt_event.is_set():
+                return
+
+            if instrumentation:
+                instrumentation.record("skipped_moves", epics_writer.n_skipped_moves)
+
+            if epics_readback_reader and epics_writer.last_readback_values is not None:
+                writer_readback_values.update(zip(epics_writer.readback_pv_name, epics_writer.last_readback_values))
+
         if function_writer:
             function_writer.write(function_values)
 
-    # Order of value sources, needed to reconstruct the correct order of the result.
-    readables_order = [type(readable) for readable in readables]
+        # The monitored readables accept only the values sampled after the end of the move.
+        if config.epics_read_from_monitors and epics_pv_reader:
+            epics_pv_reader.set_min_timestamp(time.time())
 
-    # Read function needs to merge BS, PV, and function proxy data.
-    def read_data(current_position_index, retry=False):
-        _logger.debug("Reading data for position index %s." % current_position_index)
+    # Continuous write function starts the move, without waiting for the positions to be reached.
+    def write_data_continuous(positions, velocities):
+        positions = convert_to_list(positions)
+        pv_values = [x for x, source in zip(positions, writables_order) if source == EPICS_PV]
+        pv_velocities = [x for x, source in zip(velocities, writables_order) if source == EPICS_PV]
+        function_values = [x for x, source in zip(positions, writables_order) if source == FUNCTION_VALUE]
 
-        bs_values = iter(bs_reader.read(current_position_index, retry) if bs_reader else [])
-        epics_values = iter(epics_pv_reader.read(current_position_index) if epics_pv_reader else [])
-        function_values = iter(function_reader.read(current_position_index) if function_reader else [])
+        # The readables are read while moving.
+        writer_readback_values.clear()
 
-        # Interleave the values correctly.
-        result = []
-        for source in readables_order:
-            if source == BS_PROPERTY:
-                next_result = next(bs_values)
-            elif source == EPICS_PV:
-                next_result = next(epics_values)
-            elif source == FUNCTION_VALUE:
-                next_result = next(function_values)
-            else:
-                raise ValueError("Unknown type of readable %s used." % source)
+        if epics_writer:
+            epics_writer.move(pv_values, pv_velocities)
 
-            # We flatten the result, whenever possible.
-            if isinstance(next_result, list) and source != FUNCTION_VALUE:
-                result.extend(next_result)
-            else:
-                result.append(next_result)
+        if function_writer:
+            function_writer.write(function_values)
 
-        return result
+    # Positions can be read back only if all writables have a readback.
+    read_positions = None
+    if epics_writer and all(source == EPICS_PV for source in writables_order):
+        read_positions = epics_writer.read_readbacks
 
     # Order of value sources, needed to reconstruct the correct order of the result.
+    readables_order = [type(readable) for readable in readables]
     conditions_order = [type(condition) for condition in conditions]
 
-    # Validate function needs to validate both BS, PV, and function proxy data.
-    def validate_data(current_position_index, data):
-        _logger.debug("Reading data for position index %s." % current_position_index)
+    epics_readables_pv_names = [x.pv_name for x in readables if isinstance(x, EPICS_PV)]
+    epics_conditions_pv_names = [x.pv_name for x in conditions if isinstance(x, EPICS_CONDITION)]
+
+    # Values of the last EPICS conditions read {pv_name: value}.
+    epics_condition_values = {}
+
+    def read_epics_conditions(current_position_index):
+        """
+        Read the EPICS conditions, and store their values for the readables that are also conditions.
+        :return: Values of the EPICS conditions, in the conditions order.
+        """
+        if epics_condition_reader:
+            epics_condition_values.update(zip(epics_condition_reader.pv_names,
+                                              epics_condition_reader.read(current_position_index)))
+
+        return [epics_condition_values[pv_name] for pv_name in epics_conditions_pv_names]
+
+    def read_epics_readables(current_position_index, read_conditions=True):
+        """
+        Read each distinct EPICS PV once, and fan out the values to the readables.
+        :param current_position_index: Index of the current position.
+        :param read_conditions: Read the EPICS conditions as well. Otherwise the values of the last conditions read
+        are used for the readables that are also conditions.
+        :return: Values of the EPICS readables, in the readables order.
+        """
+        pv_values = {}
+
+        if epics_pv_reader:
+            pv_values.update(zip(epics_pv_reader.pv_names, epics_pv_reader.read(current_position_index)))
+
+        if epics_readback_reader:
+            # The readbacks sampled by the move are valid only for the first read after the move.
+            if writer_readback_values:
+                pv_values.update(writer_readback_values)
+            else:
+                pv_values.update(zip(epics_readback_reader.pv_names,
+                                     epics_readback_reader.read(current_position_index)))
+
+        writer_readback_values.clear()
+
+        if read_conditions:
+            read_epics_conditions(current_position_index)
+        pv_values.update(epics_condition_values)
+
+        return [pv_values[pv_name] for pv_name in epics_readables_pv_names]
+
+    # Source of the readables that need to be read again when a condition fails.
+    condition_readable_source = {BS_CONDITION: BS_PROPERTY,
+                                 EPICS_CONDITION: EPICS_PV,
+                                 FUNCTION_CONDITION: FUNCTION_VALUE}
+
+    # Sources of the conditions that failed in the last validation, and the values of the last read of each source.
+    # Used to read only the sources of the failed conditions on retry.
+    failed_sources = set()
+    last_read_values = {}
+
+    # PV names of the EPICS Retry conditions that failed in the last validation.
+    failed_condition_pv_names = set()
+
+    # Set when a failed condition may have changed, to retry the read without waiting for the whole retry delay.
+    retry_event = None
+    if config.scan_acquisition_retry_on_change:
+        retry_event = Event()
+
+        def on_condition_change(pvname=None, **kwargs):
+            if pvname in failed_condition_pv_names:
+                retry_event.set()
+
+        # Monitor the EPICS conditions.
+        if epics_condition_reader:
+            epics_condition_reader.add_change_callback(on_condition_change)
+
+    def check_conditions(condition_values):
+        """
+        Check the conditions values. Conditions of sources without values are not checked.
+        :param condition_values: Dictionary {condition source: list of values of the conditions from this source}
+        :return: True if all checked conditions are fulfilled, False if any Retry condition failed.
+        :raise ValueError if any Abort condition failed.
+        """
+        failed_sources.clear()
+        failed_condition_pv_names.clear()
 
-        bs_values = iter(bs_reader.read_cached_conditions() if bs_reader else [])
-        epics_values = iter(epics_condition_reader.read(current_position_index) if epics_condition_reader else [])
-        function_values = iter(function_condition.read(current_position_index) if function_condition else [])
+        values_iterators = {source: iter(values) for source, values in condition_values.items()}
 
         for index, source in enumerate(conditions_order):
 
-            if source == BS_CONDITION:
-                value = next(bs_values)
-            elif source == EPICS_CONDITION:
-                value = next(epics_values)
-            elif source == FUNCTION_CONDITION:
-                value = next(function_values)
-            else:
+            if source not in (BS_CONDITION, EPICS_CONDITION, FUNCTION_CONDITION):
                 raise ValueError("Unknown type of condition %s used." % source)
 
+            if source not in values_iterators:
+                continue
+
+            value = next(values_iterators[source])
+
             value_valid = False
 
             # Function conditions are self contained.
@@ -143,7 +262,15 @@ def scanner(positioner, readables, writables=None, conditions=None, before_read=
             if not value_valid:
 
                 if conditions[index].action == ConditionAction.Retry:
-                    return False
+                    failed_sources.add(condition_readable_source[source])
+                    if source == EPICS_CONDITION:
+                        failed_condition_pv_names.add(conditions[index].pv_name)
+                    continue
+
+                # The measurement is already retried - the remaining conditions are checked only to know which
+                # sources failed.
+                if failed_sources:
+                    continue
 
                 if source == FUNCTION_CONDITION:
                     raise ValueError("Function condition %s returned False." % conditions[index].identifier)
@@ -157,7 +284,187 @@ def scanner(positioner, readables, writables=None, conditions=None, before_read=
                                       conditions[index].tolerance,
                                       conditions[index].operation))
 
-        return True
+        return not failed_sources
+
+    # Reads the sources in a thread pool, if requested.
+    concurrent_reader = ConcurrentReader() if config.scan_concurrent_read else None
+
+    def read_sources(current_position_index, retry, sources):
+        """
+        Read the readables of the given sources, and store their values in last_read_values.
+        :param current_position_index: Index of the current position.
+        :param retry: Is this the first read attempt or a retry.
+        :param sources: Sources (BS_PROPERTY, EPICS_PV, FUNCTION_VALUE) to read.
+        """
+        timeouts = config.scan_concurrent_read_timeouts
+
+        # List of (source, name, read function, timeout).
+        read_functions = []
+        if BS_PROPERTY in sources and bs_reader:
+            read_functions.append((BS_PROPERTY, "bs", partial(bs_reader.read, current_position_index, retry),
+                                   timeouts.get("bs")))
+        if EPICS_PV in sources and (epics_pv_reader or epics_readback_reader or epics_condition_reader):
+            # The EPICS conditions are read with the readables, unless they were already checked before the read.
+            read_functions.append((EPICS_PV, "epics", partial(read_epics_readables, current_position_index,
+                                                              not config.scan_check_conditions_first),
+                                   timeouts.get("epics")))
+        if FUNCTION_VALUE in sources and function_reader:
+            # Each function readable is independent of the others.
+            for function in function_reader.functions:
+                read_functions.append((FUNCTION_VALUE, "function %s" % function.identifier,
+                                       partial(function_reader.read_function, function, current_position_index),
+                                       timeouts.get("function")))
+
+        if concurrent_reader and len(read_functions) > 1:
+            results = concurrent_reader.read([(name, function, timeout)
+                                              for _, name, function, timeout in read_functions])
+        else:
+            results = [function() for _, _, function, _ in read_functions]
+
+        for source in sources:
+            last_read_values[source] = []
+
+        for (source, _, _, _), result in zip(read_functions, results):
+            # The function results are collected one by one, the other sources return a list of values.
+            if source == FUNCTION_VALUE:
+                last_read_values[source].append(result)
+            else:
+                last_read_values[source] = result
+
+    # Read function needs to merge BS, PV, and function proxy data.
+    def read_data(current_position_index, retry=False):
+        _logger.debug("Reading data for position index %s." % current_position_index)
+
+        all_sources = {BS_PROPERTY, EPICS_PV, FUNCTION_VALUE}
+        sources_to_read = all_sources
+        if retry and config.scan_acquisition_retry_failed_sources_only:
+            # Sources not read in the last attempt (conditions checked first failed) need to be read as well.
+            sources_to_read = failed_sources | (all_sources - set(last_read_values))
+
+        # Check the cheap conditions before reading the (potentially expensive) EPICS and function readables.
+        if config.scan_check_conditions_first:
+            # The bs readables and conditions come in the same message - they are read first.
+            if BS_PROPERTY in sources_to_read:
+                read_sources(current_position_index, retry, {BS_PROPERTY})
+                sources_to_read = sources_to_read - {BS_PROPERTY}
+
+            condition_values = {EPICS_CONDITION: read_epics_conditions(current_position_index),
+                                BS_CONDITION: bs_reader.read_cached_conditions() if bs_reader else []}
+
+            if not check_conditions(condition_values):
+                # The data read so far is not valid, and the rest was not read.
+                for source in (EPICS_PV, FUNCTION_VALUE):
+                    last_read_values.pop(source, None)
+
+                _logger.debug("Conditions not fulfilled before reading position index %s." % current_position_index)
+                return None
+
+        read_sources(current_position_index, retry, sources_to_read)
+
+        bs_values = iter(last_read_values[BS_PROPERTY])
+        epics_values = iter(last_read_values[EPICS_PV])
+        function_values = iter(last_read_values[FUNCTION_VALUE])
+
+        # Interleave the values correctly.
+        result = []
+        for source in readables_order:
+            if source == BS_PROPERTY:
+                next_result = next(bs_values)
+            elif source == EPICS_PV:
+                next_result = next(epics_values)
+            elif source == FUNCTION_VALUE:
+                next_result = next(function_values)
+            else:
+                raise ValueError("Unknown type of readable %s used." % source)
+
+            # We flatten the result, whenever possible.
+            if isinstance(next_result, list) and source != FUNCTION_VALUE:
+                result.extend(next_result)
+            else:
+                result.append(next_result)
+
+        return result
+
+    # Validate function needs to validate both BS, PV, and function proxy data.
+    def validate_data(current_position_index, data):
+        _logger.debug("Reading data for position index %s." % current_position_index)
+
+        # The conditions checked before the read already failed.
+        if data is None:
+            return False
+
+        # The EPICS conditions were read together with the readables. When checked before the read, they are read
+        # again, so the data is consistent with them.
+        if config.scan_check_conditions_first:
+            epics_condition_values_list = read_epics_conditions(current_position_index)
+        else:
+            epics_condition_values_list = [epics_condition_values[pv_name] for pv_name in epics_conditions_pv_names]
+
+        condition_values = {BS_CONDITION: bs_reader.read_cached_conditions() if bs_reader else [],
+                            EPICS_CONDITION: epics_condition_values_list,
+                            FUNCTION_CONDITION: function_condition.read(current_position_index)
+                            if function_condition else []}
+
+        return check_conditions(condition_values)
+
+    def validate_block(block):
+        """
+        Check the bs conditions of all the messages in the block at once.
+        :param block: Block of messages (MessageBlock).
+        :return: Boolean array, True for the messages that fulfill all the conditions.
+        :raise ValueError if any Abort condition failed in a message that fulfills all the Retry conditions.
+        """
+        conditions_valid = [compare_channel_values(values, condition.value, condition.tolerance, condition.operation)
+                            for condition, values in zip(conditions, block.conditions)]
+
+        retry_valid = numpy.ones(len(block.pulse_ids), dtype=bool)
+        for condition, condition_valid in zip(conditions, conditions_valid):
+            if condition.action == ConditionAction.Retry:
+                retry_valid &= condition_valid
+
+        # Like in check_conditions, the messages that are retried do not abort the scan.
+        for condition, values, condition_valid in zip(conditions, block.conditions, conditions_valid):
+            if condition.action == ConditionAction.Retry:
+                continue
+
+            failed_indexes = numpy.flatnonzero(retry_valid & ~condition_valid)
+            if len(failed_indexes):
+                raise ValueError("Condition %s failed, expected value %s, actual value %s, "
+                                 "tolerance %s, operation %s." %
+                                 (condition.identifier,
+                                  condition.value,
+                                  values[failed_indexes[0]],
+                                  condition.tolerance,
+                                  condition.operation))
+
+        return retry_valid
+
+    def read_block(position_index):
+        """
+        Read the next block of messages, and return the data of the messages that fulfill the conditions.
+        :param position_index: Number of positions already acquired.
+        :return: Tuple (positions, data), where data is a list of arrays, one per readable.
+        """
+        n_block_messages = min(positioner.block_size, len(positioner) - position_index)
+        block = bs_reader.read_block(n_block_messages)
+
+        if block.n_missing_pulse_ids:
+            _logger.warning("%d pulse ids missing in the bs stream before pulse id %d." %
+                            (block.n_missing_pulse_ids, block.pulse_ids[-1]))
+
+        if instrumentation:
+            instrumentation.record("bs_missing_pulse_ids", block.n_missing_pulse_ids)
+
+        valid = validate_block(block)
+        n_valid = int(numpy.count_nonzero(valid))
+
+        positions = list(range(position_index, position_index + n_valid))
+
+        # All messages are valid, no need to copy the arrays.
+        if n_valid == n_block_messages:
+            return positions, block.properties
+
+        return positions, [values[valid] for values in block.properties]
 
     if not data_processor:
         data_processor = DATA_PROCESSOR()
@@ -187,6 +494,37 @@ def scanner(positioner, readables, writables=None, conditions=None, before_read=
     if initialization:
         initialization_executor = ACTION_EXECUTOR(initialization).execute
 
+    # Restore the writables velocities changed by continuous scans, before any other finalization action.
+    if epics_writer:
+        finalization = [epics_writer.restore_velocities] + finalization
+
+    # Stop the read threads after the scan.
+    if concurrent_reader:
+        finalization = finalization + [concurrent_reader.close]
+    if bs_reader and config.bs_receiver_thread:
+        finalization = finalization + [bs_reader.stop_receiver]
+
+    # Remove the callbacks added by the scan and return the PVs to the connection pool, once nothing uses them anymore.
+    epics_groups = [group for group in (epics_writer, epics_pv_reader, epics_readback_reader, epics_condition_reader)
+                    if group]
+    if epics_groups:
+        def close_epics_groups():
+            for group in epics_groups:
+                group.close()
+
+        finalization = finalization + [close_epics_groups]
+
+    # Attach the bs stream statistics (lost messages, latency...) to the scanner and the scan instrumentation.
+    if bs_reader:
+        def attach_bs_statistics():
+            bs_statistics = bs_reader.get_statistics()
+            scanner.statistics["bs"] = bs_statistics
+
+            if instrumentation:
+                instrumentation.set_statistics("bs", bs_statistics)
+
+        finalization = finalization + [attach_bs_statistics]
+
     # Finalization (after last acquisition AND on error) hook.
     finalization_executor = None
     if finalization:
@@ -197,12 +535,17 @@ def scanner(positioner, readables, writables=None, conditions=None, before_read=
                       after_measurement_executor=after_measurement_executor,
                       initialization_executor=initialization_executor,
                       finalization_executor=finalization_executor, data_validator=validate_data, settings=settings,
-                      before_move_executor=before_move_executor, after_move_executor=after_move_executor)
+                      before_move_executor=before_move_executor, after_move_executor=after_move_executor,
+                      continuous_writer=write_data_continuous, position_reader=read_positions,
+                      interrupt_event=interrupt_event, instrumentation=instrumentation, journal=journal,
+                      resume_from=resume_from, retry_event=retry_event,
+                      block_reader=read_block if block_mode else None)
 
     return scanner
 
 
-def _initialize_epics_dal(writables, readables, conditions, settings):
+def _initialize_epics_dal(writables, readables, conditions, settings, interrupt_event=None,
+                          reuse_writer_readbacks=False):
     epics_writer = None
     if writables:
         epics_writables = [x for x in writables if isinstance(x, EPICS_PV)]
@@ -211,25 +554,50 @@ def _initialize_epics_dal(writables, readables, conditions, settings):
             epics_writer = EPICS_WRITER(pv_names=[pv.pv_name for pv in epics_writables],
                                         readback_pv_names=[pv.readback_pv_name for pv in epics_writables],
                                         tolerances=[pv.tolerance for pv in epics_writables],
-                                        timeout=settings.write_timeout)
-
-    epics_readables_pv_names = [x.pv_name for x in filter(lambda x: isinstance(x, EPICS_PV), readables)]
-    epics_conditions_pv_names = [x.pv_name for x in filter(lambda x: isinstance(x, EPICS_CONDITION), conditions)]
+                                        timeout=settings.write_timeout,
+                                        interrupt_event=interrupt_event,
+                                        readback_values=[pv.readback_pv_value for pv in epics_writables],
+                                        done_pv_names=[pv.done_pv_name for pv in epics_writables],
+                                        done_values=[pv.done_pv_value for pv in epics_writables],
+                                        use_complete=[pv.use_complete for pv in epics_writables])
+
+    # Each distinct PV is read only once per step. Readables that are also conditions get the values of the conditions,
+    # and readables that are writables readbacks (if reused) get the values sampled when moving.
+    epics_conditions_pv_names = list(OrderedDict.fromkeys(x.pv_name for x in conditions
+                                                          if isinstance(x, EPICS_CONDITION)))
+    epics_readables_pv_names = [pv_name for pv_name in OrderedDict.fromkeys(x.pv_name for x in readables
+                                                                            if isinstance(x, EPICS_PV))
+                                if pv_name not in epics_conditions_pv_names]
+
+    epics_readback_pv_names = []
+    if epics_writer and reuse_writer_readbacks:
+        epics_readback_pv_names = [pv_name for pv_name in epics_readables_pv_names
+                                   if pv_name in epics_writer.readback_pv_name]
+        epics_readables_pv_names = [pv_name for pv_name in epics_readables_pv_names
+                                    if pv_name not in epics_readback_pv_names]
 
     # Reading epics PV values.
     epics_pv_reader = None
     if epics_readables_pv_names:
-        epics_pv_reader = EPICS_READER(pv_names=epics_readables_pv_names)
+        if config.epics_read_from_monitors:
+            epics_pv_reader = EPICS_MONITORED_READER(pv_names=epics_readables_pv_names)
+        else:
+            epics_pv_reader = EPICS_READER(pv_names=epics_readables_pv_names)
+
+    # Reading the writables readbacks, when the values sampled by the move cannot be used.
+    epics_readback_reader = None
+    if epics_readback_pv_names:
+        epics_readback_reader = EPICS_READER(pv_names=epics_readback_pv_names)
 
     # Reading epics condition values.
     epics_condition_reader = None
     if epics_conditions_pv_names:
         epics_condition_reader = EPICS_READER(pv_names=epics_conditions_pv_names)
 
-    return epics_writer, epics_pv_reader, epics_condition_reader
+    return epics_writer, epics_pv_reader, epics_readback_reader, epics_condition_reader
 
 
-def _initialize_bs_dal(readables, conditions, filter_function, positioner):
+def _initialize_bs_dal(readables, conditions, filter_function, positioner, n_measurements=1):
     bs_readables = [x for x in filter(lambda x: isinstance(x, BS_PROPERTY), readables)]
     bs_conditions = [x for x in filter(lambda x: isinstance(x, BS_CONDITION), conditions)]
 
@@ -240,7 +608,9 @@ def _initialize_bs_dal(readables, conditions, filter_function, positioner):
         if isinstance(positioner, BsreadPositioner):
             bs_reader = bsread_dal.ImmediateReadGroupInterface(properties=bs_readables,
                                                                conditions=bs_conditions,
-                                                               filter_function=filter_function)
+                                                               filter_function=filter_function,
+                                                               n_messages=n_measurements,
+                                                               aggregation=positioner.aggregation)
 
             positioner.set_bs_reader(bs_reader)
 
@@ -3,13 +3,15 @@ from enum import Enum
 
 from pyscan import config
 
-EPICS_PV = namedtuple("EPICS_PV", ["identifier", "pv_name", "readback_pv_name", "tolerance", "readback_pv_value"])
+EPICS_PV = namedtuple("EPICS_PV", ["identifier", "pv_name", "readback_pv_name", "tolerance", "readback_pv_value",
+                                   "done_pv_name", "done_pv_value", "use_complete"])
 EPICS_CONDITION = namedtuple("EPICS_CONDITION", ["identifier", "pv_name", "value", "action", "tolerance", "operation"])
 BS_PROPERTY = namedtuple("BS_PROPERTY", ["identifier", "property", "default_value"])
 BS_CONDITION = namedtuple("BS_CONDITION", ["identifier", "property", "value", "action", "tolerance", "operation",
                                            "default_value"])
 SCAN_SETTINGS = namedtuple("SCAN_SETTINGS", ["measurement_interval", "n_measurements",
-                                             "write_timeout", "settling_time", "progress_callback", "bs_read_filter"])
+                                             "write_timeout", "settling_time", "progress_callback", "bs_read_filter",
+                                             "move_time", "pipelined", "overrun_policy"])
 FUNCTION_VALUE = namedtuple("FUNCTION_VALUE", ["identifier", "call_function"])
 FUNCTION_CONDITION = namedtuple("FUNCTION_CONDITION", ["identifier", "call_function", "action"])
 
@@ -28,9 +30,30 @@ class ConditionAction(Enum):
     Retry = 2
 
 
+class OverrunPolicy(Enum):
+    # Take the late measurement at the next measurement time, keeping the measurement rate.
+    Skip = 1
+    # Take the late measurements immediately, until the measurements are back on schedule.
+    CatchUp = 2
+    # Raise an exception.
+    Fail = 3
+
+
+class BsAggregation(Enum):
+    # Mean of the values of the consecutive messages.
+    Mean = 1
+    # Standard deviation of the values of the consecutive messages.
+    Std = 2
+    # Array with the values of all the consecutive messages.
+    All = 3
+
+
 # Used to determine if a parameter was passed or the default value is used.
 _default_value_placeholder = object()
 
+# BS_PROPERTY.property of the bs_pulse_id readable. It is not a stream channel, the message pulse id is read instead.
+BS_PULSE_ID_PROPERTY = "#pulse_id"
+
 
 def function_value(call_function, name=None):
     """
@@ -72,15 +95,21 @@ def function_condition(call_function, name=None, action=None):
 function_condition.function_count = 0
 
 
-def epics_pv(pv_name, readback_pv_name=None, tolerance=None, readback_pv_value=None):
+def epics_pv(pv_name, readback_pv_name=None, tolerance=None, readback_pv_value=None, done_pv_name=None,
+             done_pv_value=1, use_complete=False):
     """
     Construct a tuple for PV representation
     :param pv_name: Name of the PV.
     :param readback_pv_name: Name of the readback PV.
-    :param tolerance: Tolerance if the PV is writable.
+    :param tolerance: Tolerance if the PV is writable. With done_pv_name or use_complete, the readback is checked only
+    if the tolerance (or readback_pv_value) is given.
     :param readback_pv_value: If the readback_pv_value is set, the readback is compared against this instead of 
     comparing it to the setpoint.
-    :return: Tuple of (identifier, pv_name, pv_readback, tolerance)
+    :param done_pv_name: Name of the PV that signals the end of the move (for example the motor record .DMOV field).
+    :param done_pv_value: Value of the done PV when the move is completed.
+    :param use_complete: Write the PV with a put callback and wait for the put to complete.
+    :return: Tuple of (identifier, pv_name, pv_readback, tolerance, readback_pv_value, done_pv_name, done_pv_value,
+    use_complete)
     """
     identifier = pv_name
 
@@ -90,10 +119,13 @@ def epics_pv(pv_name, readback_pv_name=None, tolerance=None, readback_pv_value=N
     if not readback_pv_name:
         readback_pv_name = pv_name
 
-    if not tolerance or tolerance < config.max_float_tolerance:
+    # Without a tolerance, the default one is used (and the readback is not checked if another completion strategy,
+    # done_pv_name or use_complete, is given).
+    if tolerance is not None and tolerance < config.max_float_tolerance:
         tolerance = config.max_float_tolerance
 
-    return EPICS_PV(identifier, pv_name, readback_pv_name, tolerance, readback_pv_value)
+    return EPICS_PV(identifier, pv_name, readback_pv_name, tolerance, readback_pv_value, done_pv_name, done_pv_value,
+                    bool(use_complete))
 
 
 def epics_condition(pv_name, value, action=None, tolerance=None, operation=ConditionComparison.EQUAL):
@@ -145,6 +177,18 @@ def bs_property(name, default_value=_default_value_placeholder):
     return BS_PROPERTY(identifier, name, default_value)
 
 
+def bs_pulse_id(name="pulse_id"):
+    """
+    Construct a tuple for reading the pulse id of the bs read message used for the measurement.
+    :param name: Name of the readable.
+    :return:  Tuple of ("identifier", "property", "default_value")
+    """
+    if not name:
+        raise ValueError("name not specified.")
+
+    return BS_PROPERTY(name, BS_PULSE_ID_PROPERTY, Exception)
+
+
 def bs_condition(name, value, action=None, tolerance=None, operation=ConditionComparison.EQUAL,
                  default_value=_default_value_placeholder):
     """
@@ -181,7 +225,8 @@ def bs_condition(name, value, action=None, tolerance=None, operation=ConditionCo
 
 
 def scan_settings(measurement_interval=None, n_measurements=None, write_timeout=None, settling_time=None,
-                  progress_callback=None, bs_read_filter=None):
+                  progress_callback=None, bs_read_filter=None, move_time=None, pipelined=False,
+                  overrun_policy=None):
     """
     Set the scan settings.
     :param measurement_interval: Default 0. Interval between each measurement, in case n_measurements is more than 1.
@@ -190,8 +235,15 @@ def scan_settings(measurement_interval=None, n_measurements=None, write_timeout=
     :param settling_time: How much time to wait in seconds after the motors have reached the desired destination.
     :param progress_callback: Function to call after each scan step is completed. 
                               Signature: def callback(current_position, total_positions)
+                              total_positions is None if the positioner does not know its length.
     :param bs_read_filter: Filter to apply to the bs read receive function, to filter incoming messages.
                               Signature: def callback(message)
+    :param move_time: Time in seconds the writables have to move from the start to the end position in a
+                      continuous scan. The writables velocities are calculated from it.
+    :param pipelined: Process the data, execute the after read actions and report the progress in a separate thread,
+                      while the scan already moves to the next position.
+    :param overrun_policy: Default OverrunPolicy.Skip. What to do when a measurement cannot be taken at its
+                           scheduled time, in case n_measurements is more than 1.
     :return: Scan settings named tuple.
     """
     if not measurement_interval or measurement_interval < 0:
@@ -206,15 +258,29 @@ def scan_settings(measurement_interval=None, n_measurements=None, write_timeout=
     if not settling_time or settling_time < 0:
         settling_time = config.epics_default_settling_time
 
+    if not move_time or move_time < 0:
+        move_time = None
+
+    if not overrun_policy:
+        overrun_policy = OverrunPolicy.Skip
+
+    if not isinstance(overrun_policy, OverrunPolicy):
+        raise ValueError("Overrun policy must be one of %s, but %s was given." % (list(OverrunPolicy), overrun_policy))
+
     if not progress_callback:
         def default_progress_callback(current_position, total_positions):
+            # The positioner does not know how many positions there are.
+            if total_positions is None:
+                print("Scan: %d positions completed" % current_position)
+                return
+
             completed_percentage = 100.0 * (current_position / total_positions)
             print("Scan: %.2f %% completed (%d/%d)" % (completed_percentage, current_position, total_positions))
 
         progress_callback = default_progress_callback
 
     return SCAN_SETTINGS(measurement_interval, n_measurements, write_timeout, settling_time, progress_callback,
-                         bs_read_filter)
+                         bs_read_filter, move_time, bool(pipelined), overrun_policy)
 
 
 def convert_input(input_parameters):
@@ -1,8 +1,14 @@
-from itertools import count
-from time import sleep
+import math
+from collections import OrderedDict
+from itertools import count, islice
+from queue import Queue
+from threading import Thread, Event
+from time import monotonic
 
 from pyscan import config
-from pyscan.scan_parameters import scan_settings
+from pyscan.instrumentation import NullInstrumentation
+from pyscan.scan_parameters import scan_settings, OverrunPolicy
+from pyscan.utils import convert_to_list, interpolate_position, seek_generator
 
 STATUS_INITIALIZED = "INITIALIZED"
 STATUS_RUNNING = "RUNNING"
@@ -11,6 +17,66 @@ STATUS_PAUSED = "PAUSED"
 STATUS_ABORTED = "ABORTED"
 
 
+class _ProcessingPipeline(object):
+    """
+    Process the measured data in a separate thread, in the order it was measured.
+    """
+
+    # Signals the worker that no more data will be submitted.
+    _stop_signal = object()
+
+    def __init__(self, process_function, queue_size):
+        """
+        Start the processing thread.
+        :param process_function: Function to call with the submitted arguments.
+        :param queue_size: Maximum number of submitted items waiting to be processed.
+        """
+        self.process_function = process_function
+        self.queue = Queue(maxsize=queue_size)
+        self.error = None
+
+        self.thread = Thread(target=self._process_queue, daemon=True)
+        self.thread.start()
+
+    def _process_queue(self):
+        while True:
+            arguments = self.queue.get()
+
+            if arguments is self._stop_signal:
+                return
+
+            # After an error, the queue is still drained, so that submit never blocks forever.
+            if self.error is not None:
+                continue
+
+            try:
+                self.process_function(*arguments)
+            except Exception as e:
+                self.error = e
+
+    def _raise_error(self):
+        if self.error is not None:
+            raise self.error
+
+    def submit(self, *arguments):
+        """
+        Submit the arguments for processing. Blocks if the queue is full.
+        :raise Exception raised by a previous processing in the processing thread.
+        """
+        self._raise_error()
+        self.queue.put(arguments)
+
+    def stop(self):
+        """
+        Wait for all the submitted data to be processed and stop the processing thread.
+        :raise Exception raised by the processing in the processing thread.
+        """
+        self.queue.put(self._stop_signal)
+        self.thread.join()
+
+        self._raise_error()
+
+
 class Scanner(object):
     """
     Perform discrete and continues scans.
@@ -18,7 +84,9 @@ class Scanner(object):
 
     def __init__(self, positioner, data_processor, reader, writer=None, before_measurement_executor=None,
                  after_measurement_executor=None, initialization_executor=None, finalization_executor=None,
-                 data_validator=None, settings=None, before_move_executor=None, after_move_executor=None):
+                 data_validator=None, settings=None, before_move_executor=None, after_move_executor=None,
+                 continuous_writer=None, position_reader=None, interrupt_event=None, instrumentation=None,
+                 journal=None, resume_from=None, retry_event=None, block_reader=None):
         """
         Initialize scanner.
         :param positioner: Positioner should provide a generator to get the positions to move to.
@@ -29,6 +97,20 @@ class Scanner(object):
         :param after_measurement_executor: Callbacks executor that executed after measurements.
         :param before_move_executor: Callbacks executor that executes before each move.
         :param after_move_executor: Callbacks executor that executes after each move.
+        :param continuous_writer: Method that starts moving to the positions with the given velocities, without
+        waiting for the move to complete. Signature: def continuous_writer(positions, velocities)
+        :param position_reader: Method that returns the current (readback) positions of the writables.
+        :param interrupt_event: Event set when the scan is aborted. Pass the same event to the writer and reader to
+        interrupt their waiting as well.
+        :param instrumentation: Object to record the time of each scan stage (ScanInstrumentation).
+        :param journal: Journal to append each completed position to (ScanJournal).
+        :param resume_from: Journal of a previous, interrupted run of the same scan (ScanJournal). The positions
+        completed in the previous run are skipped.
+        :param retry_event: Event set when the failed conditions may have changed. A read is retried as soon as the
+        event gets set, but only the retries after the whole retry delay count towards the retry limit.
+        :param block_reader: Function that reads, validates and returns the data of the next block of positions, used
+        by block_scan. Signature: def block_reader(position_index) -> (positions, data), where data is a list of arrays
+        (one per readable) with one row per position. Invalid positions are not returned and are read again.
         """
         self.positioner = positioner
         self.writer = writer
@@ -41,26 +123,44 @@ class Scanner(object):
         self.settings = settings or scan_settings()
         self.before_move_executor = before_move_executor
         self.after_move_executor = after_move_executor
+        self.continuous_writer = continuous_writer
+        self.position_reader = position_reader
+        self.instrumentation = instrumentation or NullInstrumentation()
+        self.journal = journal
+        self.resume_from = resume_from
+        # Statistics of the data sources, set at the end of the scan (the bs stream statistics are under "bs").
+        self.statistics = OrderedDict()
 
         # If no data validator is provided, data is always valid.
         self.data_validator = data_validator or (lambda position, data: True)
 
-        self._user_abort_scan_flag = False
-        self._user_pause_scan_flag = False
+        # Set when the scan is aborted, interrupts all the waiting in the scan.
+        self._abort_event = interrupt_event or Event()
+        self._retry_event = retry_event
+        self.block_reader = block_reader
+        # Cleared while the scan is paused.
+        self._resume_event = Event()
+        self._resume_event.set()
+
+        self._processing_pipeline = None
 
         self._status = STATUS_INITIALIZED
 
     def abort_scan(self):
         """
-        Abort the scan after the next measurement.
+        Abort the scan. Any waiting in the scan (moving, settling, between measurements) is interrupted.
         """
-        self._user_abort_scan_flag = True
+        self._abort_event.set()
+        # Wake up the scan if it is paused or waiting to retry.
+        self._resume_event.set()
+        if self._retry_event:
+            self._retry_event.set()
 
     def pause_scan(self):
         """
         Pause the scan after the next measurement.
         """
-        self._user_pause_scan_flag = True
+        self._resume_event.clear()
 
     def get_status(self):
         return self._status
@@ -69,30 +169,86 @@ class Scanner(object):
         """
         Resume the scan.
         """
-        self._user_pause_scan_flag = False
+        self._resume_event.set()
+
+    def _check_abort(self):
+        """
+        Check if the scan was aborted.
+        :raise Exception in case the scan was aborted.
+        """
+        if self._abort_event.is_set():
+            self._status = STATUS_ABORTED
+            raise Exception("User aborted scan.")
+
+    def _wait(self, timeout):
+        """
+        Wait for the specified time, unless the scan is aborted in the meantime.
+        :param timeout: Time to wait in seconds.
+        :raise Exception in case the scan was aborted.
+        """
+        if timeout > 0:
+            self._abort_event.wait(timeout)
+
+        self._check_abort()
+
+    def _get_retry_delay(self, n_failed_acquisitions):
+        """
+        Get the delay before the next read attempt.
+        :param n_failed_acquisitions: Number of failed read attempts at this position.
+        :return: Delay in seconds.
+        """
+        retry_delay = config.scan_acquisition_retry_delay * (config.scan_acquisition_retry_backoff **
+                                                             (n_failed_acquisitions - 1))
+
+        return min(retry_delay, max(config.scan_acquisition_retry_max_delay, config.scan_acquisition_retry_delay))
+
+    def _wait_for_retry(self, retry_deadline):
+        """
+        Wait before the next read attempt. The waiting stops early if the retry event is set.
+        :param retry_deadline: Time (monotonic) at which the retry delay ends.
+        :raise Exception in case the scan was aborted.
+        """
+        retry_delay = max(retry_deadline - monotonic(), 0)
+
+        if self._retry_event is None:
+            self._wait(retry_delay)
+            return
+
+        # Aborting the scan also sets the retry event.
+        self._retry_event.wait(retry_delay)
+        self._check_abort()
 
     def _verify_scan_status(self):
         """
         Check if the conditions to pause or abort the scan are met.
         :raise Exception in case the conditions are met.
         """
-        # Check if the abort flag is set.
-        if self._user_abort_scan_flag:
-            self._status = STATUS_ABORTED
-            raise Exception("User aborted scan.")
+        self._check_abort()
 
         # If the scan is in pause, wait until it is resumed or the user aborts the scan.
-        if self._user_pause_scan_flag:
+        if not self._resume_event.is_set():
             self._status = STATUS_PAUSED
 
-            while self._user_pause_scan_flag:
-                if self._user_abort_scan_flag:
-                    self._status = STATUS_ABORTED
-                    raise Exception("User aborted scan in pause.")
-                sleep(config.scan_pause_sleep_interval)
-            # Once the pause flag is cleared, the scanning continues.
+            # Aborting the scan also wakes up the pause.
+            self._resume_event.wait()
+
+            if self._abort_event.is_set():
+                self._status = STATUS_ABORTED
+                raise Exception("User aborted scan in pause.")
+
+            # Once the scan is resumed, the scanning continues.
             self._status = STATUS_RUNNING
 
+    def _get_n_positions(self):
+        """
+        Get the total number of positions from the positioner, without iterating over its generator.
+        :return: Number of positions, or None if the positioner does not provide its length.
+        """
+        try:
+            return len(self.positioner)
+        except TypeError:
+            return None
+
     def _perform_single_read(self, current_position_index):
         """
         Read a single result from the channel.
@@ -100,25 +256,40 @@ class Scanner(object):
         :return: Single result (all channels).
         """
         n_current_acquisition = 0
+        # End of the current retry delay. The reads retried before it (woken up by the retry event) are not counted.
+        retry_deadline = None
         # Collect data until acquired data is valid or retry limit reached.
         while n_current_acquisition < config.scan_acquisition_retry_limit:
             retry_acquisition = n_current_acquisition != 0
-            single_measurement = self.reader(current_position_index, retry=retry_acquisition)
+
+            # Only changes after this read are a reason to retry early.
+            if self._retry_event:
+                self._retry_event.clear()
+
+            with self.instrumentation.stage("read"):
+                single_measurement = self.reader(current_position_index, retry=retry_acquisition)
 
             # If the data is valid, break out of the loop.
-            if self.data_validator(current_position_index, single_measurement):
+            with self.instrumentation.stage("validate"):
+                data_valid = self.data_validator(current_position_index, single_measurement)
+
+            if data_valid:
                 return single_measurement
 
-            n_current_acquisition += 1
-            sleep(config.scan_acquisition_retry_delay)
+            if retry_deadline is None or monotonic() >= retry_deadline:
+                n_current_acquisition += 1
+                retry_deadline = monotonic() + self._get_retry_delay(n_current_acquisition)
+
+            with self.instrumentation.stage("retry_wait"):
+                self._wait_for_retry(retry_deadline)
         # Could not read the data within the retry limit.
         else:
             raise Exception("Number of maximum read attempts (%d) exceeded. Cannot read valid data at position %s."
                             % (config.scan_acquisition_retry_limit, current_position_index))
 
-    def _read_and_process_data(self, current_position):
+    def _read_data(self, current_position):
         """
-        Read the data and pass it on only if valid.
+        Read the data at the current position. Only valid data is returned.
         :param current_position: Current position reached by the scan.
         :return: Current position scan data.
         """
@@ -126,18 +297,162 @@ class Scanner(object):
         if self.settings.n_measurements == 1:
             result = self._perform_single_read(current_position)
 
-        # Multiple acquisitions.
+        # Multiple acquisitions, at a fixed rate.
         else:
             result = []
+            measurement_interval = self.settings.measurement_interval
+
+            # The measurements are scheduled relative to the first one, so the read time does not add up.
+            first_measurement_time = monotonic()
+            measurement_slot = 0
+
             for n_measurement in range(self.settings.n_measurements):
-                result.append(self._perform_single_read(current_position))
-                sleep(self.settings.measurement_interval)
+                if measurement_interval > 0:
+                    measurement_slot = self._get_measurement_slot(first_measurement_time, measurement_slot,
+                                                                  current_position)
+                    measurement_time = first_measurement_time + (measurement_slot * measurement_interval)
+
+                    with self.instrumentation.stage("measurement_wait"):
+                        self._wait(measurement_time - monotonic())
 
-        # Process only valid data.
-        self.data_processor.process(current_position, result)
+                    self.instrumentation.record("measurement_jitter", monotonic() - measurement_time)
+
+                result.append(self._perform_single_read(current_position))
+                measurement_slot += 1
 
         return result
 
+    def _get_measurement_slot(self, first_measurement_time, measurement_slot, current_position):
+        """
+        Get when to take the next measurement, applying the overrun policy if the measurement is late.
+        :param first_measurement_time: Monotonic time of the first measurement at this position.
+        :param measurement_slot: Slot (multiple of the measurement interval) the measurement is scheduled for.
+        :param current_position: Current position, for the error message.
+        :return: Slot in which to take the measurement.
+        """
+        measurement_interval = self.settings.measurement_interval
+        delay = monotonic() - (first_measurement_time + (measurement_slot * measurement_interval))
+
+        if delay <= config.max_time_tolerance:
+            return measurement_slot
+
+        if self.settings.overrun_policy == OverrunPolicy.Fail:
+            raise Exception("Measurement at position %s is %.3f seconds late for the %.3f seconds measurement "
+                            "interval." % (current_position, delay, measurement_interval))
+
+        if self.settings.overrun_policy == OverrunPolicy.Skip:
+            # Move to the next slot that is not in the past.
+            next_measurement_slot = measurement_slot + int(math.ceil(delay / measurement_interval))
+            self.instrumentation.record("missed_measurement_deadlines", next_measurement_slot - measurement_slot)
+            return next_measurement_slot
+
+        # Catch up - measure immediately.
+        self.instrumentation.record("missed_measurement_deadlines", 1)
+        return measurement_slot
+
+    def _process_data(self, position_index, n_of_positions, position, position_data):
+        """
+        Pass the data to the data processor, execute the after measurement actions and report the progress.
+        :param position_index: Index (1 based) of the position.
+        :param n_of_positions: Total number of positions.
+        :param position: Position at which the data was read.
+        :param position_data: Data read at this position.
+        """
+        with self.instrumentation.stage("process", position_index):
+            # The data processor can return where it persisted the data, to be recorded in the journal.
+            pointer = self.data_processor.process(position, position_data)
+
+        if self.journal:
+            self.journal.append(position_index, position, pointer)
+
+        # Post reading callbacks.
+        if self.after_measurement_executor:
+            with self.instrumentation.stage("after_read", position_index):
+                self.after_measurement_executor(position, position_data)
+
+        # Report about the progress.
+        with self.instrumentation.stage("progress", position_index):
+            self.settings.progress_callback(position_index, n_of_positions)
+
+    def _check_journal(self):
+        """
+        Check that the journal contains only the entries of this scan: it must be empty, unless the scan is resumed
+        from it.
+        :raise ValueError if the journal contains entries of another scan.
+        """
+        if not self.journal or self.journal.is_empty():
+            return
+
+        if self.resume_from and self.journal.is_same_file(self.resume_from):
+            return
+
+        raise ValueError("The scan journal %s is not empty. Resume the scan from it, or use a new journal."
+                         % self.journal.filename)
+
+    def _restore_completed_positions(self):
+        """
+        Rebuild the data processor state from the journal of the previous run of the scan, with the data processor
+        restore(position, pointer) method.
+        :return: Number of positions completed in the previous run.
+        :raise ValueError if the data processor cannot restore the completed positions, or if the journal is not from
+        this scan (its positions are not the positioner positions).
+        """
+        self._check_journal()
+
+        if not self.resume_from:
+            return 0
+
+        completed_entries = self.resume_from.get_completed()
+
+        restore = getattr(self.data_processor, "restore", None)
+        if completed_entries and restore is None:
+            raise ValueError("Cannot resume the scan, the data processor %s does not implement "
+                             "restore(position, pointer)." % type(self.data_processor).__name__)
+
+        # The completed positions must be the first positions of this scan.
+        positions = list(islice(seek_generator(self.positioner, 0), len(completed_entries)))
+        if len(positions) < len(completed_entries):
+            raise ValueError("Cannot resume the scan, the journal has %d completed positions, but the positioner has "
+                             "only %d positions." % (len(completed_entries), len(positions)))
+
+        for entry, position in zip(completed_entries, positions):
+            if not self.resume_from.position_matches(entry, position):
+                raise ValueError("Cannot resume the scan, the journal position %s at index %d does not match the "
+                                 "positioner position %s." % (entry["position"], entry["index"], position))
+
+        for entry, position in zip(completed_entries, positions):
+            restore(position, entry["pointer"])
+
+        return len(completed_entries)
+
+    def _start_processing(self):
+        """
+        Start the processing thread, if the scan is pipelined.
+        """
+        self._processing_pipeline = None
+
+        if self.settings.pipelined:
+            self._processing_pipeline = _ProcessingPipeline(self._process_data, config.scan_pipeline_queue_size)
+
+    def _submit_processing(self, position_index, n_of_positions, position, position_data):
+        """
+        Process the data directly, or pass it to the processing thread if the scan is pipelined.
+        """
+        if self._processing_pipeline:
+            self._processing_pipeline.submit(position_index, n_of_positions, position, position_data)
+        else:
+            self._process_data(position_index, n_of_positions, position, position_data)
+
+    def _stop_processing(self):
+        """
+        Wait until all the data has been processed, if the scan is pipelined.
+        """
+        if self._processing_pipeline:
+            processing_pipeline = self._processing_pipeline
+            self._processing_pipeline = None
+
+            processing_pipeline.stop()
+
     def discrete_scan(self):
         """
         Perform a discrete scan - set a position, read, continue. Return value at the end.
@@ -145,48 +460,69 @@ class Scanner(object):
         try:
             self._status = STATUS_RUNNING
 
-            # Get how many positions we have in total.
-            n_of_positions = sum(1 for _ in self.positioner.get_generator())
-            # Report the 0% completed.
-            self.settings.progress_callback(0, n_of_positions)
+            # Get how many positions we have in total (None if the positioner cannot know it).
+            n_of_positions = self._get_n_positions()
+            # Positions completed by a previous run of the scan are not repeated.
+            n_completed = self._restore_completed_positions()
+            # Report the 0% completed (or what was completed in the previous run).
+            self.settings.progress_callback(n_completed, n_of_positions)
 
             # Set up the experiment.
             if self.initialization_executor:
                 self.initialization_executor(self)
 
-            for position_index, next_positions in zip(count(1), self.positioner.get_generator()):
+            self._start_processing()
+
+            for position_index, next_positions in zip(count(n_completed + 1),
+                                                      seek_generator(self.positioner, n_completed)):
+                self.instrumentation.step_started(position_index)
+
                 # Execute before moving to the next position.
                 if self.before_move_executor:
-                    self.before_move_executor(next_positions)
+                    with self.instrumentation.stage("before_move"):
+                        self.before_move_executor(next_positions)
 
                 # Position yourself before reading.
                 if self.writer:
-                    self.writer(next_positions)
+                    with self.instrumentation.stage("move"):
+                        self.writer(next_positions)
+                    # The writer stops waiting for the position when the scan is aborted.
+                    self._check_abort()
 
                 # Settling time, wait after positions has been reached.
-                sleep(self.settings.settling_time)
+                with self.instrumentation.stage("settle"):
+                    self._wait(self.settings.settling_time)
 
                 # Execute the after move executor.
                 if self.after_move_executor:
-                    self.after_move_executor(next_positions)
+                    with self.instrumentation.stage("after_move"):
+                        self.after_move_executor(next_positions)
 
                 # Pre reading callbacks.
                 if self.before_measurement_executor:
-                    self.before_measurement_executor(next_positions)
+                    with self.instrumentation.stage("before_read"):
+                        self.before_measurement_executor(next_positions)
 
-                # Read and process the data in the current position.
-                position_data = self._read_and_process_data(next_positions)
+                # Read the data in the current position.
+                position_data = self._read_data(next_positions)
 
-                # Post reading callbacks.
-                if self.after_measurement_executor:
-                    self.after_measurement_executor(next_positions, position_data)
+                # Process the data, execute post reading callbacks, and report about the progress.
+                self._submit_processing(position_index, n_of_positions, next_positions, position_data)
 
-                # Report about the progress.
-                self.settings.progress_callback(position_index, n_of_positions)
+                self.instrumentation.step_finished()
 
                 # Verify is the scan should continue.
                 self._verify_scan_status()
+
+            # Wait for all the data to be processed.
+            self._stop_processing()
         finally:
+            # Stop the processing thread in case of errors, without hiding the original error.
+            try:
+                self._stop_processing()
+            except Exception:
+                pass
+
             # Clean up after yourself.
             if self.finalization_executor:
                 self.finalization_executor(self)
@@ -197,6 +533,210 @@ class Scanner(object):
 
         return self.data_processor.get_data()
 
+    def _process_block(self, positions, block_data):
+        """
+        Pass the data of a block of positions to the data processor, in a single call if the data processor implements
+        process_block(positions, data).
+        :param positions: List of positions in the block.
+        :param block_data: List of arrays, one per readable, with one row per position.
+        """
+        process_block = getattr(self.data_processor, "process_block", None)
+        if process_block:
+            process_block(positions, block_data)
+            return
+
+        for index, position in enumerate(positions):
+            self.data_processor.process(position, [column[index] for column in block_data])
+
+    def block_scan(self):
+        """
+        Perform a scan that reads the positions in blocks - each block is read, validated and processed at once.
+        Return value at the end.
+        """
+        if self.block_reader is None:
+            raise ValueError("Block scan needs a block reader.")
+
+        n_of_positions = self._get_n_positions()
+        if n_of_positions is None:
+            raise ValueError("Block scans need a positioner that provides its number of positions.")
+
+        try:
+            self._status = STATUS_RUNNING
+
+            self.settings.progress_callback(0, n_of_positions)
+
+            # Set up the experiment.
+            if self.initialization_executor:
+                self.initialization_executor(self)
+
+            n_completed = 0
+            n_failed_acquisitions = 0
+            while n_completed < n_of_positions:
+                self.instrumentation.step_started(n_completed + 1)
+
+                with self.instrumentation.stage("read"):
+                    positions, block_data = self.block_reader(n_completed)
+
+                # No valid positions in the block - the conditions are not fulfilled.
+                if not positions:
+                    n_failed_acquisitions += 1
+
+                    if n_failed_acquisitions >= config.scan_acquisition_retry_limit:
+                        raise Exception("Number of maximum read attempts (%d) exceeded. Cannot read valid data at "
+                                        "position %s." % (config.scan_acquisition_retry_limit, n_completed))
+                else:
+                    n_failed_acquisitions = 0
+
+                    with self.instrumentation.stage("process"):
+                        self._process_block(positions, block_data)
+
+                    n_completed += len(positions)
+
+                    with self.instrumentation.stage("progress"):
+                        self.settings.progress_callback(n_completed, n_of_positions)
+
+                self.instrumentation.step_finished()
+
+                # Verify is the scan should continue.
+                self._verify_scan_status()
+
+        finally:
+            # Clean up after yourself.
+            if self.finalization_executor:
+                self.finalization_executor(self)
+
+            # If the scan was aborted we do not change the status to finished.
+            if self._status != STATUS_ABORTED:
+                self._status = STATUS_FINISHED
+
+        return self.data_processor.get_data()
+
+    def _read_sample_position(self, move_start_time, start_positions, end_positions):
+        """
+        Get the current position of the writables during a continuous move.
+        :param move_start_time: Monotonic time at which the move started.
+        :param start_positions: Positions at the beginning of the move.
+        :param end_positions: Positions at the end of the move.
+        :return: Tuple of (monotonic timestamp, positions).
+        """
+        timestamp = monotonic()
+
+        if self.position_reader:
+            return timestamp, convert_to_list(self.position_reader())
+
+        # Without readbacks, we can only calculate where the writables should be.
+        fraction = min((timestamp - move_start_time) / self.settings.move_time, 1)
+        return timestamp, interpolate_position(fraction, 0, start_positions, 1, end_positions)
+
     def continuous_scan(self):
-        # TODO: Needs implementation.
-        pass
+        """
+        Perform a continuous scan - move from the first to the last position in a single move, and read the data
+        while moving. The number of samples is the number of positions the positioner provides; the samples are
+        evenly spaced over the move time. Each sample is tagged with the writables position interpolated at the
+        middle of the read. The before measurement executor receives the nominal position of the sample, on the line
+        from the first to the last position. Return value at the end.
+        """
+        if self.settings.move_time is None:
+            raise ValueError("Scan settings move_time must be set for continuous scans.")
+
+        if not self.continuous_writer:
+            raise ValueError("A continuous writer is needed for continuous scans.")
+
+        if self.resume_from:
+            raise ValueError("Continuous scans cannot be resumed.")
+
+        self._check_journal()
+
+        n_of_samples = self._get_n_positions()
+        if not n_of_samples:
+            raise ValueError("Continuous scans need a positioner that provides its number of positions.")
+
+        try:
+            self._status = STATUS_RUNNING
+
+            # Only the first and the last positions are used for the move, the others are not generated.
+            start_positions = convert_to_list(next(iter(seek_generator(self.positioner, 0))))
+            end_positions = convert_to_list(next(iter(seek_generator(self.positioner, n_of_samples - 1))))
+
+            # Report the 0% completed.
+            self.settings.progress_callback(0, n_of_samples)
+
+            # Set up the experiment.
+            if self.initialization_executor:
+                self.initialization_executor(self)
+
+            self._start_processing()
+
+            # Move to the start position before starting the continuous move.
+            if self.writer:
+                self.writer(start_positions)
+                self._check_abort()
+
+            self._wait(self.settings.settling_time)
+
+            # Velocity for each axis to cover the distance in the requested time.
+            velocities = [abs(end - start) / self.settings.move_time
+                          for start, end in zip(start_positions, end_positions)]
+
+            if self.before_move_executor:
+                self.before_move_executor(end_positions)
+
+            move_start_time = monotonic()
+            self.continuous_writer(end_positions, velocities)
+
+            sample_interval = self.settings.move_time / max(n_of_samples - 1, 1)
+
+            for sample_index in range(n_of_samples):
+                # Wait for the next sampling time. Bs readers additionally wait for the next message in the stream.
+                self._wait(move_start_time + (sample_index * sample_interval) - monotonic())
+
+                self.instrumentation.step_started(sample_index + 1)
+
+                if self.before_measurement_executor:
+                    sample_fraction = sample_index / max(n_of_samples - 1, 1)
+                    self.before_measurement_executor([start + ((end - start) * sample_fraction)
+                                                      for start, end in zip(start_positions, end_positions)])
+
+                timestamp_before, position_before = self._read_sample_position(move_start_time, start_positions,
+                                                                               end_positions)
+                sample_data = self._perform_single_read(sample_index)
+                timestamp_after, position_after = self._read_sample_position(move_start_time, start_positions,
+                                                                             end_positions)
+
+                # Tag the sample with the position at the middle of the read.
+                sample_position = interpolate_position((timestamp_before + timestamp_after) / 2,
+                                                       timestamp_before, position_before,
+                                                       timestamp_after, position_after)
+
+                self._submit_processing(sample_index + 1, n_of_samples, sample_position, sample_data)
+
+                self.instrumentation.step_finished()
+
+                self._verify_scan_status()
+
+            # Wait for the writables to reach the end position.
+            if self.writer:
+                self.writer(end_positions)
+                self._check_abort()
+
+            if self.after_move_executor:
+                self.after_move_executor(end_positions)
+
+            # Wait for all the data to be processed.
+            self._stop_processing()
+        finally:
+            # Stop the processing thread in case of errors, without hiding the original error.
+            try:
+                self._stop_processing()
+            except Exception:
+                pass
+
+            # Clean up after yourself.
+            if self.finalization_executor:
+                self.finalization_executor(self)
+
+            # If the scan was aborted we do not change the status to finished.
+            if self._status != STATUS_ABORTED:
+                self._status = STATUS_FINISHED
+
+        return self.data_processor.get_data()
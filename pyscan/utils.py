@@ -1,7 +1,10 @@
 import inspect
 from collections import OrderedDict
-from time import sleep
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait as wait_for_futures
+from itertools import islice
+from time import monotonic
 
+import numpy
 from epics.pv import PV
 
 from pyscan import config
@@ -77,20 +80,145 @@ def compare_channel_value(current_value, expected_value, tolerance=0.0, operatio
         return compare_value(current_value)
 
 
+def compare_channel_values(current_values, expected_value, tolerance=0.0, operation=ConditionComparison.EQUAL):
+    """
+    Vectorized compare_channel_value, to check the values of many messages at once.
+    :param current_values: Array of values, one value per row.
+    :param expected_value: Expected value of the PV.
+    :param tolerance: Tolerance for float comparison. Cannot be less than the minimum tolerance.
+    :param operation: Operation to perform on the current and expected value.
+    :return: Boolean array, True for the rows with a matching value.
+    """
+    # Minimum tolerance allowed.
+    tolerance = max(tolerance, config.max_float_tolerance)
+
+    current_values = numpy.asarray(current_values)
+    scalar_values = current_values.ndim == 1 and current_values.dtype.kind in "biuf"
+
+    # Non scalar values (arrays, strings, lists) are compared one by one.
+    if not scalar_values or not isinstance(expected_value, (float, int)):
+        return numpy.array([compare_channel_value(value, expected_value, tolerance, operation)
+                            for value in current_values], dtype=bool)
+
+    # Floats are compared within tolerance, like in compare_channel_value.
+    if current_values.dtype.kind == "f":
+        difference = current_values - expected_value
+
+        if operation == ConditionComparison.EQUAL:
+            return numpy.abs(difference) <= tolerance
+
+        elif operation == ConditionComparison.HIGHER:
+            return difference > tolerance
+
+        elif operation == ConditionComparison.HIGHER_OR_EQUAL:
+            return difference >= tolerance
+
+        elif operation == ConditionComparison.LOWER:
+            return (difference < 0) | (numpy.abs(difference) < tolerance)
+
+        elif operation == ConditionComparison.LOWER_OR_EQUAL:
+            return (difference <= 0) | (numpy.abs(difference) <= tolerance)
+
+        elif operation == ConditionComparison.NOT_EQUAL:
+            return numpy.abs(difference) > tolerance
+
+    else:
+        if operation == ConditionComparison.EQUAL:
+            return current_values == expected_value
+
+        elif operation == ConditionComparison.HIGHER:
+            return current_values > expected_value
+
+        elif operation == ConditionComparison.HIGHER_OR_EQUAL:
+            return current_values >= expected_value
+
+        elif operation == ConditionComparison.LOWER:
+            return current_values < expected_value
+
+        elif operation == ConditionComparison.LOWER_OR_EQUAL:
+            return current_values <= expected_value
+
+        elif operation == ConditionComparison.NOT_EQUAL:
+            return current_values != expected_value
+
+    return numpy.zeros(len(current_values), dtype=bool)
+
+
 def connect_to_pv(pv_name, n_connection_attempts=3):
     """
     Start a connection to a PV.
     :param pv_name: PV name to connect to.
-    :param n_connection_attempts: How many times you should try to connect before raising an exception.
+    :param n_connection_attempts: Not used, the connection waits for config.epics_connection_timeout. Kept for
+    backward compatibility.
     :return: PV object.
     :raises ValueError if cannot connect to PV.
     """
-    pv = PV(pv_name, auto_monitor=False)
-    for i in range(n_connection_attempts):
-        if pv.connect():
-            return pv
-        sleep(0.1)
-    raise ValueError("Cannot connect to PV '%s'." % pv_name)
+    return connect_to_pvs([pv_name])[0]
+
+
+def connect_to_pvs(pv_names, timeout=None):
+    """
+    Start the connections to all the PVs at once, and wait for all of them to connect.
+    :param pv_names: PV names to connect to.
+    :param timeout: Time to wait for all the PVs to connect. Default: config.epics_connection_timeout
+    :return: List of PV objects, in the order of the PV names.
+    :raises ValueError listing all the PVs that could not connect.
+    """
+    if timeout is None:
+        timeout = config.epics_connection_timeout
+
+    # Creating a PV only starts the channel search - the searches for all the PVs run in parallel.
+    pvs = [PV(pv_name, auto_monitor=False) for pv_name in pv_names]
+
+    deadline = monotonic() + timeout
+    for pv in pvs:
+        pv.wait_for_connection(timeout=max(deadline - monotonic(), 0))
+
+    unconnected_pv_names = [pv_name for pv_name, pv in zip(pv_names, pvs) if not pv.connected]
+    if unconnected_pv_names:
+        for pv in pvs:
+            pv.disconnect()
+
+        raise ValueError("Cannot connect to %d PV(s) in %s seconds:\n%s" %
+                         (len(unconnected_pv_names), timeout, "\n".join(unconnected_pv_names)))
+
+    return pvs
+
+
+def interpolate_position(timestamp, timestamp_before, position_before, timestamp_after, position_after):
+    """
+    Linearly interpolate the position of each axis at the given timestamp.
+    :param timestamp: Timestamp at which to calculate the position.
+    :param timestamp_before: Timestamp of the position sampled before.
+    :param position_before: List of axis positions sampled before.
+    :param timestamp_after: Timestamp of the position sampled after.
+    :param position_after: List of axis positions sampled after.
+    :return: List of interpolated axis positions.
+    """
+    # Both positions were sampled at the same time, nothing to interpolate.
+    if timestamp_after == timestamp_before:
+        return list(position_after)
+
+    fraction = (timestamp - timestamp_before) / (timestamp_after - timestamp_before)
+
+    return [before + (after - before) * fraction for before, after in zip(position_before, position_after)]
+
+
+def seek_generator(positioner, start_index=0):
+    """
+    Get the positioner generator, starting at the given position index.
+    Positioners that cannot seek (their get_generator does not accept start_index) are replayed to the start index.
+    :param positioner: Positioner to get the generator from.
+    :param start_index: Index (0 based) of the first position to generate.
+    :return: Generator of positions.
+    """
+    if not start_index:
+        return positioner.get_generator()
+
+    try:
+        return positioner.get_generator(start_index=start_index)
+    except TypeError:
+        return islice(positioner.get_generator(), start_index, None)
 
 
 def validate_lists_length(*args):
@@ -143,6 +271,86 @@ def flat_list_generator(list_to_flatten):
             yield from flat_list_generator(inner_list)
 
 
+class ConcurrentReader(object):
+    """
+    Call read functions concurrently in a thread pool, and collect their results.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._max_workers = 0
+        # Reads that timed out, but might still be running {name: future}.
+        self._timed_out_reads = {}
+
+    def read(self, read_functions):
+        """
+        Call all the read functions concurrently and wait for their results.
+        :param read_functions: List of (name, function, timeout). The function is called without parameters. The
+        timeout (in seconds, None for no timeout) is measured from the start of the concurrent read.
+        :return: List of results, in the order of the read functions.
+        :raise Exception listing all the read functions that failed or timed out, or if a read function that timed
+        out in a previous read is still running.
+        """
+        # The sources are not thread safe (the bs stream socket, for example) - a source cannot be read again while
+        # its read that timed out is still running.
+        self._timed_out_reads = {name: future for name, future in self._timed_out_reads.items() if not future.done()}
+        running_names = [name for name, _, _ in read_functions if name in self._timed_out_reads]
+        if running_names:
+            raise Exception("Cannot read %s, the previous read timed out and is still running." %
+                            ", ".join(running_names))
+
+        # One thread per read function, so all of them start immediately.
+        if self._executor is None or self._max_workers < len(read_functions):
+            self._stop_executor()
+            self._max_workers = len(read_functions)
+            self._executor = ThreadPoolExecutor(max_workers=self._max_workers)
+
+        start_time = monotonic()
+        futures = [(name, self._executor.submit(function), timeout) for name, function, timeout in read_functions]
+
+        results = []
+        errors = []
+        timed_out = False
+        for name, future, timeout in futures:
+            remaining_time = None if timeout is None else max(timeout - (monotonic() - start_time), 0)
+
+            try:
+                results.append(future.result(remaining_time))
+            except FutureTimeoutError:
+                timed_out = True
+                self._timed_out_reads[name] = future
+                errors.append("%s: read timeout of %s seconds exceeded." % (name, timeout))
+            except Exception as e:
+                errors.append("%s: %s" % (name, e))
+
+        # Functions that timed out still occupy their threads - the next read uses a new thread pool.
+        if timed_out:
+            self._stop_executor()
+
+        if errors:
+            raise Exception("Reading failed for %d source(s):\n%s" % (len(errors), "\n".join(errors)))
+
+        return results
+
+    def _stop_executor(self):
+        """
+        Stop the thread pool, without waiting for the running read functions.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def close(self):
+        """
+        Stop the thread pool, and wait for the read functions that timed out to finish, so their sources can be
+        closed. The thread pool is started again on the next read.
+        """
+        self._stop_executor()
+
+        wait_for_futures(self._timed_out_reads.values())
+        self._timed_out_reads = {}
+
+
 class ActionExecutor(object):
     """
     Execute all callbacks in the same thread.
@@ -170,6 +378,16 @@ class ActionExecutor(object):
                 action()
 
 
+def _convert_block_columns(data):
+    """
+    Convert the scalar columns of a block to lists of Python values, like the values of the discrete scans. Array
+    columns are kept, with one array per position.
+    :param data: List of arrays, one array per readable, with one row per position.
+    :return: List of columns, indexable by position.
+    """
+    return [column.tolist() if column.ndim == 1 else column for column in data]
+
+
 class SimpleDataProcessor(object):
     """
     Save the position and the received data at this position.
@@ -188,6 +406,28 @@ class SimpleDataProcessor(object):
         self.positions.append(position)
         self.data.append(data)
 
+        # The data is kept only in memory, so the journal pointer is the data itself.
+        return data
+
+    def restore(self, position, pointer):
+        """
+        Restore the data of a position completed in a previous run of the scan.
+        :param position: Position from the journal.
+        :param pointer: Data of the position, as returned by process (read from the journal).
+        """
+        self.process(position, pointer)
+
+    def process_block(self, positions, data):
+        """
+        Process the data of many positions at once.
+        :param positions: List of positions.
+        :param data: List of arrays, one array per readable, with one row per position.
+        """
+        self.positions.extend(positions)
+
+        columns = _convert_block_columns(data)
+        self.data.extend([column[index] for column in columns] for index in range(len(positions)))
+
     def get_data(self):
         return self.data
 
@@ -214,3 +454,13 @@ class DictionaryDataProcessor(SimpleDataProcessor):
         # Create a dictionary with the results.
         values = OrderedDict(zip(self.readable_ids, data))
         self.data.append(values)
+
+        return data
+
+    def process_block(self, positions, data):
+        self.positions.extend(positions)
+
+        columns = _convert_block_columns(data)
+        self.data.extend(OrderedDict((readable_id, column[index]) for readable_id, column in
+                                     zip(self.readable_ids, columns))
+                         for index in range(len(positions)))
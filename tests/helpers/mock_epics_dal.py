@@ -1,4 +1,5 @@
 from itertools import cycle
+from time import time
 
 from pyscan.dal.epics_dal import PyEpicsDal, ReadGroupInterface, WriteGroupInterface
 from pyscan.interface.pyScan import READ_GROUP, convert_to_list
@@ -54,6 +55,10 @@ class MockReadGroupInterface(ReadGroupInterface):
     def connect(pv_name):
         return MockPV(pv_name)
 
+    @staticmethod
+    def connect_all(pv_names):
+        return [MockPV(pv_name) for pv_name in pv_names]
+
     def read(self, current_position_index=None, retry=False):
         result = super(MockReadGroupInterface, self).read(current_position_index)
         if self.save_values:
@@ -66,6 +71,10 @@ class MockWriteGroupInterface(WriteGroupInterface):
     def connect(pv_name):
         return MockPV(pv_name)
 
+    @staticmethod
+    def connect_all(pv_names):
+        return [MockPV(pv_name) for pv_name in pv_names]
+
     def set_and_match(self, values, tolerances=None, timeout=None):
         # This is not ideal, since we are not testing the original set_and_match method.0
         # Write all the PV values.
@@ -82,6 +91,10 @@ class MockPV(object):
     def __init__(self, pv_name, readback_pv_name=None):
         self.pv_name = pv_name
         self.readback_pv_name = readback_pv_name
+        self.auto_monitor = False
+        self.callbacks = {}
+        self.put_complete = True
+        self.timestamp = time()
         if pv_name in cached_initial_values:
             self.value = cached_initial_values[pv_name]
         else:
@@ -93,14 +106,23 @@ class MockPV(object):
         else:
             pv_cache[pv_name] = [self]
 
-    def get(self):
+    @property
+    def chid(self):
+        # The channel id used by the channel access bulk read (mocked with MockCA in the tests).
+        return self
+
+    def get(self, use_monitor=True):
         if self.pv_name in fixed_values:
             return next(fixed_values[self.pv_name])
         else:
             return self.value
 
-    def put(self, value):
+    def put(self, value, use_complete=False, callback=None, callback_data=None):
         self.value = value
+        self.timestamp = time()
+
+        for monitor_callback, callback_kwargs in list(self.callbacks.values()):
+            monitor_callback(pvname=self.pv_name, value=value, timestamp=self.timestamp, **callback_kwargs)
 
         # If we have a readback PV, update it.
         if self.readback_pv_name:
@@ -112,6 +134,18 @@ class MockPV(object):
                 # Do not use PUT, it triggers a recursion.
                 pv.value = value
 
+        # The mock put completes immediately.
+        if callback is not None:
+            callback(pvname=self.pv_name, data=callback_data)
+
+    def add_callback(self, callback, with_ctrlvars=True, **kwargs):
+        index = max(self.callbacks, default=0) + 1
+        self.callbacks[index] = (callback, kwargs)
+        return index
+
+    def remove_callback(self, index=None):
+        self.callbacks.pop(index, None)
+
     def disconnect(self):
         pass
 
@@ -0,0 +1,368 @@
+import math
+import unittest
+from time import time, sleep
+
+import numpy
+
+from pyscan import config
+from pyscan.dal import bsread_dal
+from pyscan.dal.bsread_dal import MessageBuffer, ReadGroupInterface, ImmediateReadGroupInterface
+from pyscan.instrumentation import ScanInstrumentation
+from pyscan.positioner.bsread import BsreadPositioner
+from pyscan.scan import scan, scanner
+from pyscan.scan_parameters import bs_property, bs_condition, bs_pulse_id, ConditionAction, ConditionComparison, \
+    scan_settings, BsAggregation
+from pyscan.utils import compare_channel_values, DictionaryDataProcessor
+
+
+class FakeValue(object):
+    def __init__(self, value):
+        self.value = value
+
+
+class FakeMessageData(object):
+    def __init__(self, pulse_id, timestamp, data):
+        self.pulse_id = pulse_id
+        self.global_timestamp = int(timestamp)
+        self.global_timestamp_offset = int(math.modf(timestamp)[0] * 1e9)
+        self.data = {name: FakeValue(value) for name, value in data.items()}
+
+
+class FakeMessage(object):
+    def __init__(self, pulse_id, timestamp, data=None):
+        if data is None:
+            data = {"CHANNEL": pulse_id,
+                    "VALID": int(pulse_id % 3 != 0),
+                    "ARRAY": numpy.array([pulse_id, -pulse_id])}
+
+            # Every 5th message is missing the array channel.
+            if pulse_id % 5 == 0:
+                del data["ARRAY"]
+
+        self.data = FakeMessageData(pulse_id, timestamp, data)
+
+
+class FakeSource(object):
+    """
+    Generate a message every interval, with the current time and an increasing pulse id.
+    """
+    interval = 0.01
+    # Pulse ids lost by the stream.
+    lost_pulse_ids = set()
+
+    def __init__(self, *args, **kwargs):
+        self.pulse_id = 0
+        self.connected = False
+        self.channels = kwargs.get("channels")
+
+    def connect(self):
+        self.connected = True
+
+    def disconnect(self):
+        self.connected = False
+
+    def receive(self, filter=None):
+        sleep(self.interval)
+        self.pulse_id += 1
+        while self.pulse_id in self.lost_pulse_ids:
+            self.pulse_id += 1
+
+        return FakeMessage(self.pulse_id, time())
+
+
+class BsreadDalTests(unittest.TestCase):
+    def setUp(self):
+        self.original_source = bsread_dal.Source
+        self.original_receiver_thread = config.bs_receiver_thread
+        bsread_dal.Source = FakeSource
+        FakeSource.lost_pulse_ids = set()
+
+    def tearDown(self):
+        bsread_dal.Source = self.original_source
+        config.bs_receiver_thread = self.original_receiver_thread
+
+    def test_message_buffer(self):
+        buffer = MessageBuffer(size=5)
+        for pulse_id in range(1, 9):
+            buffer.append(FakeMessage(pulse_id, 100 + pulse_id))
+
+        # Only the last 5 messages are kept.
+        self.assertEqual(buffer.wait_for_message(pulse_id=0, timeout=0).data.pulse_id, 4)
+        self.assertEqual(buffer.wait_for_message(pulse_id=6, timeout=0).data.pulse_id, 6)
+        self.assertEqual(buffer.wait_for_message(timestamp=105.5, timeout=0).data.pulse_id, 6)
+        self.assertIsNone(buffer.wait_for_message(timestamp=108.5, timeout=0.1))
+
+        # A closed buffer does not wait for new messages.
+        buffer.close()
+        self.assertIsNone(buffer.wait_for_message(pulse_id=9, timeout=10))
+
+        # Pulse ids 1-3 were overwritten and 5, 7, 8 cleared without being read.
+        self.assertEqual(buffer.n_skipped, 3)
+        buffer.clear()
+        self.assertEqual(buffer.n_skipped, 6)
+
+    def test_receiver_thread_read(self):
+        config.bs_receiver_thread = True
+        reader = ReadGroupInterface(properties=[bs_property("CHANNEL")], conditions=[])
+
+        for _ in range(3):
+            read_timestamp = time()
+            reader.read()
+            self.assertTrue(ReadGroupInterface.is_message_after_timestamp(reader._message_cache, read_timestamp))
+
+        reader.close()
+        self.assertIsNone(reader._receiver_thread)
+        self.assertFalse(reader.stream.connected)
+
+    def test_receiver_thread_immediate_read(self):
+        config.bs_receiver_thread = True
+        reader = ImmediateReadGroupInterface(properties=[bs_property("CHANNEL")], conditions=[])
+
+        first_value = reader.read(0)[0]
+        # Messages received while not reading are buffered, and read in order.
+        sleep(0.1)
+        self.assertEqual(reader.read(0)[0], first_value, "The position value should be cached.")
+        self.assertEqual(reader.read(1)[0], first_value + 1)
+        self.assertEqual(reader.read(2)[0], first_value + 2)
+
+        reader.close()
+
+    def test_receiver_thread_error(self):
+        config.bs_receiver_thread = True
+        reader = ReadGroupInterface(properties=[bs_property("CHANNEL")], conditions=[])
+
+        def failing_receive(filter=None):
+            raise RuntimeError("Stream closed.")
+        reader.stream.receive = failing_receive
+
+        with self.assertRaisesRegex(Exception, "Stream closed."):
+            reader.read()
+
+        reader.close()
+
+    def test_pulse_id_readable(self):
+        reader = ReadGroupInterface(properties=[bs_property("CHANNEL"), bs_pulse_id()],
+                                    conditions=[bs_condition("CHANNEL", 0)])
+        self.assertEqual(reader.stream.channels, ["CHANNEL", "CHANNEL"], "The pulse id is not a stream channel.")
+
+        value, pulse_id = reader.read()
+        self.assertEqual(pulse_id, reader.get_cached_pulse_id())
+        # The fake stream sends the pulse id as the channel value.
+        self.assertEqual(value, pulse_id)
+
+        reader.close()
+
+    def test_read_pulse_id_range(self):
+        for receiver_thread in (False, True):
+            config.bs_receiver_thread = receiver_thread
+            reader = ReadGroupInterface(properties=[bs_property("CHANNEL")], conditions=[bs_condition("CHANNEL", 0)])
+
+            result = reader.read_pulse_id_range(5, 8)
+            self.assertEqual(result, [(5, [5], [5]), (6, [6], [6]), (7, [7], [7])])
+
+            self.assertEqual(reader.read_pulse_id_range(10), [(10, [10], [10])])
+
+            with self.assertRaisesRegex(ValueError, "must be larger"):
+                reader.read_pulse_id_range(10, 10)
+
+            with self.assertRaisesRegex(Exception, "did not arrive in time"):
+                reader.read_pulse_id_range(1000, timeout=0.1)
+
+            reader.close()
+
+    def test_read_block(self):
+        FakeSource.lost_pulse_ids = {4, 5, 12}
+        reader = ImmediateReadGroupInterface(properties=[bs_property("CHANNEL"), bs_property("ARRAY", None)],
+                                             conditions=[bs_condition("VALID", 1)])
+
+        block = reader.read_block(5)
+        numpy.testing.assert_array_equal(block.pulse_ids, [1, 2, 3, 6, 7])
+        self.assertEqual(block.n_missing_pulse_ids, 2)
+        numpy.testing.assert_array_equal(block.properties[0], [1, 2, 3, 6, 7])
+        self.assertEqual(block.properties[1].shape, (5, 2))
+        numpy.testing.assert_array_equal(block.conditions[0], [1, 1, 0, 0, 1])
+
+        # The gap between the blocks is reported as well.
+        block = reader.read_block(5)
+        numpy.testing.assert_array_equal(block.pulse_ids, [8, 9, 10, 11, 13])
+        self.assertEqual(block.n_missing_pulse_ids, 1)
+        # Pulse id 10 is missing the array, and the column is converted to objects.
+        self.assertEqual(block.properties[1].dtype, object)
+        self.assertIsNone(block.properties[1][2])
+        self.assertEqual(list(block.properties[1][0]), [8, -8])
+
+        reader.close()
+
+    def test_compare_channel_values(self):
+        float_values = numpy.array([1.0, 2.0, 3.0])
+        numpy.testing.assert_array_equal(compare_channel_values(float_values, 2), [False, True, False])
+        numpy.testing.assert_array_equal(compare_channel_values(float_values, 2.5, 0.6), [False, True, True])
+        numpy.testing.assert_array_equal(
+            compare_channel_values(float_values, 2, operation=ConditionComparison.HIGHER), [False, False, True])
+
+        int_values = numpy.array([1, 2, 3])
+        numpy.testing.assert_array_equal(
+            compare_channel_values(int_values, 2, operation=ConditionComparison.LOWER_OR_EQUAL), [True, True, False])
+
+        string_values = numpy.array(["a", "b"], dtype=object)
+        numpy.testing.assert_array_equal(compare_channel_values(string_values, "b"), [False, True])
+
+    def test_block_scan(self):
+        FakeSource.interval = 0.001
+        self.addCleanup(setattr, FakeSource, "interval", 0.01)
+
+        readables = [bs_property("CHANNEL"), bs_pulse_id()]
+        positioner = BsreadPositioner(n_messages=20, block_size=8)
+        conditions = [bs_condition("VALID", 1, action=ConditionAction.Retry)]
+        data_processor = DictionaryDataProcessor(readables)
+
+        result = scan(positioner=positioner, readables=readables, conditions=conditions,
+                      data_processor=data_processor, settings=scan_settings(progress_callback=lambda *args: None))
+
+        self.assertEqual(len(result), 20)
+        self.assertEqual(data_processor.get_positions(), list(range(20)))
+        # The messages not fulfilling the condition are skipped.
+        self.assertTrue(all(x["CHANNEL"] % 3 != 0 for x in result))
+        self.assertEqual([x["CHANNEL"] for x in result], [x["pulse_id"] for x in result])
+        self.assertTrue(all(type(x["CHANNEL"]) is int for x in result))
+
+        with self.assertRaisesRegex(ValueError, "Condition VALID failed"):
+            scan(positioner=BsreadPositioner(n_messages=20, block_size=8), readables=readables,
+                 conditions=[bs_condition("VALID", 1)], settings=scan_settings(progress_callback=lambda *args: None))
+
+        with self.assertRaisesRegex(ValueError, "only bs readables"):
+            scan(positioner=BsreadPositioner(n_messages=20, block_size=8), readables=readables + ["PV"])
+
+        class UnknownLengthPositioner(object):
+            supports_block_acquisition = True
+
+            def get_generator(self):
+                return iter(range(20))
+
+        with self.assertRaisesRegex(ValueError, "Block scans need a positioner that provides its number of positions"):
+            scan(positioner=UnknownLengthPositioner(), readables=readables)
+
+    def test_read_consecutive_messages(self):
+        reader = ImmediateReadGroupInterface(properties=[bs_property("CHANNEL"), bs_property("ARRAY", None)],
+                                             conditions=[bs_condition("VALID", 1)], n_messages=2,
+                                             aggregation=BsAggregation.Mean)
+
+        # Pulse ids 1 and 2.
+        self.assertEqual(reader.read(0)[0], 1.5)
+        numpy.testing.assert_array_equal(reader.read(0)[1], [1.5, -1.5])
+        self.assertEqual(reader.read_cached_conditions(), [1])
+
+        # Pulse ids 3 and 4: the condition fails for 3.
+        self.assertEqual(reader.read(1)[0], 3.5)
+        self.assertEqual(reader.read_cached_conditions(), [0])
+
+        # Retry reads the next messages, pulse ids 5 and 6 (array missing for 5).
+        with self.assertRaisesRegex(ValueError, "Cannot aggregate"):
+            reader.read(1, retry=True)
+
+        reader.close()
+
+        reader = ImmediateReadGroupInterface(properties=[bs_property("CHANNEL")], conditions=[], n_messages=3,
+                                             aggregation=BsAggregation.All)
+        numpy.testing.assert_array_equal(reader.read(0)[0], [1, 2, 3])
+        reader.close()
+
+        # The pulse id and string values are not aggregated, the first message value is used.
+        reader = ImmediateReadGroupInterface(properties=[bs_property("CHANNEL"), bs_pulse_id(), bs_property("NAME")],
+                                             conditions=[], n_messages=3, aggregation=BsAggregation.Std)
+        reader.stream.receive = lambda filter=None, pulse_ids=iter(range(1, 7)): \
+            FakeMessage(next(pulse_ids), time(), {"CHANNEL": 1.0, "NAME": "camera"})
+        self.assertEqual(reader.read(0), [0, 1, "camera"])
+        self.assertEqual(reader.read(1), [0, 4, "camera"])
+        reader.close()
+
+        with self.assertRaisesRegex(ValueError, "Aggregation must be one of"):
+            ImmediateReadGroupInterface(properties=[bs_property("CHANNEL")], conditions=[], n_messages=3,
+                                        aggregation="mean")
+
+    def test_scan_consecutive_messages(self):
+        FakeSource.interval = 0.001
+        self.addCleanup(setattr, FakeSource, "interval", 0.01)
+
+        readables = [bs_property("CHANNEL"), bs_pulse_id()]
+        positioner = BsreadPositioner(n_messages=4, aggregation=BsAggregation.Std)
+        conditions = [bs_condition("VALID", 1, action=ConditionAction.Retry)]
+
+        config.scan_acquisition_retry_delay, retry_delay = 0, config.scan_acquisition_retry_delay
+        self.addCleanup(setattr, config, "scan_acquisition_retry_delay", retry_delay)
+
+        result = scan(positioner=positioner, readables=readables, conditions=conditions,
+                      settings=scan_settings(n_measurements=2, progress_callback=lambda *args: None))
+
+        # Each position has the std of 2 consecutive messages and the first pulse id, no message fails the condition.
+        self.assertEqual([value for value, _ in result], [0.5] * 4)
+        self.assertEqual([pulse_id % 3 for _, pulse_id in result], [1] * 4)
+        self.assertEqual(positioner.bs_reader.get_cached_pulse_id() % 3, 2)
+
+    def test_stream_statistics(self):
+        FakeSource.lost_pulse_ids = {3, 4, 8}
+
+        # Accept only the odd pulse ids.
+        reader = ReadGroupInterface(properties=[bs_property("CHANNEL")], conditions=[],
+                                    filter_function=lambda message: message.data.pulse_id % 2 == 1)
+
+        def receive(filter=None, original_receive=reader.stream.receive):
+            # The first receive times out.
+            if reader.stream.pulse_id == 0 and not reader.get_statistics()["receive_timeouts"]:
+                return None
+            return original_receive()
+        reader.stream.receive = receive
+
+        reader.read_pulse_id_range(11)
+        statistics = reader.get_statistics()
+
+        # Received pulse ids: 1, 2, 5, 6, 7, 9, 10, 11. The even ones are filtered, the odd ones before 11 skipped.
+        self.assertEqual(statistics["received"], 8)
+        self.assertEqual(statistics["filtered"], 3)
+        self.assertEqual(statistics["skipped"], 4)
+        self.assertEqual(statistics["receive_timeouts"], 1)
+        self.assertEqual(statistics["missing_pulse_ids"], 3)
+        self.assertEqual(statistics["pulse_id_gaps"], 2)
+        self.assertEqual(statistics["latency"]["count"], 8)
+        self.assertNotIn("buffer_overwritten", statistics)
+
+        reader.reset_statistics()
+        self.assertEqual(reader.get_statistics()["received"], 0)
+
+        reader.close()
+
+    def test_scan_stream_statistics(self):
+        FakeSource.interval = 0.001
+        self.addCleanup(setattr, FakeSource, "interval", 0.01)
+        FakeSource.lost_pulse_ids = {3}
+
+        instrumentation = ScanInstrumentation()
+        scan(positioner=BsreadPositioner(n_messages=5), readables=[bs_property("CHANNEL")],
+             instrumentation=instrumentation, settings=scan_settings(progress_callback=lambda *args: None))
+
+        statistics = instrumentation.get_statistics()["bs"]
+        self.assertEqual(statistics["received"], 5)
+        self.assertEqual(statistics["missing_pulse_ids"], 1)
+
+    def test_scanner_stream_statistics(self):
+        # The statistics are available from the scanner also without instrumentation.
+        scanner_instance = scanner(positioner=BsreadPositioner(n_messages=3), readables=[bs_property("CHANNEL")],
+                                   settings=scan_settings(progress_callback=lambda *args: None))
+        scanner_instance.discrete_scan()
+
+        self.assertEqual(scanner_instance.statistics["bs"]["received"], 3)
+
+    def test_receiver_thread_stream_statistics(self):
+        config.bs_receiver_thread = True
+        reader = ReadGroupInterface(properties=[bs_property("CHANNEL")], conditions=[])
+
+        reader.read()
+        sleep(0.1)
+        reader.stop_receiver()
+
+        # Every buffered message except the read one was skipped.
+        statistics = reader.get_statistics()
+        self.assertGreater(statistics["received"], 5)
+        self.assertEqual(statistics["skipped"], statistics["received"] - 1)
+
+        reader.close()
@@ -0,0 +1,465 @@
+import threading
+import unittest
+from time import time, sleep
+
+from pyscan import utils as utils_module
+from pyscan.dal import epics_dal as epics_dal_module
+from pyscan import config
+from pyscan.dal.epics_dal import WriteGroupInterface, StallError, ReadGroupInterface, MonitoredReadGroupInterface, \
+    pv_pool
+from tests.helpers.mock_epics_dal import MockPV, MockReadGroupInterface, pv_cache
+
+
+class CountingMockPV(MockPV):
+    """
+    Mock PV that counts the get and put calls.
+    """
+    def __init__(self, pv_name, readback_pv_name=None):
+        super(CountingMockPV, self).__init__(pv_name, readback_pv_name)
+        self.n_gets = 0
+        self.n_puts = 0
+
+    def get(self, use_monitor=True):
+        self.n_gets += 1
+        return super(CountingMockPV, self).get(use_monitor)
+
+    def put(self, value, *args, **kwargs):
+        self.n_puts += 1
+        super(CountingMockPV, self).put(value, *args, **kwargs)
+
+
+class MonitoringMockPV(MockPV):
+    """
+    Mock PV that returns the last monitored value when monitored, unless the value is read from the IOC.
+    """
+    def __init__(self, pv_name, readback_pv_name=None):
+        super(MonitoringMockPV, self).__init__(pv_name, readback_pv_name)
+        self.monitored_value = self.value
+
+    def get(self, use_monitor=True):
+        if self.auto_monitor and use_monitor:
+            return self.monitored_value
+        return super(MonitoringMockPV, self).get(use_monitor)
+
+    def put(self, value, *args, **kwargs):
+        self.monitored_value = value
+        super(MonitoringMockPV, self).put(value, *args, **kwargs)
+
+
+class SearchingMockPV(object):
+    """
+    Mock the channel search of a PV: it starts when the PV is created, PVs with "OFFLINE" in the name never connect.
+    """
+    search_time = 0.2
+
+    def __init__(self, pv_name, auto_monitor=None):
+        self.pv_name = pv_name
+        self.search_end_time = time() + self.search_time
+        self.disconnected = False
+
+    @property
+    def connected(self):
+        return "OFFLINE" not in self.pv_name and time() >= self.search_end_time
+
+    def wait_for_connection(self, timeout=None):
+        connection_time = float("inf") if "OFFLINE" in self.pv_name else self.search_end_time
+        sleep(max(min(connection_time - time(), timeout), 0))
+        return self.connected
+
+    def disconnect(self):
+        self.disconnected = True
+
+
+class MockCA(object):
+    """
+    Mock the channel access get requests of the CA module. Channels named "SLOW" never answer.
+    """
+    def __init__(self):
+        self.pending = []
+        self.n_polls = 0
+
+    def get(self, chid, wait=True):
+        self.pending.append(chid)
+
+    def poll(self):
+        self.n_polls += 1
+
+    def get_complete(self, chid, timeout=None):
+        # All requests are flushed before collecting the values.
+        assert self.n_polls == 1
+
+        if "SLOW" in chid.pv_name:
+            sleep(timeout)
+            return None
+
+        return chid.get()
+
+
+class CountingMonitoredReadGroupInterface(MonitoredReadGroupInterface):
+    @staticmethod
+    def connect_all(pv_names):
+        return [CountingMockPV(pv_name) for pv_name in pv_names]
+
+
+class CountingWriteGroupInterface(WriteGroupInterface):
+    @staticmethod
+    def connect(pv_name):
+        return CountingMockPV(pv_name)
+
+    @staticmethod
+    def connect_all(pv_names):
+        return [CountingMockPV(pv_name) for pv_name in pv_names]
+
+
+class MonitoringWriteGroupInterface(WriteGroupInterface):
+    @staticmethod
+    def connect_all(pv_names):
+        return [MonitoringMockPV(pv_name) for pv_name in pv_names]
+
+
+class EpicsDalTests(unittest.TestCase):
+    def setUp(self):
+        pv_cache.clear()
+        pv_pool.clear()
+
+    def test_set_and_match_with_monitors(self):
+        move_time = 0.25
+
+        writer = CountingWriteGroupInterface(["PYSCAN:TEST:MOTOR1:SET"], ["PYSCAN:TEST:MOTOR1:GET"], timeout=2,
+                                             use_monitors=True)
+        readback_pv = writer.readback_pvs[0]
+
+        def move_motor():
+            sleep(move_time)
+            readback_pv.put(5)
+
+        threading.Thread(target=move_motor).start()
+
+        start_time = time()
+        writer.set_and_match(5)
+        set_time = time() - start_time
+
+        self.assertTrue(abs(set_time - move_time) < 0.05, "The readback change was not detected immediately.")
+        # Only the initial value is read, the rest comes from the monitor.
+        self.assertEqual(readback_pv.n_gets, 1)
+
+        self.assertRaisesRegex(ValueError, "Cannot achieve value 10", writer.set_and_match, 10, timeout=0.2)
+
+    def test_set_and_match_with_polling(self):
+        writer = CountingWriteGroupInterface(["PYSCAN:TEST:MOTOR1:SET"], timeout=2, use_monitors=False)
+
+        writer.set_and_match(5)
+        self.assertEqual(writer.readback_pvs[0].get(), 5)
+
+    def test_set_and_match_done_pv(self):
+        for use_monitors in (False, True):
+            pv_cache.clear()
+            writer = CountingWriteGroupInterface(["PYSCAN:TEST:MOTOR1:SET"], timeout=0.3, use_monitors=use_monitors,
+                                                 done_pv_names=["PYSCAN:TEST:MOTOR1:DMOV"])
+            done_pv = writer.done_pvs[0]
+
+            # The readback is reached, but the motor is still moving.
+            done_pv.put(0)
+            self.assertRaisesRegex(ValueError, "Done PV PYSCAN:TEST:MOTOR1:DMOV has to be 1",
+                                   writer.set_and_match, 5)
+
+            def stop_motor():
+                sleep(0.1)
+                done_pv.put(1)
+
+            threading.Thread(target=stop_motor).start()
+            writer.set_and_match(6)
+            writer.close()
+
+    def test_set_and_match_completion_strategies(self):
+        for use_monitors in (False, True):
+            pv_cache.clear()
+            # Done PV only: the readback does not reach the set value.
+            writer = CountingWriteGroupInterface(["PYSCAN:TEST:MOTOR1:SET"], ["PYSCAN:TEST:MOTOR1:GET"], timeout=0.3,
+                                                 use_monitors=use_monitors, done_pv_names=["PYSCAN:TEST:MOTOR1:DMOV"])
+            writer.readback_pvs[0].put(0)
+            writer.done_pvs[0].put(1)
+            writer.set_and_match(5)
+            writer.close()
+
+            # Put completion only.
+            writer = CountingWriteGroupInterface(["PYSCAN:TEST:MOTOR2:SET"], ["PYSCAN:TEST:MOTOR2:GET"], timeout=0.3,
+                                                 use_monitors=use_monitors, use_complete=True)
+            writer.readback_pvs[0].put(0)
+            writer.set_and_match(5)
+            writer.close()
+
+            # With a tolerance, the readback is checked as well.
+            writer = CountingWriteGroupInterface(["PYSCAN:TEST:MOTOR1:SET"], ["PYSCAN:TEST:MOTOR1:GET"],
+                                                 tolerances=[0.1], timeout=0.3, use_monitors=use_monitors,
+                                                 done_pv_names=["PYSCAN:TEST:MOTOR1:DMOV"])
+            self.assertRaisesRegex(ValueError, "Cannot achieve value 5", writer.set_and_match, 5)
+            writer.close()
+
+    def test_set_and_match_stale_done_monitor(self):
+        writer = MonitoringWriteGroupInterface(["PYSCAN:TEST:MOTOR1:SET"], timeout=1, use_monitors=True,
+                                               done_pv_names=["PYSCAN:TEST:MOTOR1:DMOV"])
+        done_pv = writer.done_pvs[0]
+        done_pv.put(1)
+        writer.set_and_match(5)
+
+        # The motor started moving, but the monitor did not post it yet.
+        done_pv.value = 0
+
+        def stop_motor():
+            sleep(0.2)
+            done_pv.put(1)
+
+        threading.Thread(target=stop_motor).start()
+        start_time = time()
+        writer.set_and_match(6)
+
+        # The stale monitored done value does not complete the move.
+        self.assertGreater(time() - start_time, 0.15)
+        writer.close()
+
+    def test_set_and_match_readback_value(self):
+        writer = CountingWriteGroupInterface(["PYSCAN:TEST:MOTOR1:SET"], ["PYSCAN:TEST:MOTOR1:GET"], timeout=0.3,
+                                             readback_values=["IDLE"])
+        readback_pv = writer.readback_pvs[0]
+
+        readback_pv.put("MOVING")
+        self.assertRaisesRegex(ValueError, "Cannot achieve value 5", writer.set_and_match, 5)
+
+        readback_pv.put("IDLE")
+        writer.set_and_match(5)
+
+    def test_set_and_match_use_complete(self):
+        writer = CountingWriteGroupInterface(["PYSCAN:TEST:MOTOR1:SET"], timeout=0.3, use_complete=True)
+        pv = writer.pvs[0]
+
+        writer.set_and_match(5)
+
+        pv.put_complete = False
+        pv.put = lambda value, **kwargs: None
+        self.assertRaisesRegex(ValueError, "Put to PV PYSCAN:TEST:MOTOR1:SET did not complete",
+                               writer.set_and_match, 5)
+
+    def test_set_and_match_stall(self):
+        for use_monitors in (False, True):
+            pv_cache.clear()
+            writer = CountingWriteGroupInterface(["PYSCAN:TEST:MOTOR1:SET"], ["PYSCAN:TEST:MOTOR1:GET"], timeout=5,
+                                                 use_monitors=use_monitors, stall_time=0.3)
+            readback_pv = writer.readback_pvs[0]
+            readback_pv.put(0)
+
+            # The motor moves slowly, but it keeps getting closer.
+            def move_motor():
+                for position in range(1, 6):
+                    sleep(0.15)
+                    readback_pv.put(position)
+
+            threading.Thread(target=move_motor).start()
+            writer.set_and_match(5)
+
+            # The motor does not move anymore.
+            start_time = time()
+            with self.assertRaisesRegex(StallError, "PV PYSCAN:TEST:MOTOR1:SET stalled at 5") as context:
+                writer.set_and_match(10)
+
+            self.assertLess(time() - start_time, 1, "The stall was not detected before the timeout.")
+            samples = context.exception.trajectories["PYSCAN:TEST:MOTOR1:SET"]
+            self.assertGreater(len(samples), 1)
+            self.assertTrue(all(value == 5 for _, value in samples))
+            self.assertEqual(context.exception.expected_values["PYSCAN:TEST:MOTOR1:SET"], 10)
+            self.assertEqual(context.exception.get_velocity("PYSCAN:TEST:MOTOR1:SET"), 0)
+
+    def test_connect_all(self):
+        original_pv = utils_module.PV
+        utils_module.PV = SearchingMockPV
+
+        try:
+            pv_names = ["PYSCAN:TEST:PV%d" % index for index in range(20)]
+
+            start_time = time()
+            reader = ReadGroupInterface(pv_names)
+            connection_time = time() - start_time
+
+            self.assertEqual([pv.pv_name for pv in reader.pvs], pv_names)
+            # The channel searches run in parallel.
+            self.assertLess(connection_time, SearchingMockPV.search_time * 3)
+            reader.close()
+
+            offline_pv_names = ["PYSCAN:TEST:OFFLINE1", "PYSCAN:TEST:OFFLINE2"]
+
+            start_time = time()
+            with self.assertRaisesRegex(ValueError, "Cannot connect to 2 PV\\(s\\)") as context:
+                utils_module.connect_to_pvs(pv_names + offline_pv_names, timeout=0.5)
+            connection_time = time() - start_time
+
+            # All the unconnected PVs are reported after a single timeout.
+            for pv_name in offline_pv_names:
+                self.assertIn(pv_name, str(context.exception))
+            self.assertNotIn(pv_names[0], str(context.exception))
+            self.assertLess(connection_time, 0.8)
+
+            self.assertEqual(utils_module.connect_to_pv(pv_names[0]).pv_name, pv_names[0])
+
+        finally:
+            utils_module.PV = original_pv
+
+    def test_bulk_read(self):
+        original_ca = epics_dal_module.ca
+        epics_dal_module.ca = MockCA()
+
+        try:
+            pv_names = ["PYSCAN:TEST:PV%d" % index for index in range(5)]
+            reader = MockReadGroupInterface(pv_names, bulk_read=True)
+
+            self.assertEqual(reader.read(), pv_names)
+            self.assertEqual(epics_dal_module.ca.pending, reader.pvs)
+
+            # The timeouts run in parallel, and all timed out PVs are reported.
+            epics_dal_module.ca = MockCA()
+            reader = MockReadGroupInterface(pv_names + ["PYSCAN:TEST:SLOW1", "PYSCAN:TEST:SLOW2"], bulk_read=True,
+                                            timeouts=[1] * 5 + [0.2, 0.3])
+
+            start_time = time()
+            with self.assertRaisesRegex(ValueError, "Reading timed out for 2 PV\\(s\\)") as context:
+                reader.read()
+
+            self.assertLess(time() - start_time, 0.5)
+            self.assertIn("PYSCAN:TEST:SLOW1 (timeout 0.2 seconds)", str(context.exception))
+            self.assertIn("PYSCAN:TEST:SLOW2 (timeout 0.3 seconds)", str(context.exception))
+
+            # Without bulk read, the PVs are read one by one.
+            epics_dal_module.ca = MockCA()
+            reader = MockReadGroupInterface(pv_names, bulk_read=False)
+            self.assertEqual(reader.read(), pv_names)
+            self.assertEqual(epics_dal_module.ca.pending, [])
+
+            # The default is config.epics_bulk_read.
+            config.epics_bulk_read, bulk_read = True, config.epics_bulk_read
+            self.addCleanup(setattr, config, "epics_bulk_read", bulk_read)
+            self.assertTrue(MockReadGroupInterface(pv_names).bulk_read)
+        finally:
+            epics_dal_module.ca = original_ca
+
+    def test_monitored_read(self):
+        pv_names = ["PYSCAN:TEST:OBS1", "PYSCAN:TEST:OBS2"]
+        reader = CountingMonitoredReadGroupInterface(pv_names, timeout=1)
+        pvs = reader.pvs
+
+        def update_values(values, update_pvs=pvs):
+            sleep(0.1)
+            for pv, value in zip(update_pvs, values):
+                pv.put(value)
+
+        # Only values sampled after the min timestamp are returned.
+        reader.set_min_timestamp(time())
+        threading.Thread(target=update_values, args=([1, 2],)).start()
+        start_time = time()
+        self.assertEqual(reader.read(), [1, 2])
+        self.assertGreater(time() - start_time, 0.09)
+
+        reader.set_min_timestamp(time())
+        threading.Thread(target=update_values, args=([3, 4],)).start()
+        self.assertEqual(reader.read(), [3, 4])
+
+        # Values sampled after the move, but before the read, are accepted without waiting.
+        reader.set_min_timestamp(time())
+        update_values([5, 6])
+        start_time = time()
+        self.assertEqual(reader.read(), [5, 6])
+        self.assertLess(time() - start_time, 0.05)
+
+        # Only the initial values are read, the rest comes from the monitors.
+        self.assertEqual([pv.n_gets for pv in pvs], [1, 1])
+
+        # A PV without new values times out.
+        timeout_reader = CountingMonitoredReadGroupInterface(pv_names, timeout=0.2)
+        timeout_reader.set_min_timestamp(time())
+        threading.Thread(target=update_values, args=([5], timeout_reader.pvs)).start()
+        self.assertRaisesRegex(Exception, "No value sampled after the end of the last move received in 0.2 seconds "
+                                          "for:\nPYSCAN:TEST:OBS2$", timeout_reader.read)
+
+        reader.close()
+        self.assertFalse(pvs[0].callbacks)
+
+    def test_pv_pool(self):
+        original_pv = utils_module.PV
+        utils_module.PV = SearchingMockPV
+        original_max_size, original_idle_timeout = config.epics_pv_pool_max_size, config.epics_pv_pool_idle_timeout
+
+        try:
+            pv_names = ["PYSCAN:TEST:PV%d" % index for index in range(3)]
+
+            reader = ReadGroupInterface(pv_names)
+            writer = WriteGroupInterface(pv_names[:2], pv_names[1:3])
+            # The groups share the connections.
+            self.assertIs(writer.pvs[0], reader.pvs[0])
+            self.assertIs(writer.readback_pvs[1], reader.pvs[2])
+            self.assertEqual(pv_pool.get_n_connections(), 3)
+
+            pvs = reader.pvs
+            reader.close()
+            writer.close()
+            # Idle connections are reused.
+            self.assertFalse(any(pv.disconnected for pv in pvs))
+            self.assertIs(ReadGroupInterface(pv_names[0]).pvs[0], pvs[0])
+
+            # The longest idle connections are closed when the pool is full.
+            config.epics_pv_pool_max_size = 2
+            ReadGroupInterface("PYSCAN:TEST:PV3").close()
+            self.assertEqual(pv_pool.get_n_connections(), 2)
+            self.assertTrue(pvs[1].disconnected and pvs[2].disconnected)
+            self.assertFalse(pvs[0].disconnected)
+
+            # Idle connections are closed after the idle timeout.
+            config.epics_pv_pool_idle_timeout = 0
+            ReadGroupInterface("PYSCAN:TEST:PV4").close()
+            self.assertEqual(pv_pool.get_n_connections(), 1)
+            self.assertFalse(pvs[0].disconnected)
+
+        finally:
+            utils_module.PV = original_pv
+            config.epics_pv_pool_max_size, config.epics_pv_pool_idle_timeout = original_max_size, original_idle_timeout
+
+    def test_set_and_match_skip_unchanged(self):
+        writer = CountingWriteGroupInterface(["PYSCAN:TEST:MOTOR1", "PYSCAN:TEST:MOTOR2"], timeout=0.3,
+                                             skip_unchanged=True, verify_every=3)
+        pvs = writer.pvs
+
+        writer.set_and_match([1, 1])
+        writer.set_and_match([1, 2])
+        # Only the changed PV is written and checked.
+        self.assertEqual([pv.n_puts for pv in pvs], [1, 2])
+        self.assertEqual(pvs[0].n_gets, 1)
+        self.assertIsNone(writer.last_readback_values, "The readback of the skipped PV was not sampled.")
+
+        # The PV is moved outside of the scan - the third set_and_match verifies the unchanged PVs.
+        pvs[0].put(5)
+        writer.set_and_match([1, 3])
+        self.assertEqual(pvs[0].get(), 1)
+        self.assertEqual(writer.last_readback_values, [1, 3])
+
+        # A failed move has to be repeated.
+        pvs[1].put = lambda value, **kwargs: None
+        self.assertRaises(ValueError, writer.set_and_match, [1, 4])
+        pvs[1].put = lambda value, **kwargs: MockPV.put(pvs[1], value, **kwargs)
+        writer.set_and_match([1, 4])
+        self.assertEqual(pvs[1].get(), 4)
+
+    def test_set_and_match_check_first(self):
+        writer = CountingWriteGroupInterface(["PYSCAN:TEST:MOTOR1", "PYSCAN:TEST:MOTOR2"], timeout=0.3,
+                                             check_first=True)
+        pvs = writer.pvs
+        pvs[0].put(5)
+        pvs[1].put(5)
+
+        # The PVs are already at the set values.
+        start_time = time()
+        writer.set_and_match([5, 5])
+        self.assertLess(time() - start_time, writer.default_get_sleep)
+        self.assertEqual([pv.n_puts for pv in pvs], [1, 1])
+        self.assertEqual(writer.n_skipped_moves, 2)
+        self.assertEqual(writer.last_readback_values, [5, 5])
+
+        writer.set_and_match([5, 6])
+        self.assertEqual([pv.n_puts for pv in pvs], [1, 2])
+        self.assertEqual(writer.n_skipped_moves, 1)
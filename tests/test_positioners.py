@@ -11,7 +11,7 @@ from pyscan.positioner.line import LinePositioner, ZigZagLinePositioner
 from pyscan.positioner.serial import SerialPositioner
 from pyscan.positioner.time import TimePositioner
 from pyscan.positioner.vector import VectorPositioner, ZigZagVectorPositioner
-from pyscan.utils import convert_to_position_list
+from pyscan.utils import convert_to_position_list, seek_generator
 from tests.helpers.utils import is_close
 
 
@@ -29,6 +29,9 @@ class DiscreetPositionersTests(unittest.TestCase):
                          "the expected one.\n"
                          "Received: %s\nExpected: %s." % (positions, expected_result))
 
+        self.assertEqual(len(positioner), len(positions),
+                         "The positioner length does not match the number of generated positions.")
+
         for i, position in enumerate(positions):
             self.assertTrue(is_close(position, expected_result[i]),
                             "The elements in position %d do not match the expected result.\n"
@@ -48,6 +51,9 @@ class DiscreetPositionersTests(unittest.TestCase):
                          "the expected one.\n"
                          "Received: %s\nExpected: %s." % (positions, expected_result))
 
+        self.assertEqual(len(positioner), len(positions),
+                         "The positioner length does not match the number of generated positions.")
+
         for index, axis_positions, axis_expected in zip(count(), positions, expected_result):
             self.assertEqual(len(axis_positions), len(axis_expected),
                              "The number of positions at %d does not match "
@@ -388,6 +394,8 @@ class DiscreetPositionersTests(unittest.TestCase):
         deviation_percentage = 0.5
 
         time_positioner = TimePositioner(acquisition_delay, num_samples)
+        self.assertEqual(len(time_positioner), num_samples, "Positioner length does not match.")
+
         time_positioner_generator = time_positioner.get_generator()
         acquisition_times = []
 
@@ -415,4 +423,31 @@ class DiscreetPositionersTests(unittest.TestCase):
             image_index.append(next(positioner_generator))
 
         self.assertEqual(len(image_index), n_images, "Number of images does not match.")
-        self.assertEqual(image_index, list(range(n_images)), "Received array not expected.")
\ No newline at end of file
+        self.assertEqual(len(positioner), n_images, "Positioner length does not match.")
+        self.assertEqual(image_index, list(range(n_images)), "Received array not expected.")
+
+    def test_seek_generator(self):
+        positioners = [LinePositioner([0, 1], [2, 3], n_steps=4, passes=3),
+                       LinePositioner(0, 1, n_steps=10),
+                       ZigZagLinePositioner(0, 4, n_steps=4, passes=3),
+                       VectorPositioner([[1, 2], [3, 4], [5, 6]], passes=2),
+                       ZigZagVectorPositioner([1, 2, 3, 4], passes=3),
+                       AreaPositioner([0, 0, 0], [1, 2, 3], n_steps=[1, 2, 3], passes=2),
+                       AreaPositioner([0, 0], [1, 1], n_steps=[10, 10]),
+                       SerialPositioner([[1, 2, 3], [4, 5]], [0, 0], passes=2),
+                       StaticPositioner(7),
+                       CompoundPositioner([LinePositioner(0, 2, n_steps=2),
+                                           ZigZagVectorPositioner([1, 2, 3], passes=2),
+                                           AreaPositioner([0, 0], [1, 1], n_steps=[1, 1])])]
+
+        for positioner in positioners:
+            all_positions = list(positioner.get_generator())
+
+            for start_index in range(len(all_positions) + 1):
+                positions = list(seek_generator(positioner, start_index))
+
+                self.assertEqual(len(positions), len(all_positions) - start_index,
+                                 "Wrong number of positions from index %d for %s." % (start_index, positioner))
+                # The seeked positions are exactly the same, so a resumed scan writes the same values.
+                self.assertEqual(positions, all_positions[start_index:],
+                                 "Positions do not match from index %d for %s." % (start_index, positioner))
@@ -1,5 +1,7 @@
 import unittest
 
+import numpy
+
 from pyscan import epics_pv, StaticPositioner, scan, SimpleDataProcessor
 from pyscan.utils import DictionaryDataProcessor
 
@@ -72,4 +74,24 @@ class DataProcessorsTest(unittest.TestCase):
             current_number_of_items += 1
         current_number_of_items = 0
 
-        scan(positioner=positioner, readables=readables, data_processor=data_processor, after_read=after_read)
\ No newline at end of file
+        scan(positioner=positioner, readables=readables, data_processor=data_processor, after_read=after_read)
+
+    def test_process_block(self):
+        readables = [epics_pv("PYSCAN:TEST:OBS1"), epics_pv("PYSCAN:TEST:OBS2"), epics_pv("PYSCAN:TEST:OBS3")]
+        data = [numpy.array([1, 2]), numpy.array([[1.5, 2.5], [3.5, 4.5]]), numpy.array([None, "a"], dtype=object)]
+
+        data_processor = SimpleDataProcessor()
+        data_processor.process_block([0, 1], data)
+        dictionary_data_processor = DictionaryDataProcessor(readables)
+        dictionary_data_processor.process_block([0, 1], data)
+
+        # The scalar values are Python values, like in the discrete scans.
+        self.assertEqual([type(values[0]) for values in data_processor.get_data()], [int, int])
+        self.assertEqual([type(values["PYSCAN:TEST:OBS1"]) for values in dictionary_data_processor.get_data()],
+                         [int, int])
+
+        for result in (data_processor.get_data(), [list(values.values())
+                                                   for values in dictionary_data_processor.get_data()]):
+            self.assertEqual([values[0] for values in result], [1, 2])
+            self.assertEqual([values[1].tolist() for values in result], [[1.5, 2.5], [3.5, 4.5]])
+            self.assertEqual([values[2] for values in result], [None, "a"])
@@ -634,9 +634,10 @@ class ScanTests(unittest.TestCase):
 
     def test_bsread_positioner_multi_measurements(self):
 
-        with self.assertRaisesRegex(ValueError, "When using BsreadPositioner the maximum number of n_measurements = 1"):
-            scan(readables=[epics_pv("something")],
-                 positioner=BsreadPositioner(10),
+        # Multiple measurements are read as consecutive messages, but not in block mode.
+        with self.assertRaisesRegex(ValueError, "block acquisition mode the maximum number of n_measurements = 1"):
+            scan(readables=[bs_property("something")],
+                 positioner=BsreadPositioner(10, block_size=5),
                  settings=scan_settings(n_measurements=2))
 
     def test_mulitple_messages_on_same_position(self):
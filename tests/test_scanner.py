@@ -1,10 +1,19 @@
+import os
+import tempfile
 import threading
 import unittest
+from itertools import repeat
 
 import sys
+from time import time, sleep
+
+import numpy
 
 from pyscan import *
-from tests.helpers.mock_epics_dal import MockReadGroupInterface, MockWriteGroupInterface, cached_initial_values
+from pyscan.dal.epics_dal import MonitoredReadGroupInterface
+from pyscan.utils import ConcurrentReader, DictionaryDataProcessor
+from tests.helpers.mock_epics_dal import MockReadGroupInterface, MockWriteGroupInterface, cached_initial_values, \
+    fixed_values, MockPV, pv_cache
 from tests.helpers.utils import TestWriter, TestReader
 
 test_positions = [0, 1, 2, 3, 4, 5]
@@ -20,6 +29,7 @@ scan_module.EPICS_READER = MockReadGroupInterface
 scan_module.EPICS_WRITER = MockWriteGroupInterface
 
 # Setup mock values
+cached_initial_values["PYSCAN:TEST:VALID1"] = 10
 cached_initial_values["PYSCAN:TEST:OBS1"] = 1
 
 # END OF MOCK.
@@ -75,3 +85,700 @@ class ScannerTests(unittest.TestCase):
         scanner_instance.abort_scan()
         self.assertRaisesRegex(Exception, "User aborted scan.", scanner_instance.discrete_scan)
         self.assertEqual(scanner_instance.get_status(), STATUS_ABORTED)
+
+    def test_positioner_without_length(self):
+        class GeneratorPositioner(object):
+            def get_generator(self):
+                yield from test_positions
+
+        progress = []
+
+        def progress_callback(current_position, total_positions):
+            progress.append((current_position, total_positions))
+
+        data_processor = SimpleDataProcessor()
+        reader = TestReader([0, 11, 22, 33, 44, 55]).read
+        settings = scan_settings(progress_callback=progress_callback)
+
+        scanner_instance = Scanner(GeneratorPositioner(), data_processor, reader, settings=settings)
+        scanner_instance.discrete_scan()
+
+        self.assertEqual(test_positions, data_processor.get_positions(), "Not all positions were scanned.")
+        self.assertEqual(progress, [(index, None) for index in range(len(test_positions) + 1)],
+                         "Unknown total number of positions should be reported as None.")
+
+    def test_continuous_scan(self):
+        move_time = 0.2
+        positioner = LinePositioner(start=0, end=1, n_steps=4)
+
+        target_positions = []
+        writer = TestWriter(target_positions).write
+
+        continuous_moves = []
+        move_start = []
+
+        def continuous_writer(positions, velocities):
+            continuous_moves.append((positions, velocities))
+            move_start.append(time())
+
+        # Simulate a motor moving linearly from 0 to 1 in the move time.
+        def position_reader():
+            return [min((time() - move_start[0]) / move_time, 1)]
+
+        data_processor = SimpleDataProcessor()
+        reader = TestReader([0, 11, 22, 33, 44]).read
+
+        # Only the first and the last positions are generated.
+        generated_positions = []
+        original_get_generator = positioner.get_generator
+
+        def recording_get_generator(start_index=0):
+            for position in original_get_generator(start_index):
+                generated_positions.append(position)
+                yield position
+
+        positioner.get_generator = recording_get_generator
+
+        before_read_positions = []
+        before_measurement_executor = ActionExecutor(lambda position: before_read_positions.append(position)).execute
+
+        scanner_instance = Scanner(positioner, data_processor, reader, writer,
+                                   continuous_writer=continuous_writer, position_reader=position_reader,
+                                   settings=scan_settings(move_time=move_time),
+                                   before_measurement_executor=before_measurement_executor)
+        result = scanner_instance.continuous_scan()
+
+        self.assertEqual(generated_positions, [[0], [1]])
+        # The actions before each read receive the nominal sample positions.
+        self.assertEqual(before_read_positions, [[0], [0.25], [0.5], [0.75], [1]])
+
+        self.assertEqual(result, [0, 11, 22, 33, 44], "All samples should be read.")
+        self.assertEqual(target_positions, [[0], [1]], "Writer should move to start and wait for the end.")
+        self.assertEqual(continuous_moves, [([1], [1 / move_time])], "A single move with velocity is expected.")
+
+        sampled_positions = [position[0] for position in data_processor.get_positions()]
+        self.assertEqual(sampled_positions, sorted(sampled_positions), "Positions should increase during the move.")
+        self.assertTrue(0 <= sampled_positions[0] < 0.2 and 0.8 < sampled_positions[-1] <= 1,
+                        "Samples should be spread over the move, but were %s." % sampled_positions)
+
+    def test_continuous_scan_without_move_time(self):
+        scanner_instance = Scanner(LinePositioner(start=0, end=1, n_steps=4), SimpleDataProcessor(),
+                                   TestReader([]).read, continuous_writer=lambda positions, velocities: None)
+        self.assertRaisesRegex(ValueError, "move_time", scanner_instance.continuous_scan)
+
+    def test_pipelined_scan(self):
+        processing_time = 0.05
+        reading_time = 0.05
+
+        class SlowDataProcessor(SimpleDataProcessor):
+            def process(self, position, data):
+                sleep(processing_time)
+                super(SlowDataProcessor, self).process(position, data)
+
+        def reader(current_position_index, retry=False):
+            sleep(reading_time)
+            return current_position_index * 11
+
+        data_processor = SlowDataProcessor()
+        settings = scan_settings(pipelined=True)
+        scanner_instance = Scanner(VectorPositioner(test_positions), data_processor, reader, settings=settings)
+
+        start_time = time()
+        result = scanner_instance.discrete_scan()
+        scan_time = time() - start_time
+
+        self.assertEqual(result, [position * 11 for position in test_positions], "Data processed out of order.")
+        self.assertEqual(data_processor.get_positions(), test_positions, "Positions processed out of order.")
+        self.assertTrue(scan_time < len(test_positions) * (processing_time + reading_time),
+                        "Processing did not overlap with reading, scan took %.2f seconds." % scan_time)
+
+    def test_pipelined_scan_processing_error(self):
+        class FailingDataProcessor(SimpleDataProcessor):
+            def process(self, position, data):
+                if position == 2:
+                    raise ValueError("Cannot process position 2.")
+                super(FailingDataProcessor, self).process(position, data)
+
+        data_processor = FailingDataProcessor()
+        reader = TestReader([0, 11, 22, 33, 44, 55]).read
+        settings = scan_settings(pipelined=True)
+        scanner_instance = Scanner(VectorPositioner(test_positions), data_processor, reader, settings=settings)
+
+        self.assertRaisesRegex(ValueError, "Cannot process position 2.", scanner_instance.discrete_scan)
+        self.assertEqual(data_processor.get_positions(), [0, 1], "Processing should stop at the first error.")
+
+    def test_abort_interrupts_waiting(self):
+        positioner = StaticPositioner(5)
+        readables = "PYSCAN:TEST:OBS1"
+        # The settling time is much longer than the time we wait for the abort.
+        settings = scan_settings(settling_time=30)
+
+        scanner_instance = scanner(positioner=positioner, readables=readables, settings=settings)
+
+        def abort():
+            sleep(0.1)
+            scanner_instance.abort_scan()
+
+        threading.Thread(target=abort).start()
+
+        start_time = time()
+        self.assertRaisesRegex(Exception, "User aborted scan.", scanner_instance.discrete_scan)
+        self.assertTrue(time() - start_time < 1, "Abort did not interrupt the settling time.")
+        self.assertEqual(scanner_instance.get_status(), STATUS_ABORTED)
+
+    def test_abort_interrupts_move(self):
+        epics_dal_module = sys.modules["pyscan.dal.epics_dal"]
+        original_connect_to_pvs = epics_dal_module.connect_to_pvs
+        epics_dal_module.connect_to_pvs = lambda pv_names, timeout=None: [MockPV(pv_name) for pv_name in pv_names]
+        scan_module.EPICS_WRITER = epics_dal_module.WriteGroupInterface
+
+        function_positions = []
+        # The readback never reaches the set value.
+        writables = [epics_pv("PYSCAN:TEST:MOTOR1:SET", "PYSCAN:TEST:OBS1"),
+                     function_value(function_positions.append, "function_writable")]
+
+        try:
+            scanner_instance = scanner(positioner=VectorPositioner([[5, 5]]), readables="PYSCAN:TEST:OBS1",
+                                       writables=writables)
+
+            def abort():
+                sleep(0.1)
+                scanner_instance.abort_scan()
+
+            threading.Thread(target=abort).start()
+            self.assertRaisesRegex(Exception, "User aborted scan.", scanner_instance.discrete_scan)
+        finally:
+            epics_dal_module.connect_to_pvs = original_connect_to_pvs
+            scan_module.EPICS_WRITER = MockWriteGroupInterface
+            epics_dal_module.pv_pool.clear()
+
+        # The function writables are not written after the abort.
+        self.assertEqual(function_positions, [])
+
+    def test_resume_from_journal(self):
+        class PersistingDataProcessor(SimpleDataProcessor):
+            def process(self, position, data):
+                super(PersistingDataProcessor, self).process(position, data)
+                # Pretend the data was saved to a file.
+                return "data_%d.h5" % position
+
+            def restore(self, position, pointer):
+                super(PersistingDataProcessor, self).process(position, pointer)
+
+        def failing_reader(current_position_index, retry=False):
+            if current_position_index == 3:
+                raise ValueError("Reading failed at position 3.")
+            return current_position_index * 11
+
+        def reader(current_position_index, retry=False):
+            return current_position_index * 11
+
+        with tempfile.TemporaryDirectory() as journal_directory:
+            journal = ScanJournal(os.path.join(journal_directory, "scan_journal.jsonl"))
+
+            scanner_instance = Scanner(VectorPositioner(test_positions), PersistingDataProcessor(), failing_reader,
+                                       journal=journal)
+            self.assertRaisesRegex(ValueError, "Reading failed", scanner_instance.discrete_scan)
+
+            self.assertEqual([entry["index"] for entry in journal.read()], [1, 2, 3])
+            self.assertEqual([entry["pointer"] for entry in journal.read()],
+                             ["data_0.h5", "data_1.h5", "data_2.h5"])
+
+            read_positions = []
+
+            def recording_reader(current_position_index, retry=False):
+                read_positions.append(current_position_index)
+                return reader(current_position_index, retry)
+
+            data_processor = PersistingDataProcessor()
+            scanner_instance = Scanner(VectorPositioner(test_positions), data_processor, recording_reader,
+                                       journal=journal, resume_from=journal)
+            result = scanner_instance.discrete_scan()
+
+            self.assertEqual(read_positions, [3, 4, 5], "Completed positions were read again.")
+            self.assertEqual(data_processor.get_positions(), test_positions)
+            self.assertEqual(result, ["data_0.h5", "data_1.h5", "data_2.h5", 33, 44, 55])
+            self.assertEqual([entry["index"] for entry in journal.get_completed()], [1, 2, 3, 4, 5, 6])
+
+        # The default data processors restore the data from the journal.
+        with tempfile.TemporaryDirectory() as journal_directory:
+            journal = ScanJournal(os.path.join(journal_directory, "scan_journal.jsonl"))
+
+            readables = [function_value(lambda: 1, "first"), function_value(lambda: 2, "second")]
+            self.assertRaisesRegex(ValueError, "Reading failed",
+                                   scan, VectorPositioner(test_positions), readables, journal=journal,
+                                   before_read=lambda position: failing_reader(position))
+
+            result = scan(VectorPositioner(test_positions), readables, journal=journal, resume_from=journal)
+            self.assertEqual(result, [[1, 2]] * len(test_positions))
+
+            data_processor = DictionaryDataProcessor(readables)
+            result = scan(VectorPositioner(test_positions), readables, journal=journal, resume_from=journal,
+                          data_processor=data_processor)
+            self.assertEqual(result, [{"first": 1, "second": 2}] * len(test_positions))
+            self.assertEqual(data_processor.get_positions(), test_positions)
+
+            class MemoryDataProcessor(object):
+                def process(self, position, data):
+                    pass
+
+            # A data processor that cannot restore the completed positions cannot resume the scan.
+            self.assertRaisesRegex(ValueError, "MemoryDataProcessor does not implement restore",
+                                   scan, VectorPositioner(test_positions), readables, resume_from=journal,
+                                   data_processor=MemoryDataProcessor())
+
+            # The journal must be from the same scan.
+            self.assertRaisesRegex(ValueError, "journal position 3 at index 4 does not match the positioner position 6",
+                                   scan, VectorPositioner([0, 1, 2, 6, 4, 5]), readables, resume_from=journal)
+            self.assertRaisesRegex(ValueError, "journal has 6 completed positions, but the positioner has only 3",
+                                   scan, VectorPositioner(test_positions[:3]), readables, resume_from=journal)
+
+            # A new scan does not append to the journal of another scan.
+            self.assertRaisesRegex(ValueError, "scan_journal.jsonl is not empty",
+                                   scan, VectorPositioner(test_positions), readables, journal=journal)
+
+    def test_journal_values(self):
+        with tempfile.TemporaryDirectory() as journal_directory:
+            journal = ScanJournal(os.path.join(journal_directory, "scan_journal.jsonl"))
+
+            pointer = [1, 2.5, "text", numpy.array([[1, 2], [3, 4]], dtype=numpy.int16), numpy.float32(1.5)]
+            journal.append(1, [0.1, 0.2], pointer)
+
+            entry = journal.read()[0]
+            self.assertTrue(journal.position_matches(entry, [0.1, 0.2]))
+            self.assertEqual(entry["pointer"][:3], [1, 2.5, "text"])
+            # Numpy values are restored with their type.
+            self.assertEqual(entry["pointer"][3].dtype, numpy.int16)
+            numpy.testing.assert_array_equal(entry["pointer"][3], [[1, 2], [3, 4]])
+            self.assertIsInstance(entry["pointer"][4], numpy.float32)
+
+            # Values that cannot be restored are not written.
+            self.assertRaisesRegex(TypeError, "Cannot write the value .* of type object", journal.append, 2, [0.3, 0.4],
+                                   object())
+            self.assertEqual(len(journal.read()), 1)
+
+    def test_measurement_rate(self):
+        measurement_interval = 0.05
+        reading_time = 0.03
+        n_measurements = 5
+
+        measurement_times = []
+
+        def reader(current_position_index, retry=False):
+            measurement_times.append(time())
+            sleep(reading_time)
+            return current_position_index
+
+        instrumentation = ScanInstrumentation()
+        settings = scan_settings(measurement_interval=measurement_interval, n_measurements=n_measurements)
+        scanner_instance = Scanner(StaticPositioner(1), SimpleDataProcessor(), reader, settings=settings,
+                                   instrumentation=instrumentation)
+        scanner_instance.discrete_scan()
+
+        # The reading time does not add to the measurement interval.
+        total_time = measurement_times[-1] - measurement_times[0]
+        self.assertTrue(abs(total_time - (n_measurements - 1) * measurement_interval) < 0.02,
+                        "Measurements drifted, %d measurements took %.3f seconds." % (n_measurements, total_time))
+        self.assertEqual(instrumentation.get_summary()["measurement_jitter"]["count"], n_measurements)
+        self.assertNotIn("missed_measurement_deadlines", instrumentation.get_summary())
+
+    def test_measurement_overrun(self):
+        measurement_interval = 0.05
+        reading_time = 0.12
+
+        measurement_times = []
+
+        def reader(current_position_index, retry=False):
+            measurement_times.append(time())
+            sleep(reading_time)
+            return current_position_index
+
+        instrumentation = ScanInstrumentation()
+        settings = scan_settings(measurement_interval=measurement_interval, n_measurements=3,
+                                 overrun_policy=OverrunPolicy.Skip)
+        Scanner(StaticPositioner(1), SimpleDataProcessor(), reader, settings=settings,
+                instrumentation=instrumentation).discrete_scan()
+
+        # Each late measurement is moved to the next 0.05 seconds slot: 0, 0.15, 0.3
+        self.assertTrue(abs((measurement_times[-1] - measurement_times[0]) - 0.3) < 0.03,
+                        "Late measurements not moved to the next slot.")
+        self.assertEqual(instrumentation.get_summary()["missed_measurement_deadlines"]["total"], 4)
+
+        del measurement_times[:]
+        settings = scan_settings(measurement_interval=measurement_interval, n_measurements=3,
+                                 overrun_policy=OverrunPolicy.CatchUp)
+        Scanner(StaticPositioner(1), SimpleDataProcessor(), reader, settings=settings).discrete_scan()
+
+        # Late measurements are taken immediately.
+        self.assertTrue(abs((measurement_times[-1] - measurement_times[0]) - 2 * reading_time) < 0.03,
+                        "Late measurements not taken immediately.")
+
+        settings = scan_settings(measurement_interval=measurement_interval, n_measurements=3,
+                                 overrun_policy=OverrunPolicy.Fail)
+        scanner_instance = Scanner(StaticPositioner(1), SimpleDataProcessor(), reader, settings=settings)
+        self.assertRaisesRegex(Exception, "seconds late", scanner_instance.discrete_scan)
+
+    def test_retry_delay(self):
+        n_failed_reads = 2
+
+        def validator(position, data):
+            return len(read_times) > n_failed_reads
+
+        read_times = []
+
+        def reader(current_position_index, retry=False):
+            read_times.append(time())
+            return current_position_index
+
+        original_delay, original_backoff = config.scan_acquisition_retry_delay, config.scan_acquisition_retry_backoff
+        config.scan_acquisition_retry_delay = 0.1
+        config.scan_acquisition_retry_backoff = 2
+        try:
+            Scanner(StaticPositioner(1), SimpleDataProcessor(), reader, data_validator=validator).discrete_scan()
+
+            # Each retry delay is double the previous one.
+            self.assertTrue(abs((read_times[1] - read_times[0]) - 0.1) < 0.05)
+            self.assertTrue(abs((read_times[2] - read_times[1]) - 0.2) < 0.05)
+
+            # The retry event stops the waiting.
+            config.scan_acquisition_retry_delay = 10
+            del read_times[:]
+            retry_event = threading.Event()
+
+            def set_retry_event():
+                while len(read_times) <= n_failed_reads:
+                    sleep(0.05)
+                    retry_event.set()
+
+            threading.Thread(target=set_retry_event).start()
+
+            start_time = time()
+            Scanner(StaticPositioner(1), SimpleDataProcessor(), reader, data_validator=validator,
+                    retry_event=retry_event).discrete_scan()
+            self.assertTrue(time() - start_time < 1, "Retry event did not stop the retry delay.")
+
+            # The retries woken up by the retry event do not count towards the retry limit.
+            config.scan_acquisition_retry_delay = 0.1
+            config.scan_acquisition_retry_backoff = 1
+            del read_times[:]
+
+            def always_set_retry_event():
+                while not scan_finished.is_set():
+                    sleep(0.01)
+                    retry_event.set()
+
+            scan_finished = threading.Event()
+            threading.Thread(target=always_set_retry_event).start()
+
+            start_time = time()
+            try:
+                self.assertRaisesRegex(Exception, "Number of maximum read attempts",
+                                       Scanner(StaticPositioner(1), SimpleDataProcessor(), reader,
+                                               data_validator=lambda position, data: False,
+                                               retry_event=retry_event).discrete_scan)
+            finally:
+                scan_finished.set()
+
+            self.assertGreater(time() - start_time, 0.1 * (config.scan_acquisition_retry_limit - 1) - 0.02)
+            self.assertGreater(len(read_times), config.scan_acquisition_retry_limit)
+        finally:
+            config.scan_acquisition_retry_delay = original_delay
+            config.scan_acquisition_retry_backoff = original_backoff
+
+    def test_monitored_read_after_move(self):
+        class MockMonitoredReadGroupInterface(MonitoredReadGroupInterface):
+            @staticmethod
+            def connect_all(pv_names):
+                return [MockPV(pv_name) for pv_name in pv_names]
+
+        def settle_readable(position):
+            # The readable posts a new value while settling, and then does not change anymore.
+            for pv in pv_cache["PYSCAN:TEST:OBS1"]:
+                pv.put(position * 10)
+
+        original_reader = scan_module.EPICS_MONITORED_READER
+        scan_module.EPICS_MONITORED_READER = MockMonitoredReadGroupInterface
+        config.epics_read_from_monitors = True
+        original_timeout, config.epics_monitored_read_timeout = config.epics_monitored_read_timeout, 0.3
+        try:
+            result = scan(VectorPositioner([1, 2]), "PYSCAN:TEST:OBS1", epics_pv("PYSCAN:TEST:MOTOR1:SET"),
+                          after_move=settle_readable, settings=scan_settings(settling_time=0.1))
+        finally:
+            scan_module.EPICS_MONITORED_READER = original_reader
+            config.epics_read_from_monitors = False
+            config.epics_monitored_read_timeout = original_timeout
+
+        self.assertEqual(result, [[10], [20]])
+
+    def test_retry_on_condition_change(self):
+        fixed_values["PYSCAN:TEST:VALID1"] = iter([0, 10])
+        fixed_values["PYSCAN:TEST:VALID2"] = repeat(1)
+        conditions = [epics_condition("PYSCAN:TEST:VALID1", 10, action=ConditionAction.Retry),
+                      epics_condition("PYSCAN:TEST:VALID2", 1)]
+
+        def change_conditions():
+            sleep(0.05)
+            # Changes of the conditions that did not fail do not wake up the retry.
+            for pv in pv_cache["PYSCAN:TEST:VALID2"]:
+                pv.put(2)
+            sleep(0.1)
+            for pv in pv_cache["PYSCAN:TEST:VALID1"]:
+                pv.put(10)
+
+        original_delay = config.scan_acquisition_retry_delay
+        config.scan_acquisition_retry_delay = 0.4
+        config.scan_acquisition_retry_on_change = True
+        try:
+            threading.Thread(target=change_conditions).start()
+            start_time = time()
+            result = scan(StaticPositioner(1), "PYSCAN:TEST:OBS1", conditions=conditions)
+            scan_time = time() - start_time
+        finally:
+            config.scan_acquisition_retry_delay = original_delay
+            config.scan_acquisition_retry_on_change = False
+            del fixed_values["PYSCAN:TEST:VALID1"]
+            del fixed_values["PYSCAN:TEST:VALID2"]
+
+        self.assertEqual(result, [[1]])
+        self.assertTrue(0.13 < scan_time < 0.35, "The retry was not woken up by the failed condition change.")
+
+    def test_retry_failed_sources_only(self):
+        function_reads = []
+
+        def expensive_readable():
+            function_reads.append(1)
+            return len(function_reads)
+
+        readables = [function_value(expensive_readable, "expensive"), "PYSCAN:TEST:OBS1"]
+        # The condition fails on the first read.
+        fixed_values["PYSCAN:TEST:VALID1"] = iter([0, 10, 10])
+        conditions = epics_condition("PYSCAN:TEST:VALID1", 10, action=ConditionAction.Retry)
+
+        original_delay = config.scan_acquisition_retry_delay
+        config.scan_acquisition_retry_delay = 0
+        config.scan_acquisition_retry_failed_sources_only = True
+        try:
+            result = scan(StaticPositioner(2), readables, conditions=conditions)
+        finally:
+            config.scan_acquisition_retry_delay = original_delay
+            config.scan_acquisition_retry_failed_sources_only = False
+            del fixed_values["PYSCAN:TEST:VALID1"]
+
+        # The function readable is not read again when the EPICS condition fails.
+        self.assertEqual(len(function_reads), 2)
+        self.assertEqual(result, [[1, 1], [2, 1]])
+
+    def test_check_conditions_first(self):
+        function_reads = []
+
+        def expensive_readable():
+            function_reads.append(1)
+            return len(function_reads)
+
+        readables = [function_value(expensive_readable, "expensive"), "PYSCAN:TEST:OBS1"]
+        # The condition fails on the first check, and is fulfilled in the check before and after the second read.
+        fixed_values["PYSCAN:TEST:VALID1"] = iter([0, 10, 10])
+        conditions = epics_condition("PYSCAN:TEST:VALID1", 10, action=ConditionAction.Retry)
+
+        original_delay = config.scan_acquisition_retry_delay
+        config.scan_acquisition_retry_delay = 0
+        config.scan_check_conditions_first = True
+        try:
+            result = scan(StaticPositioner(1), readables, conditions=conditions)
+        finally:
+            config.scan_acquisition_retry_delay = original_delay
+            config.scan_check_conditions_first = False
+            del fixed_values["PYSCAN:TEST:VALID1"]
+
+        # The function readable is not read when the condition is not fulfilled.
+        self.assertEqual(len(function_reads), 1)
+        self.assertEqual(result, [[1, 1]])
+
+    def test_deduplicated_reads(self):
+        pv_reads = {}
+
+        def counted_values(pv_name, value):
+            while True:
+                pv_reads[pv_name] = pv_reads.get(pv_name, 0) + 1
+                yield value
+
+        for pv_name, value in (("PYSCAN:TEST:VALID1", 10), ("PYSCAN:TEST:OBS1", 1), ("PYSCAN:TEST:MOTOR1:GET", -1)):
+            fixed_values[pv_name] = counted_values(pv_name, value)
+
+        class SamplingMockWriteGroupInterface(MockWriteGroupInterface):
+            def set_and_match(self, values, tolerances=None, timeout=None):
+                super(SamplingMockWriteGroupInterface, self).set_and_match(values, tolerances, timeout)
+                # The readbacks reached the set values.
+                self.last_readback_values = values
+
+        writables = epics_pv("PYSCAN:TEST:MOTOR1:SET", "PYSCAN:TEST:MOTOR1:GET")
+        readables = ["PYSCAN:TEST:VALID1", "PYSCAN:TEST:MOTOR1:GET", "PYSCAN:TEST:OBS1", "PYSCAN:TEST:OBS1"]
+        conditions = epics_condition("PYSCAN:TEST:VALID1", 10)
+
+        scan_module.EPICS_WRITER = SamplingMockWriteGroupInterface
+        try:
+            result = scan(VectorPositioner([1, 2, 3]), readables, writables, conditions)
+        finally:
+            scan_module.EPICS_WRITER = MockWriteGroupInterface
+            for pv_name in ("PYSCAN:TEST:VALID1", "PYSCAN:TEST:OBS1", "PYSCAN:TEST:MOTOR1:GET"):
+                del fixed_values[pv_name]
+
+        self.assertEqual(result, [[10, 1, 1, 1], [10, 2, 1, 1], [10, 3, 1, 1]])
+        # Each distinct PV is read once per step, and the readback values sampled by the move are reused.
+        self.assertEqual(pv_reads, {"PYSCAN:TEST:VALID1": 3, "PYSCAN:TEST:OBS1": 3})
+
+    def test_skipped_moves_instrumentation(self):
+        class SkippingMockWriteGroupInterface(MockWriteGroupInterface):
+            def set_and_match(self, values, tolerances=None, timeout=None):
+                super(SkippingMockWriteGroupInterface, self).set_and_match(values, tolerances, timeout)
+                # The first PV is always at the set value.
+                self.n_skipped_moves = 1
+
+        instrumentation = ScanInstrumentation()
+        writables = [epics_pv("PYSCAN:TEST:MOTOR1:SET"), epics_pv("PYSCAN:TEST:MOTOR2:SET")]
+
+        scan_module.EPICS_WRITER = SkippingMockWriteGroupInterface
+        try:
+            scan(VectorPositioner([[1, 1], [1, 2], [1, 3]]), "PYSCAN:TEST:OBS1", writables,
+                 instrumentation=instrumentation)
+        finally:
+            scan_module.EPICS_WRITER = MockWriteGroupInterface
+
+        skipped_moves = instrumentation.get_summary()["skipped_moves"]
+        self.assertEqual(skipped_moves["count"], 3)
+        self.assertEqual(skipped_moves["total"], 3)
+
+    def test_scan_releases_pvs(self):
+        epics_dal_module = sys.modules["pyscan.dal.epics_dal"]
+        pv_pool = epics_dal_module.pv_pool
+        pv_pool.clear()
+
+        original_connect_to_pvs = epics_dal_module.connect_to_pvs
+        original_config = config.epics_set_and_match_use_monitors, config.scan_acquisition_retry_on_change
+
+        # The scan groups borrow the mock PVs from the connection pool.
+        epics_dal_module.connect_to_pvs = lambda pv_names, timeout=None: [MockPV(pv_name) for pv_name in pv_names]
+        scan_module.EPICS_WRITER = epics_dal_module.WriteGroupInterface
+        scan_module.EPICS_READER = epics_dal_module.ReadGroupInterface
+        # Both add callbacks to the pooled PVs.
+        config.epics_set_and_match_use_monitors = True
+        config.scan_acquisition_retry_on_change = True
+
+        try:
+            for _ in range(2):
+                result = scan(VectorPositioner([1, 2]), ["PYSCAN:TEST:OBS1", "PYSCAN:TEST:MOTOR1:SET"],
+                              epics_pv("PYSCAN:TEST:MOTOR1:SET"), epics_condition("PYSCAN:TEST:VALID1", 10))
+                self.assertEqual(result, [[1, 1], [1, 2]])
+
+                # All the PVs are returned to the pool, without the callbacks of the scan.
+                for pv_name in ("PYSCAN:TEST:MOTOR1:SET", "PYSCAN:TEST:OBS1", "PYSCAN:TEST:VALID1"):
+                    self.assertEqual(pv_pool._ref_counts[pv_name], 0)
+                    self.assertFalse(pv_pool._pvs[pv_name].callbacks)
+        finally:
+            epics_dal_module.connect_to_pvs = original_connect_to_pvs
+            scan_module.EPICS_WRITER = MockWriteGroupInterface
+            scan_module.EPICS_READER = MockReadGroupInterface
+            config.epics_set_and_match_use_monitors, config.scan_acquisition_retry_on_change = original_config
+            pv_pool.clear()
+
+    def test_concurrent_read(self):
+        reading_time = 0.2
+
+        def slow_readable_1():
+            sleep(reading_time)
+            return 1
+
+        def slow_readable_2():
+            sleep(reading_time)
+            return 2
+
+        readables = [function_value(slow_readable_1, "slow_1"), "PYSCAN:TEST:OBS1",
+                     function_value(slow_readable_2, "slow_2")]
+
+        config.scan_concurrent_read = True
+        try:
+            start_time = time()
+            result = scan(StaticPositioner(2), readables)
+            scan_time = time() - start_time
+        finally:
+            config.scan_concurrent_read = False
+
+        self.assertEqual(result, [[1, 1, 2], [1, 1, 2]], "The values are not in the readables order.")
+        self.assertTrue(scan_time < 2 * (2 * reading_time), "Readables were not read concurrently.")
+
+    def test_concurrent_read_errors(self):
+        def failing_readable():
+            raise ValueError("Device not ready.")
+
+        def stuck_readable():
+            sleep(0.5)
+            return 1
+
+        concurrent_reader = ConcurrentReader()
+        read_functions = [("failing", failing_readable, None), ("stuck", stuck_readable, 0.1),
+                          ("good", lambda: 1, None)]
+
+        start_time = time()
+        with self.assertRaises(Exception) as context:
+            concurrent_reader.read(read_functions)
+        self.assertTrue(time() - start_time < 1, "The read timeout was not respected.")
+
+        # All the errors are reported together.
+        self.assertIn("failing: Device not ready.", str(context.exception))
+        self.assertIn("stuck: read timeout of 0.1 seconds exceeded.", str(context.exception))
+        self.assertNotIn("good", str(context.exception))
+
+        self.assertEqual(concurrent_reader.read([("good", lambda: 1, None), ("other", lambda: 2, 1)]), [1, 2])
+
+        # The source of the read that timed out is not read again while the read is still running.
+        self.assertRaisesRegex(Exception, "Cannot read stuck, the previous read timed out and is still running.",
+                               concurrent_reader.read, read_functions)
+
+        # Closing the reader waits for the read that timed out.
+        concurrent_reader.close()
+        self.assertGreater(time() - start_time, 0.45)
+        self.assertEqual(concurrent_reader.read([("stuck", lambda: 1, None), ("other", lambda: 2, None)]), [1, 2])
+        concurrent_reader.close()
+
+    def test_instrumentation(self):
+        slow_steps = []
+
+        def slow_step_callback(position_index, step_time, median_step_time, stages):
+            slow_steps.append(position_index)
+
+        def reader(current_position_index, retry=False):
+            # The 5th position is much slower than the others.
+            sleep(0.2 if current_position_index == 4 else 0.01)
+            return current_position_index
+
+        instrumentation = ScanInstrumentation(slow_step_factor=5, slow_step_callback=slow_step_callback)
+        writer = TestWriter().write
+
+        scanner_instance = Scanner(VectorPositioner(test_positions), SimpleDataProcessor(), reader, writer,
+                                   instrumentation=instrumentation)
+        scanner_instance.discrete_scan()
+
+        summary = instrumentation.get_summary()
+        for stage in ["move", "settle", "read", "validate", "process", "progress", "step"]:
+            self.assertEqual(summary[stage]["count"], len(test_positions), "Stage %s not recorded." % stage)
+
+        self.assertTrue(summary["read"]["max"] >= 0.2, "Slow read not recorded.")
+        self.assertTrue(summary["read"]["p50"] < 0.1, "Median read time wrong.")
+
+        trace = instrumentation.get_trace()
+        self.assertEqual([step["position_index"] for step in trace], [1, 2, 3, 4, 5, 6])
+        self.assertEqual([name for name, _ in trace[0]["stages"]],
+                         ["move", "settle", "read", "validate", "process", "progress"])
+
+        self.assertEqual(slow_steps, [5], "Only the 5th step should be reported as slow.")
+
+    def test_streaming_histogram(self):
+        histogram = StreamingHistogram()
+        for value in range(1, 101):
+            histogram.add(value)
+
+        self.assertEqual(histogram.count, 100)
+        self.assertEqual(histogram.max, 100)
+        self.assertEqual(histogram.get_percentile(100), 100)
+        self.assertAlmostEqual(histogram.get_percentile(50), 50, delta=1)
+        self.assertAlmostEqual(histogram.get_percentile(95), 95, delta=1)